@@ -0,0 +1,81 @@
+"""
+Requests/sec for the small QR / quickedit endpoints: ASGI (uvicorn) vs WSGI.
+
+Start both servers against the same database, then point this script at them:
+
+    uvicorn website.asgi:application --port 8001 --workers 1
+    gunicorn website.wsgi:application --bind :8002 --workers 1 --threads 8
+
+    python benchmarks/asgi_vs_wsgi.py --sessionid <your sessionid cookie> \
+        --machine 1 --job 1 --part 1
+
+Only the standard library is used on the client side so the numbers are not
+skewed by an async HTTP client on one side only.
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def hammer(base_url, paths, cookie, seconds, concurrency):
+    parts = urlsplit(base_url)
+    deadline = time.perf_counter() + seconds
+    counts = [0] * concurrency
+    errors = [0] * concurrency
+
+    def worker(n):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        i = 0
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            try:
+                conn.request("GET", path, headers={"Cookie": cookie})
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status == 200:
+                    counts[n] += 1
+                else:
+                    errors[n] += 1
+            except (OSError, http.client.HTTPException):
+                errors[n] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asgi", default="http://127.0.0.1:8001")
+    parser.add_argument("--wsgi", default="http://127.0.0.1:8002")
+    parser.add_argument("--sessionid", required=True, help="sessionid cookie of a logged-in staff user")
+    parser.add_argument("--machine", type=int, default=1)
+    parser.add_argument("--job", type=int, default=1)
+    parser.add_argument("--part", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    paths = [
+        f"/rental/{args.machine}/qr/",
+        f"/jobs/{args.job}/qr/",
+        f"/inventory/part/{args.part}/qr/",
+    ]
+    cookie = f"sessionid={args.sessionid}"
+
+    for label, url in (("ASGI", args.asgi), ("WSGI", args.wsgi)):
+        rps, errors = hammer(url, paths, cookie, args.seconds, args.concurrency)
+        print(f"{label:5} {url:28} {rps:9.1f} req/s  ({errors} errors, {args.concurrency} clients)")
+
+
+if __name__ == "__main__":
+    main()
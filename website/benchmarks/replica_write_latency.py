@@ -0,0 +1,109 @@
+"""
+Write latency on the primary SQLite file with heavy dashboard/report reads running
+against (a) the same file, and (b) a replica copy – the situation staff/replica.py fixes.
+
+SQLite's default rollback journal makes a committing writer wait for every open
+reader, so long listing/report scans show up directly as slow `new_hire` /
+`part_take` saves. Uses only sqlite3 on a throwaway database:
+
+    python benchmarks/replica_write_latency.py --rows 200000 --readers 4
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE machine (id INTEGER PRIMARY KEY, brand TEXT, model TEXT, serial TEXT,
+                      status TEXT, location TEXT, tier TEXT);
+CREATE TABLE hire (id INTEGER PRIMARY KEY, machine_id INTEGER, start TEXT, notes TEXT);
+"""
+# What the dashboard search + utilization report do: full scans with LIKE and GROUP BY
+READ_QUERIES = [
+    "SELECT * FROM machine WHERE brand LIKE '%form%' OR serial LIKE '%99%'",
+    "SELECT tier, status, COUNT(*) FROM machine GROUP BY tier, status",
+    "SELECT m.tier, COUNT(h.id) FROM machine m LEFT JOIN hire h ON h.machine_id = m.id GROUP BY m.tier",
+]
+
+
+def build(path, rows):
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    db.executemany(
+        "INSERT INTO machine VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((i, 'ProForm' if i % 3 else 'NordicTrack', f'{500 + i % 50}', f'SN{i}', 'available', 'Depot',
+          ('low', 'medium', 'high')[i % 3]) for i in range(rows)),
+    )
+    db.commit()
+    db.close()
+
+
+def run(primary, read_target, readers, seconds):
+    stop = threading.Event()
+    latencies = []
+
+    def reader():
+        db = sqlite3.connect(read_target, timeout=30)
+        i = 0
+        while not stop.is_set():
+            db.execute(READ_QUERIES[i % len(READ_QUERIES)]).fetchall()
+            i += 1
+        db.close()
+
+    def writer():
+        db = sqlite3.connect(primary, timeout=30)
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            db.execute("INSERT INTO hire (machine_id, start, notes) VALUES (?, date('now'), 'bench')", (i,))
+            db.execute("UPDATE machine SET status = 'rented' WHERE id = ?", (i,))
+            db.commit()
+            latencies.append((time.perf_counter() - started) * 1000)
+            i += 1
+            time.sleep(0.01)  # a busy counter, not a bulk loader
+        db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'writes': len(latencies),
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'max': latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='replica-bench-')
+    try:
+        primary = os.path.join(workdir, 'primary.sqlite3')
+        replica = os.path.join(workdir, 'replica.sqlite3')
+        build(primary, args.rows)
+        shutil.copy(primary, replica)
+
+        for label, target in (("reads on primary", primary), ("reads on replica", replica)):
+            r = run(primary, target, args.readers, args.seconds)
+            print(f"{label:17} writes={r['writes']:5}  p50={r['p50']:7.2f} ms  "
+                  f"p95={r['p95']:8.2f} ms  max={r['max']:8.2f} ms")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
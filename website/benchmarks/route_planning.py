@@ -0,0 +1,80 @@
+"""
+Time the route planner (staff/scheduling.py) on a synthetic day: N jobs spread
+over real suburbs of one metro area from the bundled places file, split between
+T technicians. Compares total km against the naive plan (round-robin
+technicians, booking order) so the solver's gain is visible too.
+
+Runs the pure clustering/ordering code only – no database needed:
+
+    python benchmarks/route_planning.py --jobs 300 --technicians 8 --metro NSW
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from staff import geo, scheduling  # noqa: E402
+
+# Rough bounding boxes of the metro areas jobs are drawn from
+METROS = {
+    'NSW': (-34.1, -33.6, 150.7, 151.35),
+    'VIC': (-38.1, -37.6, 144.7, 145.3),
+    'QLD': (-27.7, -27.3, 152.8, 153.2),
+}
+
+
+def sample_points(jobs, state, seed):
+    south, north, west, east = METROS[state]
+    pool = [point for (_, place_state), point in geo.gazetteer().suburbs.items()
+            if place_state == state and south <= point[0] <= north and west <= point[1] <= east]
+    rng = random.Random(seed)
+    return [rng.choice(pool) for _ in range(jobs)]
+
+
+def naive_km(points, depot, k):
+    total = 0.0
+    for c in range(k):
+        route = [depot] + points[c::k] + [depot]
+        total += sum(scheduling.haversine_km(a, b) for a, b in zip(route, route[1:]))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--jobs', type=int, default=300)
+    parser.add_argument('--technicians', type=int, default=8)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--metro', choices=sorted(METROS), default='NSW')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    points = sample_points(args.jobs, args.metro, args.seed)
+    depot = scheduling._centroid(points)
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        assignment = scheduling.cluster(points, args.technicians, depot=depot)
+        total_km = 0.0
+        for c in range(args.technicians):
+            _, km = scheduling.order_route([p for p, a in zip(points, assignment) if a == c], depot)
+            total_km += km
+        timings.append(time.perf_counter() - started)
+
+    sizes = sorted(assignment.count(c) for c in range(args.technicians))
+    print(f"{args.jobs} jobs, {args.technicians} technicians")
+    print(f"  solve time    best {min(timings):.2f}s  worst {max(timings):.2f}s")
+    print(f"  route sizes   {sizes}")
+    print(f"  planned       {total_km:,.0f} km")
+    print(f"  naive         {naive_km(points, depot, args.technicians):,.0f} km (round-robin, booking order)")
+
+
+if __name__ == '__main__':
+    main()
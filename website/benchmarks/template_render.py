@@ -0,0 +1,98 @@
+"""
+Time the listing-page row templates (staff/rows/*.html) under both engines:
+Django templates and their Jinja2 twins (staff/jinja2/, staff/jinja_env.py).
+Prints render time per 1,000 rows for each row template.
+
+Rows are unsaved model instances built in memory, so only rendering is timed –
+no database needed:
+
+    python benchmarks/template_render.py --rows 5000
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.template import engines  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from staff.models import RentalMachine, Part, Job, Customer  # noqa: E402
+
+
+def machines(n):
+    return [RentalMachine(id=i, type='treadmill', brand='ProForm', model=f'50{i % 9}', serial_number=f'SN{i:06}',
+                          status='available', value_tier='medium', location='Parramatta') for i in range(1, n + 1)]
+
+
+def parts(n):
+    return [Part(id=i, name=f'Running belt {i}', part_number=f'P{i:06}', quantity_in_stock=i % 40,
+                 location='Shelf B', compatible_models='ProForm 505, NordicTrack C700') for i in range(1, n + 1)]
+
+
+def jobs(n):
+    rows = []
+    for i in range(1, n + 1):
+        job = Job(id=i, status='in_progress', booking_date=datetime.date(2024, 5, 1 + i % 28),
+                  scheduled_time=datetime.time(9 + i % 8, 30), route_order=i % 12, notes='Belt slipping')
+        if i % 2:
+            job.rental_machine = RentalMachine(id=i, brand='ProForm', model='505', serial_number=f'SN{i:06}')
+        else:
+            job.customer = Customer(id=i, first_name='Jo', last_name='Bloggs')
+            job.external_brand, job.external_model = 'Horizon', 'T101'
+        rows.append(job)
+    return rows
+
+
+# row template -> (row variable, builder)
+CASES = {
+    'staff/rows/dashboard.html': ('machines', machines),
+    'staff/rows/inventory_machines.html': ('machines', machines),
+    'staff/rows/inventory_parts.html': ('parts', parts),
+    'staff/rows/service_jobs.html': ('jobs', jobs),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--chunk', type=int, default=250, help='rows per render call, as in STAFF_STREAM_CHUNK')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    names = [alias for alias in ('django', 'jinja2') if alias in engines.templates]
+    if 'jinja2' not in names:
+        print("Jinja2 is not installed; timing Django templates only.")
+
+    request = RequestFactory().get('/')
+    request.user = User(username='bench', is_staff=True)
+
+    print(f"{args.rows} rows, {args.chunk} per render – ms per 1,000 rows (best of {args.runs})")
+    for template_name, (variable, build) in CASES.items():
+        rows = build(args.rows)
+        timings = {}
+        for alias in names:
+            template = engines[alias].get_template(template_name)
+            best = float('inf')
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                for start in range(0, len(rows), args.chunk):
+                    template.render({variable: rows[start:start + args.chunk]}, request)
+                best = min(best, time.perf_counter() - started)
+            timings[alias] = best * 1000 * 1000 / args.rows
+        line = '  '.join(f"{alias} {ms:7.1f}" for alias, ms in timings.items())
+        if len(timings) == 2:
+            line += f"  ({timings['django'] / timings['jinja2']:.1f}x)"
+        print(f"  {template_name:40} {line}")
+
+
+if __name__ == '__main__':
+    main()
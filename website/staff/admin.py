@@ -1,4 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 from .models import (
     RentalMachine,
     MachineSpecification,
@@ -9,8 +13,62 @@ from .models import (
     StaffProfile,
     ActivityLog,
     Timesheet,
-    Expense
+    Expense,
+    Task,
+    Customer
 )
+from .dedupe import merge_customers
+
+
+def _customers_matching(term):
+    return Customer.objects.filter(Q(last_name__istartswith=term) | Q(first_name__istartswith=term)).values('id')
+
+
+def _estimated_rows(queryset):
+    """The database's own row-count estimate for the queryset's table, or None if it has none.
+
+    SQLite keeps one in sqlite_stat1 once ANALYZE has run; PostgreSQL in pg_class.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = "SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:  # no statistics yet
+        return None
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Avoids an exact COUNT(*) over millions of rows on every changelist page.
+
+    Lists count at most ``cap`` rows. An unfiltered list that reaches the cap
+    uses the database's row estimate instead (the highest primary key would
+    overstate it once rows are deleted or archived).
+    """
+    cap = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        count = queryset.order_by()[:self.cap].count()
+        if count == self.cap and not queryset.query.where:
+            return max(_estimated_rows(queryset) or 0, count)
+        return count
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Changelist settings for the big history tables: no full-table counts, no per-row FK queries."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # skips the extra unfiltered COUNT(*) next to search results
+    list_per_page = 50
 
 @admin.register(RentalMachine)
 class RentalMachineAdmin(admin.ModelAdmin):
@@ -24,28 +82,95 @@ class MachineSpecificationAdmin(admin.ModelAdmin):
     search_fields = ('brand', 'model', 'motor_model')
 
 @admin.register(RentalRecord)
-class RentalRecordAdmin(admin.ModelAdmin):
+class RentalRecordAdmin(ScalableAdmin):
     list_display = ('machine', 'customer', 'start_date', 'due_date', 'return_date')
     list_filter = ('start_date', 'due_date', 'return_date')
+    list_select_related = ('machine', 'customer')  # __str__ and list_display both need them
+    date_hierarchy = 'start_date'
+    search_fields = ('machine__serial_number', 'customer__last_name')  # see get_search_results
+    search_help_text = "Exact machine serial, or start of the customer's first/last name"
+    raw_id_fields = ('machine', 'customer')
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(
+            Q(machine_id__in=RentalMachine.objects.filter(serial_number=term).values('id')) |
+            Q(customer_id__in=_customers_matching(term))
+        ), False
 
 @admin.register(Job)
-class JobAdmin(admin.ModelAdmin):
-    list_display = ('id', 'rental_machine', 'customer', 'status', 'booking_date', 'confirmed', 'date_created')
+class JobAdmin(ScalableAdmin):
+    list_display = ('id', 'rental_machine', 'customer', 'status', 'booking_date', 'confirmed',
+                    'technician', 'route_order', 'scheduled_time', 'date_created')
     list_filter = ('status', 'confirmed', 'booking_date', 'date_created')
-    search_fields = ('rental_machine__serial_number', 'rental_machine__brand', 'rental_machine__model',
-                     'customer__first_name', 'customer__last_name', 'external_brand', 'external_model',
-                     'external_serial')
+    list_select_related = ('rental_machine', 'customer', 'treadmill', 'technician')
+    search_fields = ('rental_machine__serial_number', 'customer__last_name', 'external_serial')  # see below
+    search_help_text = ("Job #, machine serial / brand / model, start of customer name, "
+                        "or exact external serial / brand")
+    date_hierarchy = 'date_created'
+    raw_id_fields = ('treadmill', 'rental_machine', 'customer')
     ordering = ('-date_created',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Match against the (small) machine and customer tables first and filter jobs by
+        # their indexed FK columns, instead of %LIKE% over every job joined to both.
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        machines = RentalMachine.objects.filter(
+            Q(serial_number=term) | Q(brand__istartswith=term) | Q(model__istartswith=term)
+        ).values('id')
+        q = (Q(rental_machine_id__in=machines) | Q(customer_id__in=_customers_matching(term)) |
+             Q(external_serial=term) | Q(external_brand=term))
+        if term.isdigit():
+            q |= Q(pk=int(term))
+        return queryset.filter(q), False
+
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ('id', 'first_name', 'last_name', 'phone', 'email', 'suburb', 'postcode')
+    search_fields = ('last_name', 'first_name', 'email', 'phone')
+    actions = ['merge_selected']
+
+    @admin.action(description="Merge selected customers into the oldest one")
+    def merge_selected(self, request, queryset):
+        ids = sorted(queryset.values_list('id', flat=True))
+        if len(ids) < 2:
+            self.message_user(request, "Select at least two customers to merge.", messages.WARNING)
+            return
+        removed = merge_customers([ids])
+        self.message_user(request, f"Merged {removed} duplicate(s) into customer #{ids[0]}.")
+
 @admin.register(Part)
 class PartAdmin(admin.ModelAdmin):
     list_display = ('name', 'part_number', 'quantity_in_stock', 'location')
     search_fields = ('name', 'part_number')
 
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after', 'date_created', 'date_finished')
+    list_filter = ('status',)
+    search_fields = ('name',)
+
 @admin.register(PartUsage)
-class PartUsageAdmin(admin.ModelAdmin):
+class PartUsageAdmin(ScalableAdmin):
     list_display = ('part', 'quantity_used', 'job', 'date_used')
     list_filter = ('date_used',)
+    # Job.__str__ shows its customer / rental machine / treadmill
+    list_select_related = ('part', 'job__customer', 'job__rental_machine', 'job__treadmill')
+    date_hierarchy = 'date_used'
+    search_fields = ('part__part_number', 'part__name')  # see get_search_results
+    search_help_text = "Exact part number, or start of the part name"
+    raw_id_fields = ('part', 'job', 'rental_record')
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        parts = Part.objects.filter(Q(part_number=term) | Q(name__istartswith=term)).values('id')
+        return queryset.filter(part_id__in=parts), False
 
 
 
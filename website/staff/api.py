@@ -0,0 +1,198 @@
+"""
+Read-only JSON API for internal integrations (``/api/<resource>/``).
+
+Every response is built from ``values()`` queries – no model instances, no
+per-row queries:
+
+* ``?fields=a,b`` picks columns (``id`` is always included);
+* ``?expand=customer,rentals`` nests related objects. Foreign keys are joined
+  into the same query (the ``select_related`` equivalent); reverse relations
+  cost one extra query for the whole page (the ``prefetch_related`` equivalent);
+* ``?ids=1,2,3`` fetches up to ``MAX_IDS`` rows in one go;
+* otherwise results are paged by primary key: ``?limit=`` and the opaque
+  ``next`` cursor from the previous page, so page 1000 is as cheap as page 1.
+
+Closed jobs and returned hires moved out by ``archive_closed`` (staff/archive.py)
+are served as ``archived_jobs`` / ``archived_rentals`` and can be expanded on
+machines and customers alongside the live ones. Ids are shared with the live
+tables, so an id is in one resource or the other.
+
+Bodies are encoded with orjson when it is installed (optional dependency),
+falling back to the standard json module.
+"""
+import base64
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .models import (
+    RentalMachine, Job, RentalRecord, Part, Customer, MachineSpecification, ArchivedJob, ArchivedRentalRecord,
+)
+
+try:
+    import orjson
+except ImportError:  # optional, ~2-5x faster for big pages
+    orjson = None
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_IDS = 500
+
+
+class ApiError(Exception):
+    pass
+
+
+def _columns(model, exclude=()):
+    return [f.attname for f in model._meta.concrete_fields if f.attname not in exclude]
+
+
+class Resource:
+    def __init__(self, model, fields=None, expand=None, many=None):
+        self.model = model
+        self.fields = fields or _columns(model)
+        self.expand = expand or {}   # name -> (FK field, fields of the related model)
+        self.many = many or {}       # name -> (related model, FK back to us, fields)
+
+
+SPEC_FIELDS = ['id', 'brand', 'model', 'motor_model', 'lcb_model', 'running_belt_size']
+CUSTOMER_FIELDS = ['id', 'first_name', 'last_name', 'phone', 'email', 'suburb', 'postcode']
+MACHINE_FIELDS = ['id', 'type', 'brand', 'model', 'serial_number', 'status', 'value_tier', 'location']
+
+MACHINE_RENTAL_FIELDS = ['id', 'customer_id', 'start_date', 'due_date', 'return_date']
+CUSTOMER_RENTAL_FIELDS = ['id', 'machine_id', 'start_date', 'due_date', 'return_date']
+CUSTOMER_JOB_FIELDS = ['id', 'status', 'booking_date', 'rental_machine_id']
+JOB_EXPAND = {
+    'customer': ('customer', CUSTOMER_FIELDS),
+    'rental_machine': ('rental_machine', MACHINE_FIELDS),
+    'technician': ('technician', ['id', 'name', 'phone', 'email']),
+    'specification': ('specification', SPEC_FIELDS),
+}
+RENTAL_EXPAND = {
+    'machine': ('machine', MACHINE_FIELDS),
+    'customer': ('customer', CUSTOMER_FIELDS),
+}
+
+RESOURCES = {
+    'machines': Resource(RentalMachine, expand={
+        'specification': ('specification', SPEC_FIELDS),
+    }, many={
+        'rentals': (RentalRecord, 'machine', MACHINE_RENTAL_FIELDS),
+        'archived_rentals': (ArchivedRentalRecord, 'machine', MACHINE_RENTAL_FIELDS),
+    }),
+    'jobs': Resource(Job, expand=JOB_EXPAND),
+    'archived_jobs': Resource(ArchivedJob, expand=JOB_EXPAND),
+    'rentals': Resource(RentalRecord, expand=RENTAL_EXPAND),
+    'archived_rentals': Resource(ArchivedRentalRecord, expand=RENTAL_EXPAND),
+    'parts': Resource(Part),
+    'customers': Resource(Customer, many={
+        'rentals': (RentalRecord, 'customer', CUSTOMER_RENTAL_FIELDS),
+        'archived_rentals': (ArchivedRentalRecord, 'customer', CUSTOMER_RENTAL_FIELDS),
+        'jobs': (Job, 'customer', CUSTOMER_JOB_FIELDS),
+        'archived_jobs': (ArchivedJob, 'customer', CUSTOMER_JOB_FIELDS),
+    }),
+    'specs': Resource(MachineSpecification, many={
+        'machines': (RentalMachine, 'specification', MACHINE_FIELDS),
+    }),
+}
+
+
+def _split(value):
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        prefix, _, value = raw.partition(':')
+        if prefix != 'id':
+            raise ValueError
+        return int(value)
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError("Invalid cursor")
+
+
+def _nest(row, expand):
+    """Turn the flat ``customer__first_name`` columns of a joined values() row into nested dicts."""
+    for name, (fk, fields) in expand.items():
+        related = {field: row.pop(f"{fk}__{field}") for field in fields}
+        row[name] = related if related['id'] is not None else None
+    return row
+
+
+def fetch(resource_name, params, pk=None):
+    """Run the query for one API call; returns (rows, next_cursor)."""
+    resource = RESOURCES[resource_name]
+    model = resource.model
+
+    fields = _split(params.get('fields')) or resource.fields
+    unknown = set(fields) - set(resource.fields)
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    fields = ['id'] + [f for f in fields if f != 'id']
+
+    expand_names = _split(params.get('expand'))
+    unknown = set(expand_names) - set(resource.expand) - set(resource.many)
+    if unknown:
+        raise ApiError(f"Cannot expand: {', '.join(sorted(unknown))}")
+    expand = {name: resource.expand[name] for name in expand_names if name in resource.expand}
+    many = {name: resource.many[name] for name in expand_names if name in resource.many}
+
+    joined = [f"{fk}__{field}" for fk, related_fields in expand.values() for field in related_fields]
+    queryset = model.objects.order_by('id').values(*fields, *joined)
+
+    next_cursor = None
+    if pk is not None:
+        rows = list(queryset.filter(id=pk))
+    elif params.get('ids'):
+        try:
+            ids = [int(v) for v in _split(params['ids'])]
+        except ValueError:
+            raise ApiError("ids must be a comma-separated list of integers")
+        if len(ids) > MAX_IDS:
+            raise ApiError(f"At most {MAX_IDS} ids per request")
+        rows = list(queryset.filter(id__in=ids))
+    else:
+        try:
+            limit = min(max(int(params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            raise ApiError("limit must be an integer")
+        if params.get('cursor'):
+            queryset = queryset.filter(id__gt=decode_cursor(params['cursor']))
+        rows = list(queryset[:limit + 1])  # one extra row tells us whether there is a next page
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['id'])
+
+    rows = [_nest(row, expand) for row in rows]
+    ids = [row['id'] for row in rows]
+    for name, (related_model, fk, related_fields) in many.items():
+        grouped = {pk: [] for pk in ids}
+        if ids:
+            related = (related_model.objects.filter(**{f"{fk}_id__in": ids}).order_by('id')
+                       .values(f"{fk}_id", *related_fields))
+            for item in related:
+                grouped[item.pop(f"{fk}_id")].append(item)
+        for row in rows:
+            row[name] = grouped[row['id']]
+    return rows, next_cursor
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+def json_response(data, status=200):
+    if orjson is not None:
+        body = orjson.dumps(data, default=_default)
+    else:
+        body = json.dumps(data, cls=DjangoJSONEncoder)
+    return HttpResponse(body, status=status, content_type='application/json')
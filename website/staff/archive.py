@@ -0,0 +1,88 @@
+"""
+Cold storage for closed work, so the hot tables the listing pages scan stay small.
+
+``archive_closed()`` moves these rows into ArchivedJob / ArchivedRentalRecord
+(same columns, same ids):
+
+* completed or cancelled Jobs finished (or, without a completion date, created)
+  before the cutoff;
+* RentalRecords returned before the cutoff.
+
+The cutoff is ``STAFF_ARCHIVE_AFTER_DAYS`` ago. Each batch is one
+transaction: copy the rows with ``bulk_create``, point their PartUsage rows at
+the archived copy, then delete the originals with a plain ``DELETE … WHERE id
+IN`` (no per-row signals). Per batch, the listing ETags are bumped once and
+sync clients get tombstones. The utilization report counts archived rows too
+(staff/reports.py), so its figures don't move.
+
+Archived rows are read only on demand: rental_detail shows them (with their
+parts) under ``?archived=1``, the rentals/jobs CSV exports include them, and
+the API serves them as ``archived_jobs`` / ``archived_rentals``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import sync
+from .models import Job, RentalRecord, PartUsage, ArchivedJob, ArchivedRentalRecord
+from .signals import bulk_changed
+
+BATCH_SIZE = 500
+CLOSED_JOB_STATUSES = ('complete', 'cancelled')
+
+
+def archive_after_days():
+    return getattr(settings, 'STAFF_ARCHIVE_AFTER_DAYS', 365)
+
+
+def closed_jobs(cutoff):
+    return Job.objects.filter(status__in=CLOSED_JOB_STATUSES).filter(
+        Q(date_completed__lt=cutoff) | Q(date_completed__isnull=True, date_created__lt=cutoff))
+
+
+def closed_rentals(cutoff):
+    return RentalRecord.objects.filter(return_date__lt=cutoff.date())
+
+
+# live model -> (archive model, PartUsage FK to the live row, PartUsage FK to the archived row)
+TARGETS = {
+    Job: (ArchivedJob, 'job_id', 'archived_job_id'),
+    RentalRecord: (ArchivedRentalRecord, 'rental_record_id', 'archived_rental_record_id'),
+}
+
+
+def _delete_rows(model, ids):
+    # queryset.delete() would load every row to send post_delete; nothing references these rows any more
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {model._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def _move(model, queryset, batch_size):
+    archive_model, live_fk, archived_fk = TARGETS[model]
+    fields = [f.attname for f in archive_model._meta.concrete_fields if f.attname != 'archived_at']
+    moved = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return moved
+            now = timezone.now()
+            archive_model.objects.bulk_create(
+                [archive_model(archived_at=now, **row) for row in model.objects.filter(id__in=ids).values(*fields)])
+            PartUsage.objects.filter(**{f'{live_fk}__in': ids}).update(**{archived_fk: F(live_fk), live_fk: None})
+            _delete_rows(model, ids)
+            sync.log_changes(model, ids, deleted=True)
+            bulk_changed(model)
+        moved += len(ids)
+
+
+def archive_closed(days=None, batch_size=BATCH_SIZE, dry_run=False):
+    """Archive closed jobs and hires older than ``days``; returns {'jobs': n, 'rentals': n}."""
+    cutoff = timezone.now() - timedelta(days=archive_after_days() if days is None else days)
+    jobs, rentals = closed_jobs(cutoff), closed_rentals(cutoff)
+    if dry_run:
+        return {'jobs': jobs.count(), 'rentals': rentals.count()}
+    return {'jobs': _move(Job, jobs, batch_size), 'rentals': _move(RentalRecord, rentals, batch_size)}
@@ -0,0 +1,60 @@
+"""
+Response compression that keeps streamed pages streaming.
+
+Django's GZipMiddleware buffers a streamed response inside the gzip encoder
+until it has a full deflate block, so rows (and Server-Sent Events) sit on the
+server instead of reaching the browser. ``GZipMiddleware`` here:
+
+* leaves ``text/event-stream`` responses alone: each event must arrive the
+  moment it is sent, and events are tiny anyway;
+* compresses other streamed responses (the listing pages, CSV exports) as one
+  gzip stream, flushed after every chunk, so each chunk of rows leaves at once;
+* hands ordinary responses to Django's middleware unchanged.
+"""
+import zlib
+
+from django.middleware import gzip
+from django.utils.cache import patch_vary_headers
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS  # zlib framing -> gzip header and trailer
+
+
+def _compressor():
+    return zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+
+
+def _flushed(chunks):
+    compressor = _compressor()
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+async def _aflushed(chunks):
+    compressor = _compressor()
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class GZipMiddleware(gzip.GZipMiddleware):
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if not response.streaming:
+            return super().process_response(request, response)
+
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not gzip.re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+
+        chunks = response.streaming_content
+        response.streaming_content = _aflushed(chunks) if response.is_async else _flushed(chunks)
+        del response.headers['Content-Length']
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
@@ -0,0 +1,194 @@
+"""
+Duplicate customer detection and merging.
+
+``new_hire`` creates a fresh Customer whenever staff tick "add customer", so the
+same person turns up several times with "0412 345 678" / "+61412345678" or
+"Jo.Bloggs@Example.com" / "jo.bloggs@example.com".
+
+``find_duplicates()`` never compares all pairs. Each customer is put into a few
+*blocks* by normalized key – email, phone (last 9 digits), phone suffix (last 6)
+and postcode + start of surname – and only customers sharing a block are
+scored. Pairs above the threshold are joined into groups (union-find); the
+oldest customer in each group survives.
+
+A shared phone and email isn't enough to merge on its own: people in one
+household often share both. ``find_duplicates(same_name=True)`` only joins
+pairs whose names also agree (see ``names_match``); ``dedupe_customers --merge``
+merges those groups and leaves the rest in the report for staff to review.
+
+``merge_customers()`` re-points RentalRecord.customer and Job.customer with a
+chunked ``UPDATE … CASE`` (a couple of queries per 500 duplicates), copies any
+details the survivor is missing, then deletes the duplicates.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Case, When, Value
+
+from .models import Customer, RentalRecord, Job, ArchivedRentalRecord, ArchivedJob
+from .signals import bulk_changed
+
+DUPLICATE_THRESHOLD = 0.6
+MAX_BLOCK_SIZE = 200   # a block this big is a shared office number/placeholder, not one person
+MERGE_CHUNK = 500
+
+# Each signal's contribution to the score (sums to 1.0 for a perfect match)
+WEIGHTS = {'email': 0.35, 'phone': 0.35, 'name': 0.2, 'postcode': 0.1}
+
+FILL_FIELDS = ['phone', 'email', 'street_address', 'suburb', 'postcode']
+
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_phone(phone):
+    """Last 9 digits, so 0412 345 678, +61 412 345 678 and 412345678 agree."""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-9:] if len(digits) >= 8 else ''
+
+
+def normalize_email(email):
+    email = (email or '').strip().lower()
+    if '@' not in email:
+        return ''
+    local, _, domain = email.partition('@')
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Record:
+    __slots__ = ('id', 'email', 'phone', 'first', 'last', 'postcode', '_grams')
+
+    def __init__(self, row):
+        customer_id, first, last, phone, email, postcode = row
+        self.id = customer_id
+        self.email = normalize_email(email)
+        self.phone = normalize_phone(phone)
+        self.first = NON_ALNUM_RE.sub('', (first or '').lower())
+        self.last = NON_ALNUM_RE.sub('', (last or '').lower())
+        self.postcode = (postcode or '').strip()
+        self._grams = None
+
+    @property
+    def grams(self):
+        # Only records that share a block get scored, so build trigrams on demand
+        if self._grams is None:
+            self._grams = _trigrams(f"{self.first} {self.last}".strip())
+        return self._grams
+
+    def blocks(self):
+        if self.email:
+            yield 'e', self.email
+        if self.phone:
+            yield 'p', self.phone
+            yield 's', self.phone[-6:]
+        if self.postcode and self.last:
+            yield 'n', self.postcode, self.last[:4]
+
+
+def names_match(a, b):
+    """Same surname, and first names that agree ("Jo" / "Joanne" / "J" count as agreeing)."""
+    if not (a.first and b.first and a.last and a.last == b.last):
+        return False
+    return a.first.startswith(b.first) or b.first.startswith(a.first)
+
+
+def score(a, b):
+    """0–1 likelihood that two customer records are the same person."""
+    total = 0.0
+    if a.email and a.email == b.email:
+        total += WEIGHTS['email']
+    if a.phone and a.phone == b.phone:
+        total += WEIGHTS['phone']
+    if a.grams and b.grams:
+        total += WEIGHTS['name'] * 2 * len(a.grams & b.grams) / (len(a.grams) + len(b.grams))
+    if a.postcode and a.postcode == b.postcode:
+        total += WEIGHTS['postcode']
+    return total
+
+
+def find_duplicates(customers=None, threshold=DUPLICATE_THRESHOLD, same_name=False):
+    """Return duplicate groups as lists of customer ids, oldest (survivor) first.
+
+    With ``same_name``, pairs must also pass ``names_match`` – the groups that are safe to merge unattended.
+    """
+    customers = customers if customers is not None else Customer.objects.all()
+    records, blocks = {}, {}
+    rows = customers.values_list('id', 'first_name', 'last_name', 'phone', 'email', 'postcode')
+    for row in rows.iterator(chunk_size=5000):
+        record = _Record(row)
+        records[record.id] = record
+        for key in record.blocks():
+            blocks.setdefault(key, []).append(record.id)
+
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:  # path compression
+            parent[x], x = root, parent[x]
+        return root
+
+    seen = set()
+    for ids in blocks.values():
+        if len(ids) < 2 or len(ids) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                if (a, b) in seen:
+                    continue
+                seen.add((a, b))
+                if same_name and not names_match(records[a], records[b]):
+                    continue
+                if score(records[a], records[b]) >= threshold:
+                    ra, rb = find(a), find(b)
+                    if ra != rb:
+                        parent[max(ra, rb)] = min(ra, rb)
+
+    groups = {}
+    for customer_id in parent:
+        groups.setdefault(find(customer_id), set()).add(customer_id)
+    return [sorted(members | {root}) for root, members in sorted(groups.items())]
+
+
+def merge_customers(groups):
+    """Merge each group (list of ids, survivor first) into its survivor. Returns duplicates removed."""
+    survivor_of = {dup: group[0] for group in groups for dup in group[1:]}
+    if not survivor_of:
+        return 0
+    with transaction.atomic():
+        # Fill the survivor's blank contact details from its duplicates (oldest duplicate first)
+        customers = Customer.objects.in_bulk(set(survivor_of) | set(survivor_of.values()))
+        changed = {}
+        for dup_id in sorted(survivor_of):
+            survivor, dup = customers[survivor_of[dup_id]], customers[dup_id]
+            for field in FILL_FIELDS:
+                if not getattr(survivor, field) and getattr(dup, field):
+                    setattr(survivor, field, getattr(dup, field))
+                    changed[survivor.pk] = survivor
+            if dup.notes and dup.notes not in (survivor.notes or ''):
+                survivor.notes = '\n'.join(filter(None, [survivor.notes, dup.notes]))
+                changed[survivor.pk] = survivor
+        if changed:
+            Customer.objects.bulk_update(changed.values(), FILL_FIELDS + ['notes'], batch_size=100)
+
+        dup_ids, job_ids = sorted(survivor_of), []
+        for start in range(0, len(dup_ids), MERGE_CHUNK):
+            chunk = dup_ids[start:start + MERGE_CHUNK]
+            new_customer = Case(*[When(customer_id=d, then=Value(survivor_of[d])) for d in chunk])
+            RentalRecord.objects.filter(customer_id__in=chunk).update(customer_id=new_customer)
+            jobs = Job.objects.filter(customer_id__in=chunk)
+            job_ids += jobs.values_list('id', flat=True)
+            jobs.update(customer_id=new_customer)
+            ArchivedRentalRecord.objects.filter(customer_id__in=chunk).update(customer_id=new_customer)
+            ArchivedJob.objects.filter(customer_id__in=chunk).update(customer_id=new_customer)
+            Customer.objects.filter(id__in=chunk).delete()
+        bulk_changed(RentalRecord)
+        bulk_changed(Job, ids=job_ids)
+        bulk_changed(Customer, ids=list(changed))
+    return len(dup_ids)
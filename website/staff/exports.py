@@ -0,0 +1,153 @@
+"""
+Streaming CSV exports for accounting / insurers.
+
+Each export is a ``values_list()`` over one table (joins done in SQL, no model
+instances) read with ``.iterator(chunk_size=...)`` and written row by row into a
+``StreamingHttpResponse``, so memory stays flat and the download starts at once.
+
+Rentals and jobs are a ``UNION ALL`` of the live and archive tables
+(staff/archive.py), so history doesn't drop out of the CSVs once
+``archive_closed`` runs; an "Archived" column tells the rows apart.
+"""
+import csv
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .filters import filter_machines, filter_parts
+from .models import (
+    RentalMachine, RentalRecord, Job, Part, PartUsage, Expense, Timesheet, ArchivedJob, ArchivedRentalRecord,
+)
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() just hands the line back (see Django's streaming CSV docs)."""
+    def write(self, value):
+        return value
+
+
+def _id_param(request, name):
+    """``?name=`` as an id, or None if absent; anything else is a 400, not a 500 from the ORM."""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"?{name}= must be a number.")
+
+
+def _machines(request):
+    machines = filter_machines(RentalMachine.objects.all(), request.GET)
+    # Same order as the page: its ?sort= if given, otherwise by id
+    return machines if machines.ordered else machines.order_by('id')
+
+
+def _with_archive(live, archived, filters, ordering):
+    """The live and archived rows matching ``filters``, for a UNION ALL ordered by ``ordering``."""
+    return [live.objects.filter(**filters).annotate(archived=Value(False)).order_by(*ordering),
+            archived.objects.filter(**filters).annotate(archived=Value(True))]
+
+
+def _rentals(request):
+    filters = {}
+    machine_id, customer_id = _id_param(request, 'machine'), _id_param(request, 'customer')
+    if machine_id is not None:
+        filters['machine_id'] = machine_id
+    if customer_id is not None:
+        filters['customer_id'] = customer_id
+    return _with_archive(RentalRecord, ArchivedRentalRecord, filters, ['-start_date', 'id'])
+
+
+def _jobs(request):
+    filters = {'status': request.GET['status']} if request.GET.get('status') else {}
+    return _with_archive(Job, ArchivedJob, filters, ['-booking_date', '-date_created'])
+
+
+def _part_usage(request):
+    usage = PartUsage.objects.order_by('-date_used', 'id')
+    if request.GET.get('q'):
+        usage = usage.filter(part__in=filter_parts(Part.objects.all(), request.GET))
+    job_id = _id_param(request, 'job')
+    if job_id is not None:
+        usage = usage.filter(Q(job_id=job_id) | Q(archived_job_id=job_id))
+    return usage
+
+
+def _own_or_all(model, request):
+    """Profile shows a user their own rows; staff may export everyone's or one user's (?user=)."""
+    rows = model.objects.order_by('-date', 'id')
+    if not request.user.is_staff:
+        return rows.filter(user=request.user)
+    user_id = _id_param(request, 'user')
+    if user_id is not None:
+        return rows.filter(user_id=user_id)
+    return rows
+
+
+EXPORTS = {
+    'machines': (_machines, [
+        ('ID', 'id'), ('Type', 'type'), ('Brand', 'brand'), ('Model', 'model'),
+        ('Serial Number', 'serial_number'), ('Condition', 'condition'), ('Status', 'status'),
+        ('Value Tier', 'value_tier'), ('Location', 'location'), ('Notes', 'notes'),
+    ]),
+    'rentals': (_rentals, [
+        ('ID', 'id'), ('Machine Serial', 'machine__serial_number'), ('Machine Brand', 'machine__brand'),
+        ('Machine Model', 'machine__model'), ('Customer First Name', 'customer__first_name'),
+        ('Customer Last Name', 'customer__last_name'), ('Start Date', 'start_date'),
+        ('Due Date', 'due_date'), ('Return Date', 'return_date'), ('Notes', 'notes'), ('Archived', 'archived'),
+    ]),
+    'jobs': (_jobs, [
+        ('ID', 'id'), ('Status', 'status'), ('Booking Date', 'booking_date'), ('Confirmed', 'confirmed'),
+        ('Created', 'date_created'), ('Completed', 'date_completed'),
+        ('Technician', 'technician__name'), ('Machine Serial', 'rental_machine__serial_number'),
+        ('Customer First Name', 'customer__first_name'), ('Customer Last Name', 'customer__last_name'),
+        ('External Brand', 'external_brand'), ('External Model', 'external_model'),
+        ('External Serial', 'external_serial'), ('Notes', 'notes'), ('Archived', 'archived'),
+    ]),
+    'part_usage': (_part_usage, [
+        ('ID', 'id'), ('Date Used', 'date_used'), ('Part', 'part__name'), ('Part Number', 'part__part_number'),
+        ('Quantity Used', 'quantity_used'), ('Job', Coalesce('job_id', 'archived_job_id')),
+        ('Rental Record', Coalesce('rental_record_id', 'archived_rental_record_id')),
+    ]),
+    'expenses': (lambda request: _own_or_all(Expense, request), [
+        ('ID', 'id'), ('User', 'user__username'), ('Date', 'date'),
+        ('Description', 'description'), ('Amount', 'amount'),
+    ]),
+    'timesheets': (lambda request: _own_or_all(Timesheet, request), [
+        ('ID', 'id'), ('User', 'user__username'), ('Date', 'date'), ('Hours Worked', 'hours_worked'),
+    ]),
+}
+
+
+def stream_csv(request, kind):
+    get_queryset, columns = EXPORTS[kind]
+    headers = [header for header, _ in columns]
+    lookups = [lookup for _, lookup in columns]
+    querysets = get_queryset(request)
+    if isinstance(querysets, list):
+        first, *rest = querysets
+        rows = first.order_by().values_list(*lookups).union(
+            *[qs.values_list(*lookups) for qs in rest], all=True).order_by(*first.query.order_by)
+    else:
+        rows = querysets.values_list(*lookups)
+    rows = rows.iterator(chunk_size=CHUNK_SIZE)
+
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    filename = f"{kind}-{timezone.localdate():%Y%m%d}.csv"
+    return StreamingHttpResponse(
+        lines(),
+        content_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
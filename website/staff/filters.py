@@ -0,0 +1,45 @@
+"""Listing filters shared by the HTML pages and their CSV exports, so both always agree."""
+from django.db.models import F, Q
+
+from .models import MachineMaintenanceDue
+
+# ?service= -> lowest MachineMaintenanceDue.priority shown
+SERVICE_FILTERS = {'due': MachineMaintenanceDue.DUE_SOON, 'overdue': MachineMaintenanceDue.OVERDUE}
+
+
+def filter_machines(machines, params):
+    """Dashboard/inventory filters: ?q= (brand/model/serial), ?status=, ?tier=, ?service=due|overdue;
+    ?sort=service puts the most urgent services first."""
+    q = (params.get('q') or '').strip()
+    status_filter = params.get('status', '')
+    tier_filter = params.get('tier', '')
+    service_filter = params.get('service', '')
+
+    # Search (Q to preserve chaining)
+    if q:
+        machines = machines.filter(
+            Q(brand__icontains=q) |
+            Q(model__icontains=q) |
+            Q(serial_number__icontains=q)
+        )
+    if status_filter:
+        machines = machines.filter(status=status_filter)
+    if tier_filter:
+        machines = machines.filter(value_tier=tier_filter)
+    # Service due dates come only from the precomputed table (staff/maintenance.py)
+    if service_filter in SERVICE_FILTERS:
+        machines = machines.filter(maintenance_due__priority__gte=SERVICE_FILTERS[service_filter])
+    if params.get('sort') == 'service':
+        machines = machines.order_by(F('maintenance_due__priority').desc(nulls_last=True),
+                                     F('maintenance_due__next_due').asc(nulls_last=True), 'id')
+    return machines
+
+
+def filter_parts(parts, params):
+    """Inventory part search: ?q= (name/part number/compatible models)."""
+    q = (params.get('q') or '').strip()
+    if q:
+        parts = parts.filter(
+            Q(name__icontains=q) | Q(part_number__icontains=q) | Q(compatible_models__icontains=q)
+        )
+    return parts
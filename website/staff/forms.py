@@ -7,7 +7,7 @@ class MachineSpecificationForm(forms.ModelForm):
         fields = [
             'brand', 'model', 'motor_model', 'lcb_model', 'running_belt_size',
             'bolt_types', 'incline_motor', 'speed_sensor', 'lubricant_type',
-            'voltage_rating', 'current_rating', 'notes', 'image', 'manual_file'
+            'voltage_rating', 'current_rating', 'service_interval_days', 'notes', 'image', 'manual_file'
         ]
 
 
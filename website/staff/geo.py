@@ -0,0 +1,268 @@
+"""
+Offline geocoding and "nearest available machine" lookup.
+
+Places come from ``staff/data/au_places.csv`` (postcode, suburb, state, lat/lon,
+population – GeoNames data, CC BY 4.0). The bundled file holds locality
+centroids only; ``manage.py load_postcodes AU.txt`` merges in GeoNames'
+postal-code export. Until then, a postcode resolves to the mean point of the
+localities customers have given with it (rebuilt when a customer changes), so
+"3000" works once one customer in Melbourne 3000 is on file.
+
+Machine locations are free text (``new_hire`` writes the customer's suburb or
+street address), so ``Gazetteer.locate()`` tries a 4-digit postcode first and
+then the longest known place name, reading the address from the end.
+
+Available machines are grouped by resolved point and put in a KD-tree over 3-D
+unit vectors – straight-line distance through the sphere ranks points exactly
+like great-circle distance, with no wrap-around cases. One tree per
+(type, tier), rebuilt only when the RentalMachine change counter moves.
+"""
+import csv
+import heapq
+import math
+import os
+import re
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+
+from .models import Customer, RentalMachine
+from .versions import get_versions
+
+EARTH_RADIUS_KM = 6371.0
+MAX_NAME_WORDS = 4
+
+POSTCODE_RE = re.compile(r'\b(\d{4})\b')
+STATE_RE = re.compile(r'\b(NSW|VIC|QLD|SA|WA|TAS|NT|ACT)\b')
+WORD_RE = re.compile(r"[A-Z][A-Z'\-]*")
+ABBREVIATIONS = {'SAINT': 'ST', 'MOUNT': 'MT', 'PORT': 'PT'}  # GeoNames spells these out, addresses don't
+
+
+def places_file():
+    default = os.path.join(os.path.dirname(__file__), 'data', 'au_places.csv')
+    return str(getattr(settings, 'STAFF_PLACES_FILE', default))
+
+
+def state_for_postcode(postcode):
+    """Australian state/territory that a 4-digit postcode is allocated to."""
+    n = int(postcode)
+    if 200 <= n <= 299 or 2600 <= n <= 2618 or 2900 <= n <= 2920:
+        return 'ACT'
+    if 800 <= n <= 999:
+        return 'NT'
+    return {'1': 'NSW', '2': 'NSW', '3': 'VIC', '4': 'QLD', '5': 'SA',
+            '6': 'WA', '7': 'TAS', '8': 'VIC', '9': 'QLD'}.get(postcode[0])
+
+
+def normalize_words(text):
+    return [ABBREVIATIONS.get(w, w) for w in WORD_RE.findall(text.upper())]
+
+
+def to_vector(lat, lon):
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def chord_to_km(squared_chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+def _middle(points):
+    return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+
+class Gazetteer:
+    def __init__(self, rows, known_postcodes=()):
+        """``rows`` are places-file rows; ``known_postcodes`` are (postcode, suburb) pairs."""
+        postcode_points = {}
+        self.suburbs = {}   # (NAME, STATE) -> (lat, lon)
+        self.names = {}     # NAME -> (lat, lon) of the most populous place with that name
+        populations = {}
+        for row in rows:
+            lat, lon = float(row['latitude']), float(row['longitude'])
+            population = int(row.get('population') or 0)
+            if row.get('postcode'):
+                postcode_points.setdefault(row['postcode'], []).append((lat, lon))
+            name = ' '.join(normalize_words(row['suburb']))
+            if (name, row['state']) not in self.suburbs:
+                self.suburbs[name, row['state']] = (lat, lon)
+            if population >= populations.get(name, -1):
+                self.names[name] = (lat, lon)
+                populations[name] = population
+        # A postcode covers several localities; use the middle of them
+        self.postcodes = {code: _middle(points) for code, points in postcode_points.items()}
+
+        # Postcodes the file lacks: the localities addresses give with them
+        seen = {}
+        for code, place in known_postcodes:
+            code = (code or '').strip()
+            if len(code) != 4 or not code.isdigit() or code in self.postcodes:
+                continue
+            point = self._find_name(normalize_words(place or ''), state_for_postcode(code))
+            if point:
+                seen.setdefault(code, set()).add(point)
+        self.postcodes.update((code, _middle(sorted(points))) for code, points in seen.items())
+
+    def locate(self, text, postcode=''):
+        """Return (lat, lon) for an address/suburb/postcode string, or None."""
+        text = (text or '').upper()
+        codes = [postcode.strip()] if postcode and postcode.strip().isdigit() else []
+        codes += POSTCODE_RE.findall(text)
+        for code in codes:
+            if code in self.postcodes:
+                return self.postcodes[code]
+
+        state = STATE_RE.search(text)
+        state = state.group(1) if state else (state_for_postcode(codes[0]) if codes else None)
+        return self._find_name([w for w in normalize_words(text) if not STATE_RE.fullmatch(w)], state)
+
+    def _find_name(self, words, state):
+        # The suburb is normally at the end of an address; prefer longer names ("MT DRUITT")
+        for end in range(len(words), 0, -1):
+            for start in range(max(0, end - MAX_NAME_WORDS), end):
+                name = ' '.join(words[start:end])
+                point = self.suburbs.get((name, state)) if state else self.names.get(name)
+                if point:
+                    return point
+        return None
+
+
+@lru_cache(maxsize=1)
+def _place_rows():
+    with open(places_file(), newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+_gazetteer = (None, None)  # (Customer change counter, Gazetteer)
+
+
+def gazetteer():
+    """The places file plus the postcodes learnt from customers, cached until a customer changes."""
+    global _gazetteer
+    version = get_versions(Customer)[Customer._meta.label_lower]
+    built_for, places = _gazetteer
+    if built_for != version:
+        pairs = (Customer.objects.exclude(postcode__isnull=True).exclude(postcode='')
+                 .exclude(suburb__isnull=True).exclude(suburb='')
+                 .values_list('postcode', 'suburb').distinct().order_by())
+        places = Gazetteer(_place_rows(), pairs.iterator(chunk_size=5000))
+        _gazetteer = (version, places)
+    return places
+
+
+class KDTree:
+    """Static 3-D KD-tree; ``nearest()`` walks it best-first so callers can stop at any k."""
+
+    def __init__(self, items):
+        # items: [(vector, payload)]
+        self.root = self._build(list(items), 0)
+
+    def _build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        return (items[mid][0], items[mid][1], axis,
+                self._build(items[:mid], depth + 1), self._build(items[mid + 1:], depth + 1))
+
+    def nearest(self, vector):
+        """Yield (squared distance, payload) in increasing distance order."""
+        if self.root is None:
+            return
+        counter = 0  # tie-breaker so the heap never compares nodes
+        heap = [(0.0, counter, self.root, None)]
+        while heap:
+            bound, _, node, payload = heapq.heappop(heap)
+            if node is None:
+                yield bound, payload
+                continue
+            point, node_payload, axis, left, right = node
+            dist = sum((a - b) ** 2 for a, b in zip(point, vector))
+            diff = vector[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            counter += 3
+            heapq.heappush(heap, (dist, counter, None, node_payload))
+            if near is not None:
+                heapq.heappush(heap, (bound, counter + 1, near, None))
+            if far is not None:
+                heapq.heappush(heap, (max(bound, diff * diff), counter + 2, far, None))
+
+
+class MachineIndex:
+    def __init__(self, rows, places, depot=None):
+        by_point, self.unlocated = {}, 0
+        resolved = {}
+        for machine_id, location in rows:
+            if location not in resolved:
+                resolved[location] = places.locate(location) or depot
+            point = resolved[location]
+            if point is None:
+                self.unlocated += 1
+            else:
+                by_point.setdefault(point, []).append(machine_id)
+        self.size = sum(len(ids) for ids in by_point.values())
+        self.tree = KDTree((to_vector(*point), ids) for point, ids in by_point.items())
+
+    def nearest(self, point, limit):
+        """Return [(machine_id, distance_km)] for the ``limit`` closest machines."""
+        found = []
+        for squared, ids in self.tree.nearest(to_vector(*point)):
+            km = chord_to_km(squared)
+            found.extend((machine_id, km) for machine_id in sorted(ids))
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+
+_lock = threading.Lock()
+_indexes = {}
+_indexed_version = None
+
+
+def depot_point():
+    depot = getattr(settings, 'STAFF_DEPOT_LOCATION', '')
+    return gazetteer().locate(depot) if depot else None
+
+
+def machine_index(machine_type=None, tier=None):
+    """Index of available machines of a type/tier (None = any), cached until a machine or customer changes."""
+    global _indexed_version
+    version = tuple(get_versions(RentalMachine, Customer).values())  # customers can add postcodes
+    key = (machine_type, tier)
+    with _lock:
+        if version != _indexed_version:
+            _indexes.clear()
+            _indexed_version = version
+        if key in _indexes:
+            return _indexes[key]
+    machines = RentalMachine.objects.filter(status='available')
+    if machine_type:
+        machines = machines.filter(type=machine_type)
+    if tier:
+        machines = machines.filter(value_tier=tier)
+    index = MachineIndex(machines.values_list('id', 'location').iterator(chunk_size=5000),
+                         gazetteer(), depot_point())
+    with _lock:
+        if version == _indexed_version:
+            _indexes[key] = index
+    return index
+
+
+def locate_customer(customer):
+    address = ', '.join(filter(None, [customer.street_address, customer.suburb]))
+    return gazetteer().locate(address, postcode=customer.postcode or '')
+
+
+def nearest_available(customer, machine_type=None, tier=None, limit=10):
+    """Closest available machines to ``customer`` as (origin, [(machine, distance_km)]).
+
+    ``origin`` is None when the customer's address can't be placed.
+    """
+    origin = locate_customer(customer)
+    if origin is None:
+        return None, []
+    ranked = machine_index(machine_type, tier).nearest(origin, limit)
+    machines = RentalMachine.objects.in_bulk([machine_id for machine_id, _ in ranked])
+    return origin, [(machines[mid], km) for mid, km in ranked if mid in machines]
@@ -0,0 +1,65 @@
+"""
+Starting a hire, safe against two staff members hiring the same machine at once.
+
+``start_hire()`` does everything in one transaction, and the machine is claimed
+with a conditional ``UPDATE … SET status='rented' WHERE id=… AND
+status='available'``. Only one concurrent request can match that row; the
+others update nothing and get ``MachineUnavailable``. No hire record or new
+customer is left behind for them.
+
+SQLite allows one writer at a time. A writer that can't get the lock in time
+fails with "database is locked", so the whole transaction is retried
+``STAFF_HIRE_RETRIES`` times with a short, growing, jittered pause.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+from .models import RentalMachine, RentalRecord, Customer
+from .signals import bulk_changed
+
+RETRY_DELAY = 0.05  # seconds, doubled after each attempt
+
+
+class MachineUnavailable(Exception):
+    pass
+
+
+def _locked(error):
+    return 'locked' in str(error)  # "database is locked" / "database table is locked"
+
+
+def start_hire(machine_id, customer, start_date, due_date, notes=''):
+    """Hire the machine out and return the RentalRecord; raises MachineUnavailable if it isn't available.
+
+    ``customer`` is a saved Customer, or a dict of fields for a new one (created in the same transaction).
+    """
+    retries = getattr(settings, 'STAFF_HIRE_RETRIES', 5)
+    for attempt in range(retries + 1):
+        try:
+            return _start_hire(machine_id, customer, start_date, due_date, notes)
+        except OperationalError as error:
+            if not _locked(error) or attempt == retries:
+                raise
+        time.sleep(RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def _start_hire(machine_id, customer, start_date, due_date, notes):
+    with transaction.atomic():
+        if isinstance(customer, dict):
+            customer = Customer(**customer)
+        # The machine goes to the customer's suburb/address
+        location = (customer.suburb or customer.street_address or '').strip() or 'On Hire'
+        claimed = RentalMachine.objects.filter(id=machine_id, status='available').update(
+            status='rented', location=location)
+        if not claimed:
+            raise MachineUnavailable("This machine is no longer available – someone else may have just hired it.")
+        if customer.pk is None:
+            customer.save()
+        record = RentalRecord.objects.create(machine_id=machine_id, customer=customer, start_date=start_date,
+                                             due_date=due_date, notes=notes)
+        # update() skips the signals: bump the listing ETags and push the new status to open pages
+        bulk_changed(RentalMachine, objs=list(RentalMachine.objects.filter(id=machine_id)))
+    return record
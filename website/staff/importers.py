@@ -0,0 +1,205 @@
+"""
+Streaming bulk import of supplier spreadsheets (CSV or XLSX) for the fleet, parts and customers.
+
+Rows are read one at a time, validated in chunks with the model fields' own
+``clean()`` (max_length, choices, types – no per-row queries), then upserted on the
+natural key with ``bulk_create``/``bulk_update``, one transaction per chunk. Rows
+that fail validation are written to a CSV error report instead of stopping the run.
+
+Used by ``manage.py import_data`` and by the upload page (via the task queue).
+"""
+import csv
+import os
+import re
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import RentalMachine, Part, Customer
+from .signals import bulk_changed
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 500
+UPDATE_BATCH_SIZE = 100  # bulk_update builds a CASE per column; cost grows with batch size squared
+
+
+class ImportSpec:
+    def __init__(self, model, key, fields, required, defaults=None, widths=None):
+        self.model = model
+        self.key = key              # natural key used for upserts (None = always create)
+        self.fields = fields
+        self.required = required
+        self.defaults = defaults or {}
+        self.widths = widths or {}  # digit columns whose leading 0 Excel drops from numeric cells
+
+
+IMPORTS = {
+    'machines': ImportSpec(
+        RentalMachine, key='serial_number',
+        fields=['type', 'brand', 'model', 'serial_number', 'condition', 'status', 'location', 'notes', 'value_tier'],
+        required=['brand', 'model', 'serial_number'],
+        defaults={'type': 'treadmill', 'status': 'available'},
+    ),
+    'parts': ImportSpec(
+        Part, key='part_number',
+        fields=['name', 'part_number', 'quantity_in_stock', 'location', 'compatible_models'],
+        required=['name', 'part_number', 'quantity_in_stock'],
+    ),
+    'customers': ImportSpec(
+        Customer, key='email',  # not unique in the schema; rows without an email are always created
+        fields=['first_name', 'last_name', 'phone', 'email', 'street_address', 'suburb', 'postcode', 'notes'],
+        required=['first_name', 'last_name'],
+        widths={'postcode': 4, 'phone': 10},
+    ),
+}
+
+
+def _cell_text(cell, width=None):
+    """An XLSX cell's value as the text the sheet shows: 4.0 -> "4", 800 -> "0800" for a postcode."""
+    value = cell.value
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool):
+        return str(value)
+    text = str(value)
+    number_format = getattr(cell, 'number_format', None) or ''
+    if re.fullmatch(r'0+', number_format):  # displayed zero-padded, e.g. "0000"
+        return text.zfill(len(number_format))
+    if width and len(text) == width - 1:  # a postcode or phone number typed as a number
+        return '0' + text
+    return text
+
+
+def read_rows(path, widths=None):
+    """Yield each data row of a .csv or .xlsx file as a {header: value} dict.
+
+    ``widths`` maps digit columns to their full length, to put back the leading
+    zero Excel drops when such a value is typed in as a number.
+    """
+    if path.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook  # optional dependency, only needed for Excel files
+
+        widths = widths or {}
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows()
+            headers = [str(cell.value or '').strip() for cell in next(rows, ())]
+            for cells in rows:
+                yield {h: _cell_text(cell, widths.get(h)) for h, cell in zip(headers, cells)}
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield {(k or '').strip(): (v or '') for k, v in row.items()}
+
+
+def _clean_row(spec, raw):
+    """Return ({field: value}, None) or (None, error message) for one input row."""
+    data, errors = {}, []
+    for name in spec.fields:
+        value = (raw.get(name) or '').strip()
+        if not value:
+            if name in spec.required:
+                errors.append(f"{name}: required")
+            continue
+        field = spec.model._meta.get_field(name)
+        try:
+            data[name] = field.clean(value, None)
+        except ValidationError as exc:
+            errors.append(f"{name}: {' '.join(exc.messages)}")
+    return (None, "; ".join(errors)) if errors else (data, None)
+
+
+def _import_chunk(spec, chunk, seen, report):
+    """Validate and upsert one chunk of (row_number, raw) pairs. Returns (created, updated, unchanged)."""
+    model, key = spec.model, spec.key
+    cleaned = []
+    for row_number, raw in chunk:
+        data, error = _clean_row(spec, raw)
+        if data is not None and key and data.get(key):
+            if data[key] in seen:
+                data, error = None, f"{key}: duplicate of row {seen[data[key]]}"
+            else:
+                seen[data[key]] = row_number
+        if error:
+            report.writerow([row_number, raw.get(key, '') if key else '', error])
+        else:
+            cleaned.append(data)
+
+    keys = [d[key] for d in cleaned if key and d.get(key)]
+    # in_bulk() needs a unique field and Customer.email isn't one, so build the map by hand
+    existing = {getattr(obj, key): obj for obj in model.objects.filter(**{f"{key}__in": keys})} if keys else {}
+
+    to_create, to_update, update_fields, unchanged = [], [], set(), 0
+    for data in cleaned:
+        obj = existing.get(data.get(key)) if key else None
+        if obj is None:
+            to_create.append(model(**{**spec.defaults, **data}))
+        else:
+            changed = [name for name, value in data.items() if getattr(obj, name) != value]
+            if changed:  # re-importing the same sheet should not rewrite every row
+                for name in changed:
+                    setattr(obj, name, data[name])
+                update_fields.update(changed)
+                to_update.append(obj)
+            unchanged += not changed
+
+    update_fields.discard(key)
+    with transaction.atomic():
+        model.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        if to_update and update_fields:
+            model.objects.bulk_update(to_update, sorted(update_fields), batch_size=UPDATE_BATCH_SIZE)
+        if to_create or to_update:
+            bulk_changed(model, ids=[obj.pk for obj in to_create + to_update])
+    return len(to_create), len(to_update), unchanged
+
+
+def import_file(kind, path, report_path=None, chunk_size=CHUNK_SIZE, delete_source=False):
+    """Import ``path`` as ``kind`` ('machines', 'parts' or 'customers'); returns a summary dict.
+
+    ``delete_source`` removes ``path`` afterwards, whatever the outcome (uploads saved by the import page).
+    """
+    try:
+        return _import_file(kind, path, report_path, chunk_size)
+    finally:
+        if delete_source and os.path.exists(path):
+            os.remove(path)
+
+
+def _import_file(kind, path, report_path, chunk_size):
+    spec = IMPORTS[kind]
+    report_path = report_path or f"{os.path.splitext(path)[0]}.errors.csv"
+    created = updated = unchanged = rows = 0
+    seen = {}
+
+    with open(report_path, 'w', newline='', encoding='utf-8') as report_file:
+        report = csv.writer(report_file)
+        report.writerow(['row', spec.key or '', 'error'])
+        # Row 1 is the header, so data rows are numbered from 2 like in a spreadsheet
+        numbered = enumerate(read_rows(path, spec.widths), start=2)
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            rows += len(chunk)
+            c, u, n = _import_chunk(spec, chunk, seen, report)
+            created += c
+            updated += u
+            unchanged += n
+
+    errors = rows - created - updated - unchanged
+    if not errors:
+        os.remove(report_path)
+    return {
+        'kind': kind,
+        'rows': rows,
+        'created': created,
+        'updated': updated,
+        'unchanged': unchanged,
+        'errors': errors,
+        'report': report_path if errors else None,
+    }
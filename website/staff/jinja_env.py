@@ -0,0 +1,44 @@
+"""
+Jinja2 environment for the hot table-row templates (``staff/jinja2/staff/rows/``).
+
+Only the rows of the long listing pages use it (see staff/streaming.py); every
+other page stays on Django templates. Jinja compiles each template to Python
+once per process and keeps the bytecode on disk (``STAFF_JINJA_BYTECODE_DIR``,
+default: a per-user temp dir), so new workers skip the compile step as well.
+
+``id_url`` reverses a URL name once and fills in the id by string formatting.
+Reversing on every row costs more than rendering the rest of it.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.defaultfilters import date, time
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment, FileSystemBytecodeCache
+
+_ID_MARKER = 9876543210123
+
+
+@lru_cache(maxsize=None)
+def _url_shape(name):
+    before, _, after = reverse(name, args=[_ID_MARKER]).partition(str(_ID_MARKER))
+    return before, after
+
+
+def id_url(name, pk):
+    """``reverse(name, args=[pk])`` for URLs taking a single ``<int:id>``."""
+    before, after = _url_shape(name)
+    return f"{before}{int(pk)}{after}"
+
+
+def url(name, *args):
+    return reverse(name, args=args)
+
+
+def environment(**options):
+    options.setdefault('bytecode_cache', FileSystemBytecodeCache(getattr(settings, 'STAFF_JINJA_BYTECODE_DIR', None)))
+    env = Environment(**options)
+    env.globals.update({'url': url, 'id_url': id_url, 'static': static})
+    env.filters.update({'date': date, 'time': time})
+    return env
@@ -0,0 +1,88 @@
+"""
+Tiny pub/sub used to push dashboard / service-job deltas to open pages (Server-Sent Events).
+
+The backend is chosen with ``settings.STAFF_LIVE_BACKEND`` (dotted path to a class).
+A backend needs two methods:
+
+    publish(event: dict)           – callable from sync code (signals, views, threads)
+    subscribe() -> async iterator  – yields event dicts, or None as a keep-alive tick
+
+``LocalBroker`` only fans out inside the current process, which is enough for a
+single ASGI worker; multi-process deployments should plug in a shared backend.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'staff.live.LocalBroker'
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class LocalBroker:
+    """In-process fan-out: every connected page gets its own bounded asyncio.Queue."""
+
+    queue_size = 100
+    heartbeat = 15  # seconds between keep-alive ticks
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:  # loop already closed; subscriber is going away
+                pass
+
+    @staticmethod
+    def _offer(queue, event):
+        # A stalled client must not grow memory without bound – drop its oldest delta instead.
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    async def subscribe(self):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers.add(entry)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(entry[1].get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers.discard(entry)
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'STAFF_LIVE_BACKEND', DEFAULT_BACKEND))()
+    return _broker
+
+
+def publish(event):
+    get_broker().publish(event)
+
+
+def machine_event(machine, deleted=False):
+    if deleted:
+        return {"t": "machine", "id": machine.pk, "deleted": True}
+    return {"t": "machine", "id": machine.pk, "status": machine.status, "location": machine.location}
+
+
+def job_event(job, deleted=False):
+    if deleted:
+        return {"t": "job", "id": job.pk, "deleted": True}
+    return {"t": "job", "id": job.pk, "status": job.status, "status_label": job.get_status_display()}
@@ -0,0 +1,137 @@
+"""
+Preventive-maintenance due list: when each RentalMachine next needs a service.
+
+A machine is due once it has been on hire for its specification's
+``service_interval_days`` (``STAFF_SERVICE_INTERVAL_DAYS`` if blank) since its
+last completed job. It is also due ``STAFF_SERVICE_MAX_DAYS`` after that service
+(or after its first hire), however little it has been out. A machine on hire
+now gets a projected date, because its hire days keep adding up; a machine in
+the depot is only due once it reaches the limit.
+
+``refresh_maintenance()`` works for the whole fleet in a fixed number of queries:
+* the last service per machine comes from correlated subqueries over the live
+  and archived jobs;
+* hire days since that service come from one GROUP BY over the hires on each
+  table.
+The results are upserted into MachineMaintenanceDue. Signals refresh a machine
+when one of its jobs or hires changes (a job completing, a hire being
+returned). ``manage.py refresh_reports`` rebuilds every row nightly, as the hire
+days of open hires grow.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    F, Min, OuterRef, Subquery, Sum, Value, DateField, DurationField, ExpressionWrapper,
+)
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from . import versions
+from .models import RentalMachine, RentalRecord, Job, MachineMaintenanceDue, ArchivedJob, ArchivedRentalRecord
+
+BATCH_SIZE = 500
+
+
+def _setting(name, default):
+    return getattr(settings, f'STAFF_SERVICE_{name}', default)
+
+
+def _last_completed(model, machine_ref):
+    """Latest date_completed among the machine's completed jobs in ``model`` (a correlated subquery)."""
+    return Subquery(model.objects.filter(
+        rental_machine_id=OuterRef(machine_ref), status='complete', date_completed__isnull=False,
+    ).order_by('-date_completed').values('date_completed')[:1])
+
+
+def _last_service(machine_ref):
+    live, archived = _last_completed(Job, machine_ref), _last_completed(ArchivedJob, machine_ref)
+    # GREATEST is NULL if either side is, so give each side the other as a fallback
+    return TruncDate(Greatest(Coalesce(live, archived), Coalesce(archived, live)))
+
+
+def _hire_days_since_service(hires, today):
+    """{machine_id: {'days': timedelta, 'since': date}} – time on hire after the machine's last service."""
+    hires = hires.annotate(
+        hire_end=Coalesce('return_date', Value(today), output_field=DateField()),
+        hire_from=Greatest('start_date', Coalesce(_last_service('machine_id'), 'start_date'), output_field=DateField()),
+    ).filter(hire_end__gt=F('hire_from'))
+    on_hire = ExpressionWrapper(F('hire_end') - F('hire_from'), output_field=DurationField())
+    return {row.pop('machine_id'): row
+            for row in hires.values('machine_id').annotate(days=Sum(on_hire), since=Min('hire_from')).order_by()}
+
+
+def _combined(live, archived):
+    for key, row in archived.items():
+        if key in live:
+            live[key] = {'days': live[key]['days'] + row['days'], 'since': min(live[key]['since'], row['since'])}
+        else:
+            live[key] = row
+    return live
+
+
+def refresh_maintenance(machine_ids=None):
+    """Recompute the due rows for ``machine_ids`` (or the whole fleet). Returns rows written."""
+    today = timezone.localdate()
+    default_interval = _setting('INTERVAL_DAYS', 90)
+    max_days = timedelta(days=_setting('MAX_DAYS', 365))
+    due_soon = today + timedelta(days=_setting('DUE_SOON_DAYS', 14))
+
+    machines = RentalMachine.objects.annotate(
+        last_service=_last_service('pk'),
+        interval=Coalesce('specification__service_interval_days', Value(default_interval)),
+    ).values('id', 'status', 'last_service', 'interval')
+    hires, archived_hires = RentalRecord.objects.all(), ArchivedRentalRecord.objects.all()
+    if machine_ids is not None:
+        machine_ids = list(machine_ids)
+        machines = machines.filter(id__in=machine_ids)
+        hires = hires.filter(machine_id__in=machine_ids)
+        archived_hires = archived_hires.filter(machine_id__in=machine_ids)
+    hire_stats = _combined(_hire_days_since_service(hires, today), _hire_days_since_service(archived_hires, today))
+
+    now = timezone.now()
+    rows = []
+    for machine in machines.iterator(chunk_size=BATCH_SIZE):
+        hired = hire_stats.get(machine['id'], {})
+        days = hired['days'].days if hired.get('days') else 0
+        remaining = machine['interval'] - days
+        # Calendar limit runs from the last service, or from the first hire of a never-serviced machine
+        start = machine['last_service'] or hired.get('since')
+        candidates = [start + max_days] if start else []
+        if machine['status'] == 'rented':
+            candidates.append(today + timedelta(days=remaining))  # still clocking up hire days
+        elif remaining <= 0:
+            candidates.append(today)
+        next_due = min(candidates) if candidates else None
+        if next_due is None or next_due > due_soon:
+            priority = MachineMaintenanceDue.OK
+        elif next_due > today:
+            priority = MachineMaintenanceDue.DUE_SOON
+        else:
+            priority = MachineMaintenanceDue.OVERDUE
+        rows.append(MachineMaintenanceDue(
+            machine_id=machine['id'],
+            last_service=machine['last_service'],
+            hire_days_since_service=days,
+            service_interval_days=machine['interval'],
+            next_due=next_due,
+            priority=priority,
+            refreshed_at=now,
+        ))
+
+    fields = [f.name for f in MachineMaintenanceDue._meta.concrete_fields if f.name != 'machine']
+    with transaction.atomic():
+        MachineMaintenanceDue.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=['machine'], update_fields=fields,
+        )
+        versions.bump(MachineMaintenanceDue)  # the dashboard's ETag covers this table
+    return len(rows)
+
+
+def schedule_refresh(*machine_ids):
+    """Refresh the given machines once the current transaction commits."""
+    ids = {pk for pk in machine_ids if pk}
+    if ids:
+        transaction.on_commit(lambda: refresh_maintenance(ids))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from staff.archive import BATCH_SIZE, archive_after_days, archive_closed
+
+
+class Command(BaseCommand):
+    help = "Move closed jobs and returned hires older than STAFF_ARCHIVE_AFTER_DAYS into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help=f"Archive rows closed more than this many days ago "
+                                                     f"(default {archive_after_days()}).")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived.")
+
+    def handle(self, *args, **options):
+        moved = archive_closed(options['days'], options['batch_size'], options['dry_run'])
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        self.stdout.write(f"{verb} {moved['jobs']} jobs and {moved['rentals']} hires.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from staff.sync import compact
+
+
+class Command(BaseCommand):
+    help = "Remove sync change-log entries superseded by a newer entry for the same row (safe to run any time)."
+
+    def handle(self, *args, **options):
+        removed = compact()
+        self.stdout.write(f"Removed {removed} superseded change-log entries.")
@@ -0,0 +1,46 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand
+
+from staff.dedupe import DUPLICATE_THRESHOLD, find_duplicates, merge_customers
+from staff.models import Customer
+
+
+class Command(BaseCommand):
+    help = ("Find duplicate customers (and optionally merge the groups whose names agree into the oldest "
+            "record of each group; the rest are left for review).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DUPLICATE_THRESHOLD,
+                            help=f"Minimum match score 0-1 (default {DUPLICATE_THRESHOLD})")
+        parser.add_argument('--report', help="Write the duplicate groups to this CSV for review")
+        parser.add_argument('--merge', action='store_true',
+                            help="Merge the groups whose names also match; the report marks them")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        groups = find_duplicates(threshold=options['threshold'])
+        self.stdout.write(f"Found {len(groups)} duplicate groups "
+                          f"({sum(len(g) - 1 for g in groups)} extra records) in {time.perf_counter() - started:.1f}s.")
+        # Only merge where the names agree too; a shared phone/email may just be one household
+        to_merge = find_duplicates(threshold=options['threshold'], same_name=True) if options['merge'] else []
+        merged_ids = {pk for group in to_merge for pk in group}
+
+        if options['report']:
+            customers = Customer.objects.in_bulk([pk for group in groups for pk in group])
+            with open(options['report'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['group', 'survivor', 'id', 'first_name', 'last_name', 'phone', 'email', 'postcode',
+                                 'merged'])
+                for number, group in enumerate(groups, start=1):
+                    for pk in group:
+                        c = customers[pk]
+                        writer.writerow([number, group[0], pk, c.first_name, c.last_name, c.phone, c.email, c.postcode,
+                                         'yes' if pk in merged_ids else ''])
+
+        if options['merge']:
+            started = time.perf_counter()
+            removed = merge_customers(to_merge)
+            self.stdout.write(f"Merged {removed} duplicates in {time.perf_counter() - started:.1f}s; "
+                              f"{sum(len(g) for g in groups) - len(merged_ids)} records left for review.")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from staff.importers import IMPORTS, CHUNK_SIZE, import_file
+
+
+class Command(BaseCommand):
+    help = "Import machines, parts or customers from a CSV/XLSX file (streamed, upserts on the natural key)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTS))
+        parser.add_argument('path')
+        parser.add_argument('--report', help="Where to write the per-row error report (default: <file>.errors.csv).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            summary = import_file(options['kind'], options['path'], options['report'], options['chunk_size'])
+        except (OSError, ImportError) as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{summary['rows']} rows in {elapsed:.1f}s: "
+            f"{summary['created']} created, {summary['updated']} updated, "
+            f"{summary['unchanged']} unchanged, {summary['errors']} errors"
+        )
+        if summary['report']:
+            self.stdout.write(self.style.WARNING(f"Error report: {summary['report']}"))
@@ -0,0 +1,46 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from staff.geo import places_file
+
+FIELDS = ['postcode', 'suburb', 'state', 'latitude', 'longitude', 'population']
+
+
+class Command(BaseCommand):
+    help = ("Merge GeoNames' postal-code export (AU.txt from download.geonames.org/export/zip/) "
+            "into the places file used by the nearest-machine lookup.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Tab-separated GeoNames postal file (AU.txt)")
+        parser.add_argument('--output', help="Places CSV to update (default: STAFF_PLACES_FILE / the bundled file)")
+
+    def handle(self, *args, **options):
+        output = options['output'] or places_file()
+        try:
+            with open(output, newline='', encoding='utf-8') as f:
+                # Keep the locality rows; postcode rows are replaced by the new export
+                rows = [row for row in csv.DictReader(f) if not row['postcode']]
+        except FileNotFoundError:
+            rows = []
+
+        added = 0
+        with open(options['path'], newline='', encoding='utf-8') as f:
+            for line in csv.reader(f, delimiter='\t'):
+                if len(line) < 11 or line[0] != 'AU' or not line[9] or not line[10]:
+                    continue
+                rows.append({
+                    'postcode': line[1], 'suburb': line[2], 'state': line[4],
+                    'latitude': f"{float(line[9]):.5f}", 'longitude': f"{float(line[10]):.5f}",
+                    'population': '',
+                })
+                added += 1
+        if not added:
+            raise CommandError(f"No Australian postcodes found in {options['path']}")
+
+        rows.sort(key=lambda row: (row['state'], row['suburb'].upper(), row['postcode']))
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        self.stdout.write(f"Wrote {len(rows)} places ({added} postcodes) to {output}. Restart the app to reload.")
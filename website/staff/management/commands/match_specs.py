@@ -0,0 +1,36 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand
+
+from staff.specmatch import AUTO_LINK_THRESHOLD, match_specs
+
+
+class Command(BaseCommand):
+    help = ("Link machines, legacy treadmills and jobs to their MachineSpecification by fuzzy "
+            "brand/model matching; writes the matches needing review to a CSV.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=AUTO_LINK_THRESHOLD,
+                            help=f"Minimum score (0-1) to link automatically (default {AUTO_LINK_THRESHOLD})")
+        parser.add_argument('--report', help="Write every proposal to this CSV")
+        parser.add_argument('--dry-run', action='store_true', help="Score everything but link nothing")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts, proposals = match_specs(threshold=options['threshold'], commit=not options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=['kind', 'brand', 'model', 'rows', 'spec_id', 'spec', 'score', 'auto'])
+                writer.writeheader()
+                writer.writerows(proposals)
+
+        review = [p for p in proposals if not p['auto']]
+        verb = "Would link" if options['dry_run'] else "Linked"
+        for kind, count in counts.items():
+            self.stdout.write(f"{verb} {count} {kind}.")
+        self.stdout.write(f"{len(review)} brand/model strings need review"
+                          f"{' (see ' + options['report'] + ')' if options['report'] and review else ''}. "
+                          f"Done in {elapsed:.1f}s.")
@@ -0,0 +1,45 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from staff.models import Technician
+from staff.scheduling import plan_day
+
+
+class Command(BaseCommand):
+    help = "Group a day's confirmed service jobs into technician routes and write the plan back to the jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to plan, YYYY-MM-DD (default: tomorrow)")
+        parser.add_argument('--technician', type=int, action='append',
+                            help="Only schedule these technician ids (repeatable; default: all)")
+        parser.add_argument('--reassign', action='store_true',
+                            help="Allow moving jobs that already have a technician")
+        parser.add_argument('--dry-run', action='store_true', help="Print the plan without saving it")
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else date.today() + timedelta(days=1)
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+        technicians = Technician.objects.order_by('id')
+        if options['technician']:
+            technicians = technicians.filter(id__in=options['technician'])
+
+        started = time.perf_counter()
+        try:
+            routes = plan_day(day, technicians, reassign=options['reassign'], commit=not options['dry_run'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for route in routes:
+            extra = f", {route['unplaced']} unplaced" if route['unplaced'] else ""
+            self.stdout.write(f"{route['technician']}: {len(route['jobs'])} jobs, "
+                              f"{route['km']:.0f} km, done {route['finish']:%H:%M}{extra}")
+            for job in route['jobs']:
+                self.stdout.write(f"  {job.route_order:>2}. {job.scheduled_time:%H:%M}  Job #{job.pk}")
+        total = sum(len(route['jobs']) for route in routes)
+        action = "Planned (dry run)" if options['dry_run'] else "Planned"
+        self.stdout.write(f"{action} {total} jobs for {day} in {elapsed:.2f}s.")
@@ -0,0 +1,61 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a fresh worker does before it can serve a request
+BOOT = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start time of the Django app and list the most expensive imports."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts to time (median is reported).")
+        parser.add_argument('--top', type=int, default=20, help="How many modules to list.")
+        parser.add_argument('--warmup', action='store_true', help="Also run staff.warmup.warm_up() in the boot.")
+
+    def _run(self, code, *python_args):
+        # The child is a bare ``python -c``: it only finds the project if it starts in it
+        base_dir = str(settings.BASE_DIR)
+        path = os.pathsep.join(filter(None, [base_dir, os.environ.get('PYTHONPATH')]))
+        result = subprocess.run(
+            [sys.executable, *python_args, '-c', code], cwd=base_dir,
+            env={**os.environ, 'PYTHONPATH': path, 'STAFF_WARMUP': '1'}, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Profiling run failed (exit code {result.returncode}):\n{result.stderr.strip()}")
+        return result
+
+    def handle(self, *args, **options):
+        boot = BOOT + ("; from staff.warmup import warm_up; warm_up()" if options['warmup'] else "")
+        samples = []
+        for _ in range(options['runs']):
+            out = self._run(f"import time; t = time.perf_counter(); {boot}; print(time.perf_counter() - t)")
+            samples.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+        self.stdout.write(
+            f"Cold start ({'with' if options['warmup'] else 'without'} warm-up): "
+            f"median {statistics.median(samples):.0f} ms, min {min(samples):.0f} ms over {len(samples)} runs"
+        )
+
+        # -X importtime writes "self | cumulative | module" per import to stderr (microseconds)
+        result = self._run(boot, '-X', 'importtime')
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|')
+            rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+
+        top_level = [r for r in rows if not r[2].startswith('  ')]
+        total = sum(r[0] for r in top_level)
+        self.stdout.write(f"\nImports: {len(rows)} modules, {total / 1000:.0f} ms in total")
+        self.stdout.write(f"{'cumulative':>11} {'self':>9}  module")
+        for cumulative, own, module in sorted(top_level, reverse=True)[:options['top']]:
+            self.stdout.write(f"{cumulative / 1000:9.1f}ms {own / 1000:7.1f}ms  {module.strip()}")
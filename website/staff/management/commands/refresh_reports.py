@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from staff.maintenance import refresh_maintenance
+from staff.reports import refresh_utilization
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the precomputed fleet utilization report and maintenance due list "
+            "(run nightly so open hires keep counting).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = refresh_utilization()
+        self.stdout.write(f"Refreshed utilization for {count} machines in {time.perf_counter() - started:.1f}s.")
+        started = time.perf_counter()
+        count = refresh_maintenance()
+        self.stdout.write(f"Refreshed service due dates for {count} machines in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,67 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+# Nothing model-related is imported at module level: pool children unpickle
+# _run_task from this module before their initializer has run django.setup().
+
+
+def _init_child():
+    django.setup()
+
+
+def _run_task(name, kwargs):
+    return import_string(name)(**kwargs)
+
+
+class Command(BaseCommand):
+    help = "Claim queued background tasks from the database and run them in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help="Number of pool processes.")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds between queue polls when idle.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is drained.")
+
+    def handle(self, *args, **options):
+        from staff import tasks
+
+        concurrency = options['concurrency']
+        worker = tasks.worker_id()
+        running = {}  # future -> Task
+        self.stdout.write(f"Worker {worker} started with {concurrency} processes.")
+
+        # spawn (not fork) so children never inherit the parent's open DB connection
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(concurrency, mp_context=context, initializer=_init_child) as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    tasks.heartbeat(worker)
+                    tasks.requeue_stale()
+                    free = concurrency - len(running)
+                    if free:
+                        for task in tasks.claim(worker, free):
+                            running[pool.submit(_run_task, task.name, task.kwargs)] = task
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+                        continue
+
+                    done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        try:
+                            tasks.mark_done(task, future.result())
+                            self.stdout.write(f"✅ {task}")
+                        except Exception as exc:
+                            tasks.mark_failed(task, exc)
+                            self.stderr.write(f"❌ {task}: {exc}")
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping worker.")
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from staff.snapshots import take_snapshot, snapshot_dir
+
+
+class Command(BaseCommand):
+    help = "Export tables and job/rental fact tables to compressed Parquet files for offline analysis."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Re-export everything instead of only new and changed rows.")
+        parser.add_argument('--output', help="Snapshot directory (default: settings.STAFF_ANALYTICS_DIR).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            written = take_snapshot(full=options['full'], root=options['output'])
+        except ImportError as exc:
+            raise CommandError(str(exc))
+        for name, count in written.items():
+            self.stdout.write(f"  {name:24} {count:>9} rows")
+        self.stdout.write(
+            f"Snapshot written to {options['output'] or snapshot_dir()} in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database to the read replica (STAFF_REPLICA_DB), once or every N seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help="Keep syncing every N seconds.")
+
+    def sync(self, source, target):
+        started = time.perf_counter()
+        tmp = f"{target}.syncing"
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(tmp)
+        try:
+            # Online backup: copies in small steps so writers on the primary are only briefly blocked
+            src.backup(dst, pages=1024, sleep=0.005)
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp, target)  # atomic swap; new replica connections see the fresh copy
+        self.stdout.write(f"Replica synced in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+    def handle(self, *args, **options):
+        if 'replica' not in settings.DATABASES:
+            raise CommandError("No replica configured – set STAFF_REPLICA_DB to the replica file path.")
+        source = str(settings.DATABASES['default']['NAME'])
+        target = str(settings.DATABASES['replica']['NAME'])
+        while True:
+            self.sync(source, target)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
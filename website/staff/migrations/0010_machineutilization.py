@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0009_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineUtilization',
+            fields=[
+                ('machine', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='utilization', serialize=False, to='staff.rentalmachine')),
+                ('brand', models.CharField(max_length=100)),
+                ('model', models.CharField(max_length=100)),
+                ('value_tier', models.CharField(db_index=True, max_length=20)),
+                ('specification_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('specification_label', models.CharField(blank=True, max_length=201)),
+                ('hire_count', models.PositiveIntegerField(default=0)),
+                ('days_on_hire', models.PositiveIntegerField(default=0)),
+                ('first_hire', models.DateField(blank=True, null=True)),
+                ('utilization', models.FloatField(default=0)),
+                ('job_count', models.PositiveIntegerField(default=0)),
+                ('parts_used', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
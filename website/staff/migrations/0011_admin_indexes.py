@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0010_machineutilization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='last_name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='booking_date',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='date_created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='external_brand',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='external_serial',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('to_assess', 'To be assessed'), ('in_progress', 'In progress'), ('complete', 'Complete'), ('cancelled', 'Cancelled')], db_index=True, default='to_assess', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='partusage',
+            name='date_used',
+            field=models.DateField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='rentalrecord',
+            name='start_date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0012_job_route_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='specification',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='staff.machinespecification'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+# Same names as staff.sync.SYNC_MODELS
+SEED_MODELS = {
+    'job': 'Job',
+    'part': 'Part',
+    'spec': 'MachineSpecification',
+    'machine': 'RentalMachine',
+    'customer': 'Customer',
+}
+
+
+def seed_changelog(apps, schema_editor):
+    """One entry per existing row, so a client starting from token 0 receives everything."""
+    ChangeLog = apps.get_model('staff', 'ChangeLog')
+    for name, model_name in SEED_MODELS.items():
+        ids = apps.get_model('staff', model_name).objects.order_by('id').values_list('id', flat=True)
+        batch = []
+        for object_id in ids.iterator(chunk_size=5000):
+            batch.append(ChangeLog(model=name, object_id=object_id))
+            if len(batch) >= 5000:
+                ChangeLog.objects.bulk_create(batch)
+                batch = []
+        ChangeLog.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0013_job_specification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id'], name='staff_chang_model_c6e424_idx')],
+            },
+        ),
+        migrations.RunPython(seed_changelog, migrations.RunPython.noop),
+    ]
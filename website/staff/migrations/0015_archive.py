@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0014_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRentalRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('due_date', models.DateField()),
+                ('return_date', models.DateField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='staff.customer')),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_rentals', to='staff.rentalmachine')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedJob',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date_created', models.DateTimeField(db_index=True)),
+                ('date_completed', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('booking_date', models.DateField(blank=True, null=True)),
+                ('confirmed', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('to_assess', 'To be assessed'), ('in_progress', 'In progress'), ('complete', 'Complete'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('external_brand', models.CharField(blank=True, max_length=100)),
+                ('external_model', models.CharField(blank=True, max_length=100)),
+                ('external_serial', models.CharField(blank=True, max_length=100)),
+                ('route_order', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('scheduled_time', models.TimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='staff.customer')),
+                ('rental_machine', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_jobs', to='staff.rentalmachine')),
+                ('specification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='staff.machinespecification')),
+                ('technician', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='staff.technician')),
+                ('treadmill', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='staff.treadmill')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='partusage',
+            name='archived_job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='staff.archivedjob'),
+        ),
+        migrations.AddField(
+            model_name='partusage',
+            name='archived_rental_record',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='staff.archivedrentalrecord'),
+        ),
+    ]
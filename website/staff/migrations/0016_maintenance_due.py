@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0015_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='machinespecification',
+            name='service_interval_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='MachineMaintenanceDue',
+            fields=[
+                ('machine', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='maintenance_due', serialize=False, to='staff.rentalmachine')),
+                ('last_service', models.DateField(blank=True, null=True)),
+                ('hire_days_since_service', models.PositiveIntegerField(default=0)),
+                ('service_interval_days', models.PositiveIntegerField()),
+                ('next_due', models.DateField(blank=True, null=True)),
+                ('priority', models.PositiveSmallIntegerField(choices=[(0, 'OK'), (1, 'Due soon'), (2, 'Overdue')], default=0)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-priority', 'next_due'], name='staff_machi_priorit_2c0283_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:19
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0017_task_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('last_name', 'nocase'), name='staff_customer_last_nocase'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('first_name', 'nocase'), name='staff_customer_first_nocase'),
+        ),
+        migrations.AddIndex(
+            model_name='part',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'nocase'), name='staff_part_name_nocase'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalmachine',
+            index=models.Index(django.db.models.functions.comparison.Collate('brand', 'nocase'), name='staff_machine_brand_nocase'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalmachine',
+            index=models.Index(django.db.models.functions.comparison.Collate('model', 'nocase'), name='staff_machine_model_nocase'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Collate
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class Technician(models.Model):
@@ -12,7 +14,7 @@ class Technician(models.Model):
 
 class Customer(models.Model):
     first_name = models.CharField(max_length=100)
-    last_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100, db_index=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
     street_address = models.TextField(blank=True, null=True)
@@ -20,6 +22,13 @@ class Customer(models.Model):
     postcode = models.TextField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        # SQLite compiles istartswith to LIKE, which only uses a NOCASE index (admin name search)
+        indexes = [
+            models.Index(Collate('last_name', 'nocase'), name='staff_customer_last_nocase'),
+            models.Index(Collate('first_name', 'nocase'), name='staff_customer_first_nocase'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -35,6 +44,8 @@ class MachineSpecification(models.Model):
     lubricant_type = models.CharField(max_length=100, blank=True)
     voltage_rating = models.CharField(max_length=50, blank=True)
     current_rating = models.CharField(max_length=50, blank=True)
+    # Days on hire between services; blank uses STAFF_SERVICE_INTERVAL_DAYS (staff/maintenance.py)
+    service_interval_days = models.PositiveIntegerField(null=True, blank=True)
     notes = models.TextField(blank=True)
     manual_file = models.FileField(upload_to='manuals/', blank=True, null=True)
     image = models.ImageField(upload_to='machine_images/', blank=True, null=True)
@@ -64,19 +75,19 @@ class Job(models.Model):
 
     treadmill = models.ForeignKey(Treadmill, on_delete=models.CASCADE, null=True, blank=True)
     technician = models.ForeignKey(Technician, on_delete=models.SET_NULL, null=True)
-    date_created = models.DateTimeField(auto_now_add=True)
+    date_created = models.DateTimeField(auto_now_add=True, db_index=True)
     date_completed = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
 
     # ✅ New: support booking, explicit status, association to our rental fleet and/or a customer
-    booking_date = models.DateField(null=True, blank=True)
+    booking_date = models.DateField(null=True, blank=True, db_index=True)
     confirmed = models.BooleanField(default=False)
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='to_assess')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='to_assess', db_index=True)
 
     # Optional identifiers for a customer’s own machine
-    external_brand = models.CharField(max_length=100, blank=True)
+    external_brand = models.CharField(max_length=100, blank=True, db_index=True)
     external_model = models.CharField(max_length=100, blank=True)
-    external_serial = models.CharField(max_length=100, blank=True)
+    external_serial = models.CharField(max_length=100, blank=True, db_index=True)
 
     # If it’s a company (rental) machine, link here:
     rental_machine = models.ForeignKey('RentalMachine', on_delete=models.SET_NULL, null=True, blank=True)
@@ -84,6 +95,13 @@ class Job(models.Model):
     # If it’s a customer’s own machine, capture the customer:
     customer = models.ForeignKey('Customer', on_delete=models.SET_NULL, null=True, blank=True)
 
+    # Spec of the machine being serviced; linked by `manage.py match_specs` (staff.specmatch)
+    specification = models.ForeignKey(MachineSpecification, on_delete=models.SET_NULL, null=True, blank=True)
+
+    # Filled in by the route planner (staff.scheduling): stop number on the technician's day and ETA
+    route_order = models.PositiveSmallIntegerField(null=True, blank=True)
+    scheduled_time = models.TimeField(null=True, blank=True)
+
     def __str__(self):
         # Show who/what the job is for at a glance
         who = self.customer or self.rental_machine or self.treadmill
@@ -117,13 +135,19 @@ class RentalMachine(models.Model):
     specification = models.ForeignKey(MachineSpecification, on_delete=models.SET_NULL, null=True, blank=True)
     value_tier = models.CharField(max_length=20, choices=VALUE_TIERS, default='low')
 
+    class Meta:
+        indexes = [  # admin job search by brand/model prefix, see Customer.Meta
+            models.Index(Collate('brand', 'nocase'), name='staff_machine_brand_nocase'),
+            models.Index(Collate('model', 'nocase'), name='staff_machine_model_nocase'),
+        ]
+
     def __str__(self):
         return f"{self.brand} {self.model} ({self.serial_number})"
 
 class RentalRecord(models.Model):
     machine = models.ForeignKey('RentalMachine', on_delete=models.CASCADE, related_name='rental_history')
     customer = models.ForeignKey('staff.Customer', on_delete=models.SET_NULL, null=True, blank=True, related_name='rentals')
-    start_date = models.DateField()
+    start_date = models.DateField(db_index=True)
     due_date = models.DateField()
     return_date = models.DateField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
@@ -139,6 +163,9 @@ class Part(models.Model):
     location = models.CharField(max_length=100, blank=True)
     compatible_models = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [models.Index(Collate('name', 'nocase'), name='staff_part_name_nocase')]  # see Customer.Meta
+
     def __str__(self):
         return f"{self.name} ({self.part_number})"
 
@@ -146,8 +173,11 @@ class PartUsage(models.Model):
     part = models.ForeignKey(Part, on_delete=models.CASCADE)
     job = models.ForeignKey(Job, on_delete=models.CASCADE, null=True, blank=True)
     rental_record = models.ForeignKey(RentalRecord, on_delete=models.CASCADE, null=True, blank=True)
+    # Set instead of job / rental_record once that row has been archived (staff/archive.py)
+    archived_job = models.ForeignKey('ArchivedJob', on_delete=models.CASCADE, null=True, blank=True)
+    archived_rental_record = models.ForeignKey('ArchivedRentalRecord', on_delete=models.CASCADE, null=True, blank=True)
     quantity_used = models.IntegerField()
-    date_used = models.DateField(auto_now_add=True)
+    date_used = models.DateField(auto_now_add=True, db_index=True)
 
     def save(self, *args, **kwargs):
         self.part.quantity_in_stock -= self.quantity_used
@@ -193,3 +223,145 @@ class Expense(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.amount} ({self.description})"
 
+
+
+class ModelVersion(models.Model):
+    """Change counter per model, bumped on every save/delete (see staff/signals.py).
+       Listing pages hash these into their ETag so an unchanged page can 304 cheaply."""
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class ChangeLog(models.Model):
+    """Append-only feed of row changes for the technician sync API (staff/sync.py).
+       The id doubles as the client's change token: "give me everything after N"."""
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['model', 'object_id'])]  # conflict checks on upload
+
+    def __str__(self):
+        return f"#{self.pk} {self.model} {self.object_id}{' deleted' if self.deleted else ''}"
+
+
+class Task(models.Model):
+    """Background task stored in the main database; claimed and run by `manage.py run_worker`."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)  # dotted path of the function to call
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # refreshed by the worker while running
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"Task #{self.pk} {self.name} ({self.status})"
+
+
+class MachineUtilization(models.Model):
+    """Precomputed per-machine hire/service figures (staff/reports.py). The report page reads only
+       this table, so the brand/model/tier/spec it groups by are copied in at refresh time."""
+    machine = models.OneToOneField(RentalMachine, on_delete=models.CASCADE, primary_key=True, related_name='utilization')
+    brand = models.CharField(max_length=100)
+    model = models.CharField(max_length=100)
+    value_tier = models.CharField(max_length=20, db_index=True)
+    specification_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    specification_label = models.CharField(max_length=201, blank=True)
+    hire_count = models.PositiveIntegerField(default=0)
+    days_on_hire = models.PositiveIntegerField(default=0)
+    first_hire = models.DateField(null=True, blank=True)
+    utilization = models.FloatField(default=0)  # days on hire / days since first hire
+    job_count = models.PositiveIntegerField(default=0)
+    parts_used = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.brand} {self.model} – {self.days_on_hire} days on hire"
+
+
+class MachineMaintenanceDue(models.Model):
+    """Precomputed next-service date per machine (staff/maintenance.py). The dashboard's
+       "due for service" filter and sort read only this table."""
+    OK, DUE_SOON, OVERDUE = 0, 1, 2
+    PRIORITY_CHOICES = [(OK, 'OK'), (DUE_SOON, 'Due soon'), (OVERDUE, 'Overdue')]
+
+    machine = models.OneToOneField(RentalMachine, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='maintenance_due')
+    last_service = models.DateField(null=True, blank=True)
+    hire_days_since_service = models.PositiveIntegerField(default=0)
+    service_interval_days = models.PositiveIntegerField()
+    next_due = models.DateField(null=True, blank=True)
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=OK)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['-priority', 'next_due'])]  # the dashboard's service sort
+
+    def __str__(self):
+        return f"Machine {self.machine_id} – next service {self.next_due or 'not scheduled'}"
+
+
+class ArchivedJob(models.Model):
+    """A closed Job moved out of the live table by `manage.py archive_closed` (staff/archive.py).
+       Same columns and id as the original row; read only for rental_detail's archived history."""
+    id = models.BigIntegerField(primary_key=True)
+    treadmill = models.ForeignKey(Treadmill, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    technician = models.ForeignKey(Technician, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    date_created = models.DateTimeField(db_index=True)
+    date_completed = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(blank=True)
+    booking_date = models.DateField(null=True, blank=True)
+    confirmed = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=Job.STATUS_CHOICES)
+    external_brand = models.CharField(max_length=100, blank=True)
+    external_model = models.CharField(max_length=100, blank=True)
+    external_serial = models.CharField(max_length=100, blank=True)
+    rental_machine = models.ForeignKey(RentalMachine, on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='archived_jobs')
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    specification = models.ForeignKey(MachineSpecification, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='+')
+    route_order = models.PositiveSmallIntegerField(null=True, blank=True)
+    scheduled_time = models.TimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived job #{self.pk} ({self.status})"
+
+
+class ArchivedRentalRecord(models.Model):
+    """A returned hire moved out of the live RentalRecord table (staff/archive.py)."""
+    id = models.BigIntegerField(primary_key=True)
+    machine = models.ForeignKey(RentalMachine, on_delete=models.CASCADE, related_name='archived_rentals')
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    start_date = models.DateField()
+    due_date = models.DateField()
+    return_date = models.DateField()
+    notes = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived hire #{self.pk} of machine {self.machine_id}"
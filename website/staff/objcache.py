@@ -0,0 +1,191 @@
+"""
+Read-through cache for read-mostly reference rows: MachineSpecification,
+Technician and Part.
+
+    spec = objcache.get_or_404(MachineSpecification, id)
+    specs = objcache.get_many(MachineSpecification, ids)   # {pk: instance}, one query for all misses
+    technicians = objcache.all_objects(Technician)         # whole table, ordered by pk
+
+Entries are dropped exactly when a row changes: the post_save/post_delete
+receivers and ``bulk_changed`` in staff/signals.py call ``invalidate()``.
+When a bulk change doesn't say which rows it touched, the model's generation
+is bumped instead; the generation is part of every key, so all of that
+model's old entries become unreachable at once.
+
+The backend is chosen with ``settings.STAFF_OBJECT_CACHE_BACKEND`` (dotted path
+to a class) and needs ``get_many(keys)``, ``set_many(mapping)``,
+``delete_many(keys)``, ``generation(name)`` and ``bump(name)``:
+
+* ``LocalLRUCache`` (default) keeps up to ``STAFF_OBJECT_CACHE_SIZE`` entries in
+  this process, evicting the least recently used. It only sees invalidations
+  from its own process, so entries also expire after
+  ``STAFF_OBJECT_CACHE_TIMEOUT`` seconds to pick up writes made elsewhere
+  (worker, management commands);
+* ``DjangoCache`` stores entries in a Django cache (``STAFF_OBJECT_CACHE_ALIAS``).
+  Point it at a shared cache such as Redis or Memcached and every process sees
+  the same invalidations.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404
+from django.utils.module_loading import import_string
+
+from .models import MachineSpecification, Technician, Part
+
+DEFAULT_BACKEND = 'staff.objcache.LocalLRUCache'
+
+CACHED_MODELS = (MachineSpecification, Technician, Part)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _copy(value):
+    if isinstance(value, list):
+        return [copy.copy(item) for item in value]
+    return copy.copy(value)
+
+
+class LocalLRUCache:
+    """Size-bounded in-process LRU; hands out copies so callers can't change the cached rows."""
+
+    def __init__(self):
+        self.max_entries = getattr(settings, 'STAFF_OBJECT_CACHE_SIZE', 5000)
+        self.timeout = getattr(settings, 'STAFF_OBJECT_CACHE_TIMEOUT', 300)
+        self._data = OrderedDict()  # key -> (expires, value)
+        self._generations = {}      # model label -> generation; never evicted
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now, found = time.monotonic(), {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = entry[1]
+        return {key: _copy(value) for key, value in found.items()}
+
+    def set_many(self, mapping):
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (expires, _copy(value))
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def generation(self, name):
+        return self._generations.get(name, 0)
+
+    def bump(self, name):
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+
+
+class DjangoCache:
+    """Entries in a (preferably shared) Django cache backend."""
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'STAFF_OBJECT_CACHE_ALIAS', 'default')]
+        self.timeout = getattr(settings, 'STAFF_OBJECT_CACHE_TIMEOUT', 300)
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def set_many(self, mapping):
+        self.cache.set_many(mapping, self.timeout)
+
+    def delete_many(self, keys):
+        self.cache.delete_many(keys)
+
+    def generation(self, name):
+        return self.cache.get(f'objcache-gen:{name}', 0)
+
+    def bump(self, name):
+        key = f'objcache-gen:{name}'
+        if not self.cache.add(key, 1, None):
+            self.cache.incr(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(getattr(settings, 'STAFF_OBJECT_CACHE_BACKEND', DEFAULT_BACKEND))()
+    return _backend
+
+
+def _prefix(model):
+    label = model._meta.label_lower
+    return f"objcache:{label}:{get_backend().generation(label)}:"
+
+
+def get_many(model, ids):
+    """Return {pk: instance} for the ids that exist; misses are read in one query and cached."""
+    prefix = _prefix(model)
+    keys = {prefix + str(pk): pk for pk in {int(pk) for pk in ids}}
+    cached = get_backend().get_many(list(keys))
+    found = {keys[key]: obj for key, obj in cached.items()}
+    missing = [pk for pk in keys.values() if pk not in found]
+    if missing:
+        loaded = model.objects.in_bulk(missing)
+        get_backend().set_many({prefix + str(pk): obj for pk, obj in loaded.items()})
+        found.update(loaded)
+    return found
+
+
+def get(model, pk):
+    """The instance with this primary key, or None."""
+    return get_many(model, [pk]).get(int(pk))
+
+
+def get_or_404(model, pk):
+    obj = get(model, pk)
+    if obj is None:
+        raise Http404(f"No {model._meta.object_name} matches the given query.")
+    return obj
+
+
+def all_objects(model):
+    """Every row of a (small) reference table, ordered by primary key."""
+    key = _prefix(model) + 'all'
+    rows = get_backend().get_many([key]).get(key)
+    if rows is None:
+        rows = list(model.objects.order_by('pk'))
+        get_backend().set_many({key: rows})
+    return rows
+
+
+def invalidate(model, ids=None):
+    """Forget the given rows of a cached model, or – with ``ids=None`` – all of its rows."""
+    if model not in CACHED_MODELS:
+        return
+    if ids is None:
+        get_backend().bump(model._meta.label_lower)
+        return
+    prefix = _prefix(model)
+    get_backend().delete_many([prefix + str(pk) for pk in ids if pk is not None] + [prefix + 'all'])
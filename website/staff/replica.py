@@ -0,0 +1,140 @@
+"""
+Optional read replica for the heavy read-only pages (dashboards, exports, reports).
+
+Set ``STAFF_REPLICA_DB`` to the path of a SQLite copy kept fresh by
+``manage.py sync_replica --interval 30``; settings then add a ``replica``
+database and this router. Only views wrapped in ``@read_replica`` read from it –
+everything else, and every write, stays on ``default``.
+
+Read-your-writes: ``ReplicaPinMiddleware`` remembers in the session when that
+user last wrote, and ``@read_replica`` keeps them on the primary for
+``STAFF_REPLICA_PIN_SECONDS`` afterwards, so they never see their own change missing.
+"""
+import contextvars
+import os
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+REPLICA = 'replica'
+PIN_SESSION_KEY = '_primary_until'
+
+_use_replica = contextvars.ContextVar('staff_use_replica', default=False)
+
+
+def replica_available():
+    if REPLICA not in settings.DATABASES:
+        return False
+    # Before the first sync the file doesn't exist yet; sqlite would happily create an empty one
+    return os.path.exists(connections.settings[REPLICA]['NAME'])
+
+
+def pin_seconds():
+    return getattr(settings, 'STAFF_REPLICA_PIN_SECONDS', 120)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_available():
+            return REPLICA
+        return None  # → default
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # same data on both sides
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA  # the replica is a copy of default, never migrated directly
+
+
+def _pinned_to_primary(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def _iterate_on_replica(iterator):
+    # Streaming bodies are consumed after the view returns, so re-enter replica mode per chunk
+    iterator = iter(iterator)
+    while True:
+        token = _use_replica.set(True)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _use_replica.reset(token)
+        yield chunk
+
+
+async def _aiterate_on_replica(iterator):
+    iterator = aiter(iterator)
+    while True:
+        token = _use_replica.set(True)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _use_replica.reset(token)
+        yield chunk
+
+
+def read_replica(view_func):
+    """Send this (read-only) view's queries to the replica unless the user just wrote something."""
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if _pinned_to_primary(request):
+            return view_func(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+        if getattr(response, 'streaming', False):
+            wrap = _aiterate_on_replica if response.is_async else _iterate_on_replica
+            response.streaming_content = wrap(response.streaming_content)
+        return response
+    return _wrapped
+
+
+class ReplicaPinMiddleware:
+    """After any state-changing request, keep that session on the primary for a while.
+
+    Sync and async capable, so the async views reach Django without a thread hop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.wrote(request, response):
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.wrote(request, response):
+            await sync_to_async(self.pin)(request)  # may load the session from the database
+        return response
+
+    @staticmethod
+    def wrote(request, response):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400
+
+    @staticmethod
+    def pin(request):
+        session = getattr(request, 'session', None)
+        if session is not None:
+            session[PIN_SESSION_KEY] = time.time() + pin_seconds()
@@ -0,0 +1,106 @@
+"""
+Fleet utilization report: days on hire, jobs and parts used per RentalMachine.
+
+``refresh_utilization()`` computes everything with a handful of GROUP BY queries
+(no per-machine loops) and upserts the results into MachineUtilization. Signals
+refresh just the affected machine after each hire/job/part-usage change, and
+``manage.py refresh_reports`` rebuilds the lot (run it nightly so open hires
+keep counting up). Archived jobs and hires (staff/archive.py) count the same as
+live ones.
+"""
+from django.db import transaction
+from django.db.models import Count, Sum, Min, F, Q, Value, DurationField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    RentalMachine, RentalRecord, Job, PartUsage, MachineUtilization, ArchivedJob, ArchivedRentalRecord,
+)
+
+BATCH_SIZE = 500
+
+
+def _grouped(queryset, key, **aggregates):
+    return {row.pop(key): row for row in queryset.values(key).annotate(**aggregates).order_by()}
+
+
+def _combined(live, archived):
+    """Add the archive's grouped figures to the live ones (earliest date wins)."""
+    for key, row in archived.items():
+        if key not in live:
+            live[key] = row
+            continue
+        for name, value in row.items():
+            live[key][name] = min(live[key][name], value) if name == 'first_hire' else live[key][name] + value
+    return live
+
+
+def refresh_utilization(machine_ids=None):
+    """Recompute the report rows for ``machine_ids`` (or the whole fleet). Returns rows written."""
+    today = timezone.localdate()
+    machines = RentalMachine.objects.select_related('specification')
+    hires = RentalRecord.objects.all()
+    archived_hires = ArchivedRentalRecord.objects.all()
+    jobs = Job.objects.filter(rental_machine__isnull=False)
+    archived_jobs = ArchivedJob.objects.filter(rental_machine__isnull=False)
+    usage = PartUsage.objects.all()
+    if machine_ids is not None:
+        machine_ids = list(machine_ids)
+        machines = machines.filter(id__in=machine_ids)
+        hires = hires.filter(machine_id__in=machine_ids)
+        archived_hires = archived_hires.filter(machine_id__in=machine_ids)
+        jobs = jobs.filter(rental_machine_id__in=machine_ids)
+        archived_jobs = archived_jobs.filter(rental_machine_id__in=machine_ids)
+        usage = usage.filter(
+            Q(job__rental_machine_id__in=machine_ids) | Q(rental_record__machine_id__in=machine_ids) |
+            Q(archived_job__rental_machine_id__in=machine_ids) | Q(archived_rental_record__machine_id__in=machine_ids)
+        )
+
+    on_hire = ExpressionWrapper(Coalesce('return_date', Value(today)) - F('start_date'), output_field=DurationField())
+    hire_aggregates = dict(hire_count=Count('id'), on_hire=Sum(on_hire), first_hire=Min('start_date'))
+    hire_stats = _combined(_grouped(hires, 'machine_id', **hire_aggregates),
+                           _grouped(archived_hires, 'machine_id', **hire_aggregates))
+    job_stats = _combined(_grouped(jobs, 'rental_machine_id', job_count=Count('id')),
+                          _grouped(archived_jobs, 'rental_machine_id', job_count=Count('id')))
+    # A part is charged to a machine through its job or through the hire it was used on
+    usage = usage.annotate(machine=Coalesce('job__rental_machine_id', 'rental_record__machine_id',
+                                            'archived_job__rental_machine_id', 'archived_rental_record__machine_id'))
+    part_stats = _grouped(usage.filter(machine__isnull=False), 'machine', parts_used=Sum('quantity_used'))
+
+    now = timezone.now()
+    rows = []
+    for machine in machines.iterator(chunk_size=BATCH_SIZE):
+        hire = hire_stats.get(machine.id, {})
+        days = hire['on_hire'].days if hire.get('on_hire') else 0
+        first_hire = hire.get('first_hire')
+        spec = machine.specification
+        rows.append(MachineUtilization(
+            machine_id=machine.id,
+            brand=machine.brand,
+            model=machine.model,
+            value_tier=machine.value_tier,
+            specification_id=spec.id if spec else None,
+            specification_label=str(spec) if spec else '',
+            hire_count=hire.get('hire_count', 0),
+            days_on_hire=max(days, 0),
+            first_hire=first_hire,
+            utilization=min(days / ((today - first_hire).days + 1), 1.0) if first_hire else 0.0,
+            job_count=job_stats.get(machine.id, {}).get('job_count', 0),
+            parts_used=part_stats.get(machine.id, {}).get('parts_used') or 0,
+            refreshed_at=now,
+        ))
+
+    fields = [f.name for f in MachineUtilization._meta.concrete_fields if f.name != 'machine']
+    with transaction.atomic():
+        MachineUtilization.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=['machine'], update_fields=fields,
+        )
+    return len(rows)
+
+
+def schedule_refresh(*machine_ids):
+    """Refresh the given machines once the current transaction commits."""
+    ids = {pk for pk in machine_ids if pk}
+    if ids:
+        transaction.on_commit(lambda: refresh_utilization(ids))
@@ -0,0 +1,218 @@
+"""
+Daily route planning for booked service jobs.
+
+``plan_day(day)`` takes the confirmed, still-open jobs booked for ``day``, places
+each one on the map (customer address, else the rental machine's location – see
+staff.geo) and:
+
+* splits them into one geographic cluster per technician with a capacity-capped
+  k-means, so nobody gets twenty stops while a colleague gets three. Jobs that
+  already have a technician stay with them and pull that cluster towards them;
+* orders each cluster as a round trip from the depot – nearest-neighbour first,
+  then 2-opt (reverse any stretch of the route that makes it shorter) until no
+  move helps.
+
+The result is written back to ``Job.technician`` / ``route_order`` /
+``scheduled_time`` in one bulk_update. Distances are great-circle between
+centroids, converted to drive time with ``STAFF_ROUTE_SPEED_KMH``.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import geo, objcache
+from .models import Job, Technician
+from .signals import bulk_changed
+
+CAPACITY_SLACK = 1.25     # a cluster may take this much more than an even share
+KMEANS_ROUNDS = 10
+UNKNOWN_LEG_MINUTES = 30  # travel allowance to/from jobs we couldn't place
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def haversine_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _centroid(points):
+    return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+
+def cluster(points, k, fixed=None, depot=None):
+    """Assign each point to one of ``k`` clusters; returns a list of cluster numbers.
+
+    ``fixed`` maps point index -> cluster for points that must not move.
+    """
+    fixed = fixed or {}
+    n = len(points)
+    if not n:
+        return []
+    capacity = max(math.ceil(n / k * CAPACITY_SLACK), 1)
+
+    # Seeds: clusters with fixed points start at their middle; the rest are spread out
+    # deterministically by repeatedly taking the point farthest from every seed so far
+    centres = [None] * k
+    for c in range(k):
+        members = [points[i] for i, fc in fixed.items() if fc == c]
+        if members:
+            centres[c] = _centroid(members)
+    anchors = [c for c in centres if c is not None] or [depot or _centroid(points)]
+    for c in range(k):
+        if centres[c] is None:
+            far = max(points, key=lambda p: min(haversine_km(p, a) for a in anchors))
+            centres[c] = far
+            anchors.append(far)
+
+    assignment = None
+    for _ in range(KMEANS_ROUNDS):
+        new = [None] * n
+        load = [0] * k
+        for i, c in fixed.items():
+            new[i] = c
+            load[c] += 1
+        # Greedy capacity-capped assignment: closest (point, centre) pairs first
+        pairs = sorted((haversine_km(points[i], centres[c]), i, c)
+                       for i in range(n) if new[i] is None for c in range(k))
+        for _, i, c in pairs:
+            if new[i] is None and load[c] < capacity:
+                new[i] = c
+                load[c] += 1
+        for i in range(n):
+            if new[i] is None:  # only when fixed jobs overfill a cluster
+                new[i] = min(range(k), key=lambda c: haversine_km(points[i], centres[c]))
+        if new == assignment:
+            break
+        assignment = new
+        for c in range(k):
+            members = [points[i] for i in range(n) if assignment[i] == c]
+            if members:
+                centres[c] = _centroid(members)
+    return assignment
+
+
+def _tour_length(tour, dist):
+    return sum(dist[a][b] for a, b in zip(tour, tour[1:]))
+
+
+def order_route(points, depot):
+    """Order ``points`` as a round trip from ``depot``; returns (indexes in visit order, km)."""
+    if not points:
+        return [], 0.0
+    nodes = [depot] + list(points)
+    dist = [[haversine_km(a, b) for b in nodes] for a in nodes]
+
+    # Nearest neighbour from the depot
+    tour, left = [0], set(range(1, len(nodes)))
+    while left:
+        nxt = min(left, key=lambda j: dist[tour[-1]][j])
+        tour.append(nxt)
+        left.remove(nxt)
+    tour.append(0)
+
+    # 2-opt: reversing tour[i:j + 1] swaps edges (a,b),(c,d) for (a,c),(b,d)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(tour) - 2):
+            a, b = tour[i - 1], tour[i]
+            for j in range(i + 1, len(tour) - 1):
+                c, d = tour[j], tour[j + 1]
+                if dist[a][c] + dist[b][d] < dist[a][b] + dist[c][d] - 1e-9:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    b = tour[i]
+                    improved = True
+    return [node - 1 for node in tour[1:-1]], _tour_length(tour, dist)
+
+
+def _job_point(job):
+    if job.customer_id:
+        point = geo.locate_customer(job.customer)
+        if point:
+            return point
+    if job.rental_machine_id and job.rental_machine.location:
+        return geo.gazetteer().locate(job.rental_machine.location)
+    return None
+
+
+def _round_to(minutes, step=5):
+    return int(math.ceil(minutes / step) * step)
+
+
+def plan_day(day, technicians=None, reassign=False, commit=True):
+    """Plan routes for ``day``; returns one summary dict per technician.
+
+    ``technicians``: queryset/list to schedule (default: all). With ``reassign``,
+    jobs already given to a technician may be moved to another one; without it,
+    jobs held by technicians outside ``technicians`` are left alone.
+    """
+    technicians = list(technicians if technicians is not None else objcache.all_objects(Technician))
+    if not technicians:
+        raise ValueError("No technicians to schedule.")
+    slot = {tech.pk: c for c, tech in enumerate(technicians)}
+    jobs = (Job.objects.filter(booking_date=day, confirmed=True)
+            .exclude(status__in=['complete', 'cancelled']))
+    if not reassign:
+        jobs = jobs.filter(Q(technician__isnull=True) | Q(technician_id__in=slot))
+    jobs = list(jobs.select_related('customer', 'rental_machine').order_by('id'))
+
+    speed = _setting('STAFF_ROUTE_SPEED_KMH', 40)
+    job_minutes = _setting('STAFF_JOB_MINUTES', 60)
+    day_start = datetime.combine(day, datetime.strptime(_setting('STAFF_DAY_START', '08:00'), '%H:%M').time())
+    located = [(job, _job_point(job)) for job in jobs]
+    placed = [(job, point) for job, point in located if point]
+    points = [point for _, point in placed]
+    depot = geo.depot_point() or (_centroid(points) if points else None)
+
+    fixed = {} if reassign else {
+        i: slot[job.technician_id] for i, (job, _) in enumerate(placed) if job.technician_id in slot
+    }
+    assignment = cluster(points, len(technicians), fixed, depot)
+
+    routes = [[] for _ in technicians]
+    for (job, point), c in zip(placed, assignment):
+        routes[c].append((job, point))
+    summaries = []
+    for c, tech in enumerate(technicians):
+        order, km = order_route([point for _, point in routes[c]], depot)
+        routes[c] = [routes[c][i][0] for i in order]
+        summaries.append({'technician': tech, 'jobs': routes[c], 'km': km, 'unplaced': 0})
+
+    # Jobs we couldn't place go last on their own technician's day, else the shortest day
+    for job, point in located:
+        if point is None:
+            c = slot.get(job.technician_id) if not reassign else None
+            if c is None:
+                c = min(range(len(technicians)), key=lambda n: len(summaries[n]['jobs']))
+            summaries[c]['jobs'].append(job)
+            summaries[c]['unplaced'] += 1
+
+    point_of = {job.pk: point for job, point in located}
+    for c, summary in enumerate(summaries):
+        clock, here = day_start, depot
+        for stop, job in enumerate(summary['jobs'], start=1):
+            there = point_of[job.pk]
+            if here and there:
+                minutes = haversine_km(here, there) / speed * 60
+            else:
+                minutes = UNKNOWN_LEG_MINUTES
+            clock += timedelta(minutes=_round_to(minutes))
+            job.technician = technicians[c]
+            job.route_order = stop
+            job.scheduled_time = clock.time()
+            clock += timedelta(minutes=job_minutes)
+            here = there
+        summary['finish'] = clock.time()
+
+    if commit and jobs:
+        with transaction.atomic():
+            Job.objects.bulk_update(jobs, ['technician', 'route_order', 'scheduled_time'], batch_size=100)
+            bulk_changed(Job, jobs)
+    return summaries
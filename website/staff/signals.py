@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import live, maintenance, objcache, reports, sync, versions
+from .models import RentalMachine, Job, Part, PartUsage, RentalRecord, Customer, MachineSpecification, Treadmill
+
+# Models whose changes invalidate the cached listing/detail pages (dashboard, jobs, inventory, rental detail)
+VERSIONED_MODELS = (RentalMachine, Job, Part, RentalRecord, Customer, MachineSpecification, Treadmill)
+
+# Fields pushed to open pages over the live stream
+LIVE_FIELDS = {
+    RentalMachine: ({'status', 'location'}, live.machine_event),
+    Job: ({'status'}, live.job_event),
+}
+
+
+def receiver_for(signals, senders):
+    """``@receiver`` for each of ``senders``.
+
+    Never connect a receiver without a sender: Django then can't fast-delete any
+    model (sessions, tasks, the sync log) and loads every row it deletes to send signals.
+    """
+    def decorator(func):
+        for signal in signals:
+            for sender in senders:
+                signal.connect(func, sender=sender)
+        return func
+    return decorator
+
+
+@receiver_for([post_save, post_delete], VERSIONED_MODELS)
+def bump_model_version(sender, **kwargs):
+    versions.bump(sender)
+
+
+@receiver_for([post_save, post_delete], objcache.CACHED_MODELS)
+def invalidate_object_cache(sender, instance, **kwargs):
+    objcache.invalidate(sender, [instance.pk])
+    # Again after commit, in case another request re-cached the old row in between
+    transaction.on_commit(lambda: objcache.invalidate(sender, [instance.pk]))
+
+
+@receiver_for([post_save], sync.SYNC_MODELS.values())
+def log_sync_change(sender, instance, **kwargs):
+    sync.log_changes(sender, [instance.pk])
+
+
+@receiver_for([post_delete], sync.SYNC_MODELS.values())
+def log_sync_delete(sender, instance, **kwargs):
+    sync.log_changes(sender, [instance.pk], deleted=True)
+
+
+@receiver_for([post_save], LIVE_FIELDS)
+def publish_live_change(sender, instance, update_fields=None, **kwargs):
+    fields, make_event = LIVE_FIELDS[sender]
+    if update_fields is None or fields & set(update_fields):
+        event = make_event(instance)
+        transaction.on_commit(lambda: live.publish(event))
+
+
+@receiver_for([post_delete], LIVE_FIELDS)
+def publish_live_delete(sender, instance, **kwargs):
+    event = LIVE_FIELDS[sender][1](instance, deleted=True)
+    transaction.on_commit(lambda: live.publish(event))
+
+
+@receiver([post_save, post_delete], sender=RentalRecord)
+def refresh_report_for_rental(sender, instance, **kwargs):
+    reports.schedule_refresh(instance.machine_id)
+    maintenance.schedule_refresh(instance.machine_id)
+
+
+@receiver([post_save, post_delete], sender=Job)
+def refresh_report_for_job(sender, instance, **kwargs):
+    reports.schedule_refresh(instance.rental_machine_id)
+    maintenance.schedule_refresh(instance.rental_machine_id)
+
+
+@receiver([post_save, post_delete], sender=PartUsage)
+def refresh_report_for_part_usage(sender, instance, **kwargs):
+    machine_ids = []
+    if instance.job_id:
+        machine_ids.append(Job.objects.filter(pk=instance.job_id).values_list('rental_machine_id', flat=True).first())
+    if instance.rental_record_id:
+        machine_ids.append(RentalRecord.objects.filter(pk=instance.rental_record_id).values_list('machine_id', flat=True).first())
+    reports.schedule_refresh(*machine_ids)
+
+
+@receiver(post_save, sender=RentalMachine)
+def refresh_report_for_machine(sender, instance, created, update_fields=None, **kwargs):
+    # Only the copied grouping columns matter here; status/location edits don't touch the report
+    if created or update_fields is None or {'brand', 'model', 'value_tier', 'specification'} & set(update_fields):
+        reports.schedule_refresh(instance.pk)
+    if created or update_fields is None or {'status', 'specification'} & set(update_fields):
+        maintenance.schedule_refresh(instance.pk)
+
+
+@receiver(post_save, sender=MachineSpecification)
+def refresh_maintenance_for_spec(sender, instance, created, update_fields=None, **kwargs):
+    # Its service interval may have changed
+    if not created and (update_fields is None or 'service_interval_days' in update_fields):
+        maintenance.schedule_refresh(*RentalMachine.objects.filter(specification=instance).values_list('id', flat=True))
+
+
+def bulk_changed(model, objs=(), ids=()):
+    """Call after queryset.update()/bulk_create()/bulk_update(), which skip the signals above.
+
+    Pass the touched instances as ``objs`` so open pages get their live deltas too,
+    or at least their primary keys as ``ids`` so sync clients pick the rows up.
+    """
+    if model in VERSIONED_MODELS:
+        versions.bump(model)
+    changed_ids = [obj.pk for obj in objs] + list(ids)
+    sync.log_changes(model, changed_ids)
+    objcache.invalidate(model, changed_ids or None)
+    if model is RentalMachine and changed_ids:
+        reports.schedule_refresh(*changed_ids)
+        maintenance.schedule_refresh(*changed_ids)
+    if model in LIVE_FIELDS and objs:
+        events = [LIVE_FIELDS[model][1](obj) for obj in objs]
+
+        def publish_all():
+            for event in events:
+                live.publish(event)
+        transaction.on_commit(publish_all)
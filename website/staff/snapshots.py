@@ -0,0 +1,248 @@
+"""
+Columnar (Parquet) snapshots of the database for analysts and reports.
+
+``manage.py snapshot_analytics`` copies every table into ``settings.STAFF_ANALYTICS_DIR``
+as zstd-compressed Parquet files, reading the live DB in primary-key order in
+chunks so it never holds a long read lock:
+
+* the tables the sync change log covers (customers, specs, machines, jobs, parts)
+  and the append-only activity log are incremental – each run appends rows with a
+  primary key above the last one exported (recorded in ``manifest.json``) and
+  re-exports just the files holding rows the change log says were edited or
+  deleted since the last run; ``--full`` starts over;
+* tables with no change record (hires, part usage, technicians, expenses,
+  timesheets) are rebuilt on every run, like the denormalized ``job_facts`` /
+  ``rental_facts`` tables. Those include the jobs and hires moved to the archive
+  tables (staff/archive.py), so history doesn't shrink when ``archive_closed`` runs;
+* the archive tables themselves are rebuilt too: rows arrive there with their
+  original, older ids, so a "pk above the last one" pass would miss them.
+
+Readers call ``load_table(name)``, which memory-maps the files instead of touching
+SQLite. pyarrow is an optional dependency needed only here.
+"""
+import bisect
+import heapq
+import json
+import os
+import re
+import shutil
+from datetime import timedelta
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Sum, F, Value, DurationField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Customer, Technician, MachineSpecification, RentalMachine, RentalRecord, Job,
+    Part, PartUsage, Expense, Timesheet, ActivityLog, ArchivedJob, ArchivedRentalRecord, ChangeLog,
+)
+from .sync import SYNC_NAMES, latest_token
+
+CHUNK_SIZE = 50000
+MANIFEST = 'manifest.json'
+PART_RE = re.compile(r'part-(\d+)-(\d+)\.parquet$')
+
+# name -> model exported incrementally; every concrete column is exported (FKs as *_id).
+# Edits and deletes are found through the sync change log, so only logged (or append-only) models belong here.
+TABLES = {
+    'customers': Customer,
+    'specifications': MachineSpecification,
+    'rental_machines': RentalMachine,
+    'jobs': Job,
+    'parts': Part,
+    'activity_log': ActivityLog,
+}
+
+
+def _by_id(*querysets):
+    """Rows of several querysets (disjoint ids) as one iterator in id order."""
+    return heapq.merge(*[qs.order_by('id').iterator(chunk_size=CHUNK_SIZE) for qs in querysets], key=itemgetter('id'))
+
+
+def _all_columns(model):
+    return lambda: _by_id(model.objects.values(*[f.attname for f in model._meta.concrete_fields]))
+
+
+def _job_facts():
+    return _by_id(*[model.objects.values(
+        'id', 'status', 'confirmed', 'booking_date', 'date_created', 'date_completed',
+        'technician_id', 'rental_machine_id', 'customer_id',
+        'external_brand', 'external_model',
+        technician_name=F('technician__name'),
+        machine_brand=F('rental_machine__brand'),
+        machine_model=F('rental_machine__model'),
+        machine_tier=F('rental_machine__value_tier'),
+        customer_postcode=F('customer__postcode'),
+    ).annotate(parts_used=Coalesce(Sum('partusage__quantity_used'), 0)) for model in (Job, ArchivedJob)])
+
+
+def _rental_facts():
+    on_hire = ExpressionWrapper(
+        Coalesce('return_date', Value(timezone.localdate())) - F('start_date'), output_field=DurationField()
+    )
+    return _by_id(*[model.objects.values(
+        'id', 'machine_id', 'customer_id', 'start_date', 'due_date', 'return_date',
+        machine_brand=F('machine__brand'),
+        machine_model=F('machine__model'),
+        machine_type=F('machine__type'),
+        machine_tier=F('machine__value_tier'),
+        customer_suburb=F('customer__suburb'),
+        customer_postcode=F('customer__postcode'),
+    ).annotate(hire_length=on_hire) for model in (RentalRecord, ArchivedRentalRecord)])
+
+
+# name -> factory of rows in id order; always rebuilt
+REBUILT = {
+    'technicians': _all_columns(Technician),
+    'rental_records': _all_columns(RentalRecord),
+    'part_usage': _all_columns(PartUsage),
+    'expenses': _all_columns(Expense),
+    'timesheets': _all_columns(Timesheet),
+    'archived_jobs': _all_columns(ArchivedJob),
+    'archived_rental_records': _all_columns(ArchivedRentalRecord),
+    'job_facts': _job_facts,
+    'rental_facts': _rental_facts,
+}
+
+
+def snapshot_dir():
+    return str(getattr(settings, 'STAFF_ANALYTICS_DIR', os.path.join(settings.BASE_DIR, 'analytics')))
+
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Analytics snapshots need pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _to_table(pa, rows):
+    columns = {key: [row[key] for row in rows] for key in rows[0]}
+    for key, values in columns.items():
+        # Store intervals as whole days – easier for analysts than Arrow's duration type
+        if any(isinstance(v, timedelta) for v in values):
+            columns[key] = [v.days if v is not None else None for v in values]
+    return pa.table(columns)
+
+
+def _write_chunks(rows_iter, directory, pk='id'):
+    """Write an iterator of dicts as part-<first>-<last>.parquet files; returns (rows, last_pk)."""
+    pa, pq = _arrow()
+    os.makedirs(directory, exist_ok=True)
+    total, last_pk, chunk = 0, None, []
+
+    def flush():
+        name = f"part-{chunk[0][pk]:012d}-{chunk[-1][pk]:012d}.parquet"
+        pq.write_table(_to_table(pa, chunk), os.path.join(directory, name), compression='zstd')
+
+    for row in rows_iter:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            flush()
+            total, last_pk, chunk = total + len(chunk), chunk[-1][pk], []
+    if chunk:
+        flush()
+        total, last_pk = total + len(chunk), chunk[-1][pk]
+    return total, last_pk
+
+
+def _rewrite_changed(model, directory, since, last_pk):
+    """Re-export the files holding rows of ``model`` logged as changed after token ``since``.
+
+    Each file keeps its name and pk range; rows deleted since drop out of it. Returns rows written.
+    """
+    name = SYNC_NAMES.get(model)
+    if name is None or not os.path.isdir(directory):
+        return 0
+    changed = sorted(set(ChangeLog.objects.filter(model=name, id__gt=since, object_id__lte=last_pk)
+                         .values_list('object_id', flat=True)))
+    files = sorted((int(m.group(1)), int(m.group(2)), m.group(0))
+                   for m in map(PART_RE.match, os.listdir(directory)) if m)
+    starts = [first for first, _, _ in files]
+    stale = set()
+    for pk in changed:
+        i = bisect.bisect_right(starts, pk) - 1
+        if i >= 0 and pk <= files[i][1]:
+            stale.add(files[i])
+
+    pa, pq = _arrow()
+    columns = [f.attname for f in model._meta.concrete_fields]
+    total = 0
+    for first, last, filename in sorted(stale):
+        path = os.path.join(directory, filename)
+        rows = list(model.objects.filter(pk__gte=first, pk__lte=last).order_by('pk').values(*columns))
+        if rows:
+            pq.write_table(_to_table(pa, rows), path + '.tmp', compression='zstd')
+            os.replace(path + '.tmp', path)
+        else:
+            os.remove(path)
+        total += len(rows)
+    return total
+
+
+def _load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def take_snapshot(full=False, root=None):
+    """Export all tables; returns {table: rows written this run}."""
+    _arrow()  # fail early with a clear message
+    root = root or snapshot_dir()
+    os.makedirs(root, exist_ok=True)
+    manifest = {} if full else _load_manifest(root)
+    # Taken before reading any rows: a change made while this runs is picked up again next time
+    token = latest_token()
+    since = manifest.get('_token', 0)
+    written = {}
+
+    for name, model in TABLES.items():
+        directory = os.path.join(root, name)
+        if full and os.path.isdir(directory):
+            shutil.rmtree(directory)
+        last_pk = manifest.get(name, {}).get('last_pk') or 0
+        rewritten = _rewrite_changed(model, directory, since, last_pk) if last_pk else 0
+        columns = [f.attname for f in model._meta.concrete_fields]
+        rows = (model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values(*columns).iterator(chunk_size=CHUNK_SIZE))
+        count, new_last = _write_chunks(rows, directory)
+        if count:
+            manifest[name] = {'last_pk': new_last}
+        written[name] = rewritten + count
+
+    for name, factory in REBUILT.items():
+        # Build beside the old copy and swap, so readers never see a half-written table
+        directory = os.path.join(root, name)
+        building = directory + '.building'
+        shutil.rmtree(building, ignore_errors=True)
+        count, _ = _write_chunks(factory(), building)
+        shutil.rmtree(directory, ignore_errors=True)
+        if count:
+            os.rename(building, directory)
+        else:
+            shutil.rmtree(building, ignore_errors=True)
+        written[name] = count
+
+    manifest['_token'] = token
+    manifest['_taken_at'] = timezone.now().isoformat()
+    with open(os.path.join(root, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return written
+
+
+def load_table(name, columns=None, root=None):
+    """Read a snapshot table as a pyarrow.Table, memory-mapping the Parquet files."""
+    pa, pq = _arrow()
+    directory = os.path.join(root or snapshot_dir(), name)
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"No snapshot for {name!r} – run manage.py snapshot_analytics")
+    parts = sorted(p for p in os.listdir(directory) if p.endswith('.parquet'))
+    tables = [pq.read_table(os.path.join(directory, p), columns=columns, memory_map=True) for p in parts]
+    return pa.concat_tables(tables, promote_options='default') if tables else pa.table({})
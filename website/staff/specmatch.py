@@ -0,0 +1,175 @@
+"""
+Batch fuzzy matching of free-text brand/model strings to MachineSpecification.
+
+Fleet machines, legacy treadmills and customer-machine jobs mostly have no spec
+linked, and their brand/model text varies ("Pro-Form", "ProForm 505", "proform
+505 cst"). ``match_specs()`` links them in one pass:
+
+* strings are normalized to a compact key – lowercase alphanumerics only, with
+  a brand repeated at the start of the model dropped ("ProForm"/"ProForm 505"
+  and ""/"Pro-Form 505" both become ``proform505``);
+* each *distinct* key is matched once against a trigram index of the specs
+  (postings lists, so a lookup only touches specs sharing a trigram), scored
+  with the Dice coefficient of the trigram sets;
+* matches scoring at least ``threshold`` – clearly ahead of the runner-up spec,
+  and with exactly the spec's model numbers – are linked with one UPDATE per
+  chunk of ids; the rest come back as proposals for a human to check. A long
+  brand name alone scores over 0.8, so "NordicTrack C 1750" must not be taken
+  for "NordicTrack C 1650" without a look.
+
+Jobs on a fleet machine or legacy treadmill simply inherit that machine's spec.
+"""
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import MachineSpecification, MachineUtilization, RentalMachine, Treadmill, Job
+from .signals import bulk_changed
+
+AUTO_LINK_THRESHOLD = 0.8
+SUGGEST_THRESHOLD = 0.5
+MIN_MARGIN = 0.05      # best spec must beat the next one by this much to be linked automatically
+UPDATE_CHUNK = 500
+
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+DIGITS_RE = re.compile(r'\d+')
+
+# kind -> (model, brand field, model field)
+TARGETS = {
+    'machines': (RentalMachine, 'brand', 'model'),
+    'treadmills': (Treadmill, 'brand', 'model'),
+    'jobs': (Job, 'external_brand', 'external_model'),
+}
+
+
+def normalize(brand, model):
+    brand = NON_ALNUM_RE.sub('', (brand or '').lower())
+    model = NON_ALNUM_RE.sub('', (model or '').lower())
+    if brand and model.startswith(brand):
+        model = model[len(brand):]
+    return brand + model
+
+
+def model_numbers(key):
+    """The digit runs in a normalized key ("nordictrackc1650" -> ['1650'])."""
+    return DIGITS_RE.findall(key)
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SpecIndex:
+    def __init__(self, specs):
+        # specs: iterable of (id, brand, model)
+        self.exact = {}
+        self.grams = {}
+        self.numbers = {}
+        self.postings = {}
+        for spec_id, brand, model in specs:
+            key = normalize(brand, model)
+            self.exact.setdefault(key, spec_id)
+            self.grams[spec_id] = trigrams(key)
+            self.numbers[spec_id] = model_numbers(key)
+            for gram in self.grams[spec_id]:
+                self.postings.setdefault(gram, []).append(spec_id)
+
+    def match(self, key):
+        """Return (spec_id, score, runner_up_score) for a normalized key, or None."""
+        if not key:
+            return None
+        if key in self.exact:
+            return self.exact[key], 1.0, 0.0
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scored = sorted(
+            ((2 * count / (len(grams) + len(self.grams[spec_id])), spec_id) for spec_id, count in shared.items()),
+            reverse=True,
+        )
+        if not scored:
+            return None
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        return scored[0][1], scored[0][0], runner_up
+
+
+def _link(model, spec_ids, labels):
+    """Set specification on the given {spec_id: [row ids]}; returns the number of rows linked."""
+    linked = 0
+    with transaction.atomic():
+        for spec_id, ids in spec_ids.items():
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                chunk = ids[start:start + UPDATE_CHUNK]
+                # specification__isnull guards against a concurrent manual link
+                linked += model.objects.filter(id__in=chunk, specification__isnull=True).update(specification_id=spec_id)
+                if model is RentalMachine:
+                    # Only the spec columns of the utilization report change; no need for a full refresh
+                    MachineUtilization.objects.filter(machine_id__in=chunk).update(
+                        specification_id=spec_id, specification_label=labels[spec_id])
+        if linked:
+            bulk_changed(model, ids=[pk for ids in spec_ids.values() for pk in ids])
+    return linked
+
+
+def _inherit_job_specs():
+    """Jobs on a fleet machine or legacy treadmill take that machine's spec (one UPDATE each)."""
+    linked, ids = 0, []
+    with transaction.atomic():
+        for fk, source in (('rental_machine', RentalMachine), ('treadmill', Treadmill)):
+            spec = source.objects.filter(pk=OuterRef(f'{fk}_id')).values('specification_id')[:1]
+            jobs = Job.objects.filter(specification__isnull=True, **{f'{fk}__specification__isnull': False})
+            ids += jobs.values_list('id', flat=True)
+            linked += jobs.update(specification_id=Subquery(spec))
+        if linked:
+            bulk_changed(Job, ids=ids)
+    return linked
+
+
+def match_specs(threshold=AUTO_LINK_THRESHOLD, commit=True):
+    """Match every unlinked machine/treadmill/job; returns (linked counts, proposals).
+
+    ``proposals`` has one dict per distinct brand/model string (kind, brand,
+    model, rows, spec_id, spec, score, auto), best matches first; ``auto`` marks
+    the ones linked (or, with ``commit=False``, the ones that would be).
+    """
+    specs = list(MachineSpecification.objects.values_list('id', 'brand', 'model'))
+    index = SpecIndex(specs)
+    labels = {spec_id: f"{brand} {model}" for spec_id, brand, model in specs}
+    matched = {}  # normalized key -> match, shared across kinds
+    counts, proposals = {}, []
+
+    for kind, (model, brand_field, model_field) in TARGETS.items():
+        groups = {}
+        rows = (model.objects.filter(specification__isnull=True)
+                .values_list('id', brand_field, model_field).iterator(chunk_size=5000))
+        for row_id, brand, model_name in rows:
+            if brand or model_name:
+                groups.setdefault((brand or '', model_name or ''), []).append(row_id)
+
+        to_link = {}
+        for (brand, model_name), ids in groups.items():
+            key = normalize(brand, model_name)
+            if key not in matched:
+                matched[key] = index.match(key)
+            result = matched[key]
+            if result is None or result[1] < SUGGEST_THRESHOLD:
+                continue
+            spec_id, score, runner_up = result
+            auto = score >= threshold and (score == 1.0 or (
+                score - runner_up >= MIN_MARGIN and model_numbers(key) == index.numbers[spec_id]))
+            if auto:
+                to_link.setdefault(spec_id, []).extend(ids)
+            proposals.append({
+                'kind': kind, 'brand': brand, 'model': model_name, 'rows': len(ids),
+                'spec_id': spec_id, 'spec': labels[spec_id], 'score': round(score, 3), 'auto': auto,
+            })
+        counts[kind] = _link(model, to_link, labels) if commit else sum(len(ids) for ids in to_link.values())
+
+    if commit:
+        counts['jobs'] += _inherit_job_specs()
+    proposals.sort(key=lambda p: (-p['score'], p['kind'], p['brand'], p['model']))
+    return counts, proposals
@@ -0,0 +1,35 @@
+// Patches listing rows in place from the /live/ Server-Sent Events stream.
+// Rows opt in with data-machine-id / data-job-id, cells with data-field="...".
+(function () {
+    const script = document.currentScript;
+    const url = script && script.dataset.url;
+    if (!url || !window.EventSource) return;
+
+    function patch(row, field, value) {
+        const cell = row && row.querySelector(`[data-field="${field}"]`);
+        if (cell && cell.textContent.trim() !== value) {
+            cell.textContent = value;
+            cell.style.transition = 'background 1s';
+            cell.style.background = '#fff8e1';
+            setTimeout(() => { cell.style.background = ''; }, 1500);
+        }
+    }
+
+    const source = new EventSource(url);
+    source.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        const selector = event.t === 'machine' ? `[data-machine-id="${event.id}"]` : `[data-job-id="${event.id}"]`;
+        document.querySelectorAll(selector).forEach(row => {
+            if (event.deleted) {
+                row.style.opacity = '0.4';
+                return;
+            }
+            if (event.t === 'machine') {
+                patch(row, 'status', event.status);
+                patch(row, 'location', event.location);
+            } else {
+                patch(row, 'status', event.status_label);
+            }
+        });
+    };
+})();
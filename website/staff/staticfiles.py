@@ -0,0 +1,114 @@
+"""
+Serve collected static files straight from ``STATIC_ROOT`` (no nginx needed).
+
+The file list is read once at startup. A request is then a dict lookup plus
+``FileResponse`` – no stat() or directory walk per hit:
+
+* the ``.br``/``.gz`` sibling written by staff/storage.py is sent when the
+  client accepts it (``Vary: Accept-Encoding``);
+* hashed names from the manifest get ``Cache-Control: immutable`` for a year –
+  a changed file gets a new name, so browsers never revalidate them. Plain
+  names get a short max-age and an ETag, and ``If-None-Match`` answers 304.
+
+Not used with ``DEBUG`` (runserver serves from the app directories there) or
+before the first ``collectstatic``.
+"""
+import mimetypes
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SHORT = 'public, max-age=300'
+
+# (encoding, file suffix) in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+_accepts = {encoding: re.compile(rf'\b{encoding}\b') for encoding, _ in ENCODINGS}
+
+
+class StaticFile:
+    __slots__ = ('path', 'content_type', 'etag', 'last_modified', 'cache_control', 'variants')
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.last_modified = http_date(stat.st_mtime)
+        self.cache_control = IMMUTABLE if immutable else SHORT
+        self.variants = [(encoding, path + suffix) for encoding, suffix in ENCODINGS
+                         if os.path.exists(path + suffix)]
+
+
+def build_index(root, prefix, hashed_names=()):
+    """Map request paths under ``prefix`` to StaticFile entries for every file below ``root``."""
+    hashed_names = set(hashed_names)
+    index = {}
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            if filename.endswith(('.gz', '.br')) and os.path.splitext(filename)[0] in files:
+                continue  # a precompressed sibling, served via its original
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            index[prefix + name] = StaticFile(path, immutable=name in hashed_names)
+    return index
+
+
+class StaticFilesMiddleware:
+    # Both modes, so async views don't get pushed through a sync adapter by this middleware
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        root = settings.STATIC_ROOT
+        if settings.DEBUG or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        hashed = getattr(staticfiles_storage, 'hashed_files', {}).values()
+        self.index = build_index(str(root), settings.STATIC_URL, hashed)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static = self.lookup(request)
+        if static is None:
+            return self.get_response(request)
+        return self.serve(request, static)
+
+    async def __acall__(self, request):
+        static = self.lookup(request)
+        if static is None:
+            return await self.get_response(request)
+        return self.serve(request, static)
+
+    def lookup(self, request):
+        return self.index.get(request.path_info) if request.method in ('GET', 'HEAD') else None
+
+    def serve(self, request, static):
+        if request.META.get('HTTP_IF_NONE_MATCH') == static.etag:
+            response = HttpResponseNotModified()
+        else:
+            path, encoding = static.path, None
+            accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+            for candidate, variant in static.variants:
+                if _accepts[candidate].search(accept):
+                    path, encoding = variant, candidate
+                    break
+            response = FileResponse(open(path, 'rb'), content_type=static.content_type,
+                                    filename=os.path.basename(static.path))
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = static.last_modified
+        response['ETag'] = static.etag
+        response['Cache-Control'] = static.cache_control
+        if static.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,56 @@
+"""
+Static file storage for production: ``manage.py collectstatic`` writes every
+file under a content-hashed name (``styles.3f2a9c1b7d4e.css``, via Django's
+ManifestStaticFilesStorage) plus precompressed ``.gz`` and – with the optional
+``brotli`` package – ``.br`` siblings, so nothing is compressed per request.
+staff/staticfiles.py serves them.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional: ~15-20% smaller than gzip for CSS/JS
+    brotli = None
+
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml'}
+MIN_SIZE = 256
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # No manifest yet (fresh checkout, test runs): fall back to plain names instead of failing
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Compress once hashing is finished: the final hashed names and the plain copies
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1] in COMPRESSIBLE and self.exists(name):
+                self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        for suffix, compress in _compressors():
+            # Drop any sibling from an earlier run first: the plain name's content may have changed
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(data) >= MIN_SIZE:
+                compressed = compress(data)
+                if len(compressed) < len(data) * 0.95:
+                    self._save(name + suffix, ContentFile(compressed))
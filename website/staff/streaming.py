@@ -0,0 +1,83 @@
+"""
+Streamed HTML for the long listing pages (dashboard, inventory, service jobs).
+
+The page template is rendered up front with a placeholder where each table
+body goes, so the header, filters and CSRF token are ready before the first
+row is read. That part is sent at once. The rows are then read with
+``.iterator(chunk_size=...)`` and rendered a chunk at a time through a small
+row template (``staff/rows/*.html``), which means time to first byte and
+worker memory stay the same for 100 rows or 100,000.
+
+Rows are rendered by the Jinja2 engine when it is configured (the row
+templates have Jinja twins in ``staff/jinja2/``, several times faster per row;
+see benchmarks/template_render.py), otherwise by Django templates.
+``STAFF_ROW_TEMPLATES = 'django'`` forces the latter.
+
+Under ASGI the body is an async iterator: Django would read a sync one to the
+end before sending anything. Each chunk is still rendered by the sync code
+above, through ``sync_to_async`` on the request's thread (where the DB cursor
+lives).
+
+Set ``STAFF_STREAM_PAGES = False`` to get an ordinary buffered response.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import engines
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+
+def chunk_size():
+    return getattr(settings, 'STAFF_STREAM_CHUNK', 250)
+
+
+def row_engine():
+    name = getattr(settings, 'STAFF_ROW_TEMPLATES', 'jinja2')
+    return name if name in engines.templates else 'django'
+
+
+def _chunks(queryset, size):
+    rows = queryset.iterator(chunk_size=size)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+async def _async_chunks(iterator):
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(iterator, None)) is not None:
+        yield chunk
+
+
+def stream_page(request, template_name, context, tables):
+    """Render ``template_name`` with each table's rows streamed in chunks.
+
+    ``tables`` maps a placeholder variable used in the page template (in page
+    order) to ``(row template, row variable, queryset)``. The row template
+    loops over the row variable and handles the empty case itself.
+    """
+    size, engine = chunk_size(), row_engine()
+    markers = {name: f'<!--rows:{name}-->' for name in tables}
+    page = render_to_string(template_name, {**context, **{n: mark_safe(m) for n, m in markers.items()}}, request)
+
+    def body():
+        rest = page
+        for name, (row_template, variable, queryset) in tables.items():
+            head, _, rest = rest.partition(markers[name])
+            yield head
+            template = get_template(row_template, using=engine)
+            empty = True
+            for chunk in _chunks(queryset, size):
+                empty = False
+                yield template.render({**context, variable: chunk}, request)
+            if empty:
+                yield template.render({**context, variable: []}, request)
+        yield rest
+
+    if not getattr(settings, 'STAFF_STREAM_PAGES', True):
+        return HttpResponse(''.join(body()))
+    content = _async_chunks(body()) if isinstance(request, ASGIRequest) else body()
+    return StreamingHttpResponse(content, content_type='text/html; charset=utf-8')
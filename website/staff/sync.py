@@ -0,0 +1,160 @@
+"""
+Delta sync for the offline technician app.
+
+Every save/delete of a synced model appends a ChangeLog row (staff/signals.py;
+``bulk_changed(..., ids=...)`` for bulk writes). The log id is the client's
+change token:
+
+* ``changes_since(token)`` reads the next page of log entries after ``token``
+  (primary-key range scan), keeps the latest entry per object and returns the
+  current rows plus tombstones for deleted ones, and the token to send next
+  time. Token 0 replays the whole log – the migration seeded it with every
+  existing row – so first sync and catch-up are the same call;
+* ``apply_edits(edits)`` applies a batch of offline edits. An edit whose object
+  has a log entry newer than the edit's ``base`` token was changed by someone
+  else since the client last synced: it is rejected as a conflict and the
+  current row is sent back instead;
+* ``resume_token(base, results)`` is the token to continue from after an
+  upload: past the client's own log entries, but never past an entry someone
+  else wrote in between, which the client hasn't pulled yet.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max, Subquery, OuterRef
+
+from .models import ChangeLog, Job, Part, MachineSpecification, RentalMachine, Customer
+
+PAGE_SIZE = 500
+
+# Name used in the log and the API -> model
+SYNC_MODELS = {
+    'job': Job,
+    'part': Part,
+    'spec': MachineSpecification,
+    'machine': RentalMachine,
+    'customer': Customer,
+}
+SYNC_NAMES = {model: name for name, model in SYNC_MODELS.items()}
+
+# Fields a technician may change offline
+UPLOAD_FIELDS = {
+    'job': {'status', 'notes', 'date_completed'},
+    'part': {'location'},
+    'spec': {'notes'},
+    'machine': {'status', 'location', 'condition', 'notes'},
+    'customer': {'phone', 'email', 'street_address', 'suburb', 'postcode', 'notes'},
+}
+
+
+def log_changes(model, ids, deleted=False):
+    """Append log entries for the given primary keys of a synced model."""
+    name = SYNC_NAMES.get(model)
+    ids = [pk for pk in ids if pk is not None]
+    if name and ids:
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(model=name, object_id=pk, deleted=deleted) for pk in ids], batch_size=1000)
+
+
+def latest_token():
+    return ChangeLog.objects.aggregate(token=Max('id'))['token'] or 0
+
+
+def _rows(model, ids):
+    fields = [f.attname for f in model._meta.concrete_fields]
+    return {row['id']: row for row in model.objects.filter(id__in=ids).values(*fields)}
+
+
+def changes_since(token, limit=PAGE_SIZE):
+    """Return {'token', 'more', 'changes': {name: [rows]}, 'deleted': {name: [ids]}}."""
+    entries = list(ChangeLog.objects.filter(id__gt=token).order_by('id')
+                   .values_list('id', 'model', 'object_id', 'deleted')[:limit])
+    latest = {}
+    for _, name, object_id, deleted in entries:
+        latest[name, object_id] = deleted  # later entries win
+
+    changes, tombstones = {}, {}
+    for name, model in SYNC_MODELS.items():
+        live_ids = [oid for (n, oid), deleted in latest.items() if n == name and not deleted]
+        dead_ids = {oid for (n, oid), deleted in latest.items() if n == name and deleted}
+        rows = _rows(model, live_ids) if live_ids else {}
+        # Deleted after this page's entries were written – the delete's own entry comes later,
+        # but sending the tombstone now is harmless
+        dead_ids.update(oid for oid in live_ids if oid not in rows)
+        if rows:
+            changes[name] = list(rows.values())
+        if dead_ids:
+            tombstones[name] = sorted(dead_ids)
+
+    return {
+        'token': entries[-1][0] if entries else token,
+        'more': len(entries) == limit,
+        'changes': changes,
+        'deleted': tombstones,
+    }
+
+
+def _apply_one(edit, edited, default_base):
+    name, fields = edit.get('model'), edit.get('fields') or {}
+    if name not in SYNC_MODELS:
+        return {'status': 'error', 'error': 'Unknown model'}
+    if not isinstance(fields, dict) or not fields or set(fields) - UPLOAD_FIELDS[name]:
+        return {'status': 'error', 'error': f"Editable fields: {', '.join(sorted(UPLOAD_FIELDS[name]))}"}
+    try:
+        object_id, base = int(edit.get('id')), int(edit.get('base') or default_base)
+    except (TypeError, ValueError):
+        return {'status': 'error', 'error': 'Invalid id or base token'}
+
+    model = SYNC_MODELS[name]
+    with transaction.atomic():
+        obj = model.objects.select_for_update().filter(id=object_id).first()
+        if obj is None:
+            return {'status': 'conflict', 'error': 'Deleted on the server', 'current': None}
+        # Our own earlier edit in this batch is not a conflict
+        if (name, object_id) not in edited and ChangeLog.objects.filter(
+                model=name, object_id=object_id, id__gt=base).exists():
+            return {'status': 'conflict', 'current': _rows(model, [object_id])[object_id]}
+        try:
+            for field_name, value in fields.items():
+                field = model._meta.get_field(field_name)
+                setattr(obj, field_name, field.clean(value, obj))
+        except ValidationError as exc:
+            return {'status': 'error', 'error': ' '.join(exc.messages)}
+        obj.save(update_fields=list(fields))
+        token = ChangeLog.objects.filter(model=name, object_id=object_id).aggregate(token=Max('id'))['token']
+    edited.add((name, object_id))
+    return {'status': 'ok', 'token': token}
+
+
+def apply_edits(edits, base=0):
+    """Apply a batch of offline edits; returns one result dict per edit, in order.
+
+    Each edit is {"model", "id", "fields": {...}} with an optional "base" token
+    (defaults to the batch's ``base``: the token of the client's last sync).
+    Applied edits carry the ``token`` of their log entry.
+    """
+    edited, results = set(), []
+    for edit in edits:
+        if not isinstance(edit, dict):
+            results.append({'status': 'error', 'error': 'Expected an object'})
+            continue
+        result = _apply_one(edit, edited, base)
+        result.update(model=edit.get('model'), id=edit.get('id'))
+        results.append(result)
+    return results
+
+
+def resume_token(base, results):
+    """Token for the client to pull from after uploading ``results`` on top of ``base``."""
+    own = [r['token'] for r in results if r.get('token')]
+    first_other = (ChangeLog.objects.filter(id__gt=base).exclude(id__in=own)
+                   .order_by('id').values_list('id', flat=True).first())
+    if first_other is not None:
+        return first_other - 1
+    return max(own, default=base)
+
+
+def compact():
+    """Drop log entries superseded by a newer entry for the same object; returns rows deleted."""
+    newest = (ChangeLog.objects.filter(model=OuterRef('model'), object_id=OuterRef('object_id'))
+              .order_by('-id').values('id')[:1])
+    return ChangeLog.objects.exclude(id=Subquery(newest)).delete()[0]
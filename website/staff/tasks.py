@@ -0,0 +1,98 @@
+"""
+Lightweight task queue stored in the app's own database (works on SQLite, no broker).
+
+Views enqueue work with ``enqueue()`` and poll ``/tasks/<id>/``; ``manage.py run_worker``
+claims queued rows with a conditional UPDATE (so two workers never run the same task),
+runs them in a process pool and records the result, retrying failures with backoff.
+While a task runs, its worker refreshes ``heartbeat_at`` on every poll. Only a task
+whose heartbeat has gone quiet (its worker died) is put back on the queue, so a
+long task is never claimed a second time.
+
+A task is any importable module-level function taking JSON-serialisable keyword
+arguments and returning a JSON-serialisable result.
+"""
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+RETRY_BASE_SECONDS = 10      # 10s, 20s, 40s, ...
+STALE_AFTER = timedelta(minutes=5)  # without a heartbeat; the worker beats every poll
+
+
+def task_name(func):
+    return func if isinstance(func, str) else f"{func.__module__}.{func.__qualname__}"
+
+
+def enqueue(func, *, user=None, max_attempts=3, delay=None, **kwargs):
+    """Queue ``func(**kwargs)`` for the worker and return the Task row."""
+    return Task.objects.create(
+        name=task_name(func),
+        kwargs=kwargs,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + (delay or timedelta()),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker, limit):
+    """Atomically move up to ``limit`` due tasks from queued to running for ``worker``."""
+    now = timezone.now()
+    candidates = (Task.objects
+                  .filter(status='queued', run_after__lte=now)
+                  .order_by('run_after', 'id')
+                  .values_list('id', flat=True)[:limit * 2])
+    claimed = []
+    for pk in candidates:
+        # Only one worker's UPDATE can match status='queued' for a given row
+        won = Task.objects.filter(pk=pk, status='queued').update(
+            status='running', locked_by=worker, date_started=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if won:
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return list(Task.objects.filter(pk__in=claimed).order_by('id'))
+
+
+def heartbeat(worker):
+    """Mark every task ``worker`` is running as still alive."""
+    return Task.objects.filter(status='running', locked_by=worker).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """Put tasks whose worker died mid-run (no heartbeat for ``older_than``) back on the queue."""
+    cutoff = timezone.now() - older_than
+    return (Task.objects.filter(status='running')
+            .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, date_started__lt=cutoff))
+            .update(status='queued', locked_by=''))
+
+
+def mark_done(task, result):
+    task.status = 'done'
+    task.result = result
+    task.error = ''
+    task.date_finished = timezone.now()
+    task.save(update_fields=['status', 'result', 'error', 'date_finished'])
+
+
+def mark_failed(task, exc):
+    """Record the error and either schedule a retry with exponential backoff or give up."""
+    task.error = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))[-4000:]
+    if task.attempts < task.max_attempts:
+        task.status = 'queued'
+        task.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (task.attempts - 1))
+    else:
+        task.status = 'failed'
+        task.date_finished = timezone.now()
+    task.locked_by = ''
+    task.save(update_fields=['status', 'error', 'run_after', 'locked_by', 'date_finished'])
@@ -1,3 +1,1174 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+import zlib
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.shortcuts import resolve_url
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import geo, objcache, snapshots, sync, tasks, versions
+from .admin import EstimatedCountPaginator
+from .archive import archive_closed
+from .dedupe import find_duplicates, merge_customers
+from .hires import MachineUnavailable, start_hire
+from .importers import import_file
+from .live import get_broker
+from .maintenance import refresh_maintenance
+from .scheduling import plan_day
+from .specmatch import match_specs
+from .streaming import row_engine
+from .replica import PIN_SESSION_KEY
+from .reports import refresh_utilization
+from .warmup import ROW_TEMPLATES, warm_up
+from .models import (
+    RentalMachine, MachineSpecification, RentalRecord, Job, Technician, Customer, Part, PartUsage, Task,
+    Treadmill, MachineUtilization, MachineMaintenanceDue, ArchivedJob, ArchivedRentalRecord, ChangeLog,
+)
+
+
+class ApiQueryCountTests(TestCase):
+    """The JSON API must cost the same number of queries for 1 row or 100."""
+
+    # Every request loads the session and the user before the view runs
+    AUTH_QUERIES = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('api', password='x')
+        technician = Technician.objects.create(name='Sam', phone='0400 000 000', email='sam@example.com')
+        spec = MachineSpecification.objects.create(brand='ProForm', model='505')
+        today = datetime.date(2024, 1, 1)
+        for i in range(20):
+            customer = Customer.objects.create(first_name='Jo', last_name=f'Bloggs{i}', postcode='3000')
+            machine = RentalMachine.objects.create(
+                type='treadmill', brand='ProForm', model='505', serial_number=f'SN{i}', specification=spec)
+            RentalRecord.objects.create(machine=machine, customer=customer, start_date=today, due_date=today)
+            Job.objects.create(customer=customer, rental_machine=machine, technician=technician, specification=spec)
+            Part.objects.create(name=f'Belt {i}', part_number=f'P{i}', quantity_in_stock=i)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, url, queries):
+        with self.assertNumQueries(self.AUTH_QUERIES + queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_every_resource_is_one_query(self):
+        for resource in ('machines', 'jobs', 'rentals', 'parts', 'customers', 'specs'):
+            with self.subTest(resource=resource):
+                data = self.get(f'/api/{resource}/', 1)
+                self.assertTrue(data['results'])
+
+    def test_foreign_key_expansion_is_joined(self):
+        data = self.get('/api/jobs/?expand=customer,rental_machine,technician,specification', 1)
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0]['technician']['name'], 'Sam')
+        self.assertEqual(data['results'][0]['specification']['brand'], 'ProForm')
+
+    def test_reverse_expansion_is_one_query_per_relation(self):
+        data = self.get('/api/customers/?expand=rentals,jobs', 3)
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(all(len(row['rentals']) == 1 and len(row['jobs']) == 1 for row in data['results']))
+        data = self.get('/api/specs/?expand=machines', 2)
+        self.assertEqual(len(data['results'][0]['machines']), 20)
+
+    def test_sparse_fields(self):
+        data = self.get('/api/machines/?fields=serial_number,status', 1)
+        self.assertEqual(set(data['results'][0]), {'id', 'serial_number', 'status'})
+
+    def test_bulk_ids(self):
+        ids = list(RentalMachine.objects.values_list('id', flat=True)[:5])
+        data = self.get(f"/api/machines/?ids={','.join(map(str, ids))}&expand=specification,rentals", 2)
+        self.assertEqual([row['id'] for row in data['results']], ids)
+
+    def test_cursor_pages_through_everything(self):
+        seen, url = [], '/api/rentals/?limit=7&expand=machine,customer'
+        while url:
+            data = self.get(url, 1)
+            seen += [row['id'] for row in data['results']]
+            url = f"/api/rentals/?limit=7&expand=machine,customer&cursor={data['next']}" if data['next'] else None
+        self.assertEqual(seen, list(RentalRecord.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_detail(self):
+        job = Job.objects.first()
+        data = self.get(f'/api/jobs/{job.id}/?expand=customer', 1)
+        self.assertEqual(data['customer']['id'], job.customer_id)
+        self.assertEqual(self.client.get('/api/jobs/999999/').status_code, 404)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/machines/?fields=password').status_code, 400)
+        self.assertEqual(self.client.get('/api/machines/?expand=owner').status_code, 400)
+        self.assertEqual(self.client.get('/api/machines/?cursor=junk').status_code, 400)
+        self.assertEqual(self.client.get('/api/nothing/').status_code, 404)
+
+
+class ConcurrentHireTests(TransactionTestCase):
+    """Staff hiring the same machine at the same moment: exactly one hire may win."""
+
+    HIRES = 12
+
+    def test_only_one_parallel_hire_succeeds(self):
+        machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505', serial_number='SN1',
+                                                status='available')
+        start = threading.Barrier(self.HIRES)
+        outcomes = []
+
+        def hire(i):
+            try:
+                start.wait()
+                start_hire(machine.id, dict(first_name='Jo', last_name=f'Bloggs{i}', suburb='Carlton'),
+                           datetime.date(2024, 1, 1), datetime.date(2024, 2, 1))
+                outcomes.append('hired')
+            except MachineUnavailable:
+                outcomes.append('unavailable')
+            except Exception as e:
+                outcomes.append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=hire, args=(i,)) for i in range(self.HIRES)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['hired'] + ['unavailable'] * (self.HIRES - 1))
+        self.assertEqual(RentalRecord.objects.filter(machine=machine).count(), 1)
+        # The losers' new customers were rolled back with their hires
+        self.assertEqual(Customer.objects.count(), 1)
+        machine.refresh_from_db()
+        self.assertEqual((machine.status, machine.location), ('rented', 'Carlton'))
+
+
+class StreamingResponseTests(TestCase):
+    """Streamed pages and the live stream must reach the browser as they are produced."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('gzip', password='x')
+        for i in range(30):
+            RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505', serial_number=f'SN{i:03}',
+                                         status='available')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def test_live_stream_is_never_compressed(self):
+        response = self.client.get('/live/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(STAFF_STREAM_CHUNK=10)
+    def test_streamed_page_is_flushed_chunk_by_chunk(self):
+        response = self.client.get('/dashboard/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        decompressor, seen = zlib.decompressobj(16 + zlib.MAX_WBITS), []
+        for chunk in response.streaming_content:
+            # Every chunk decompresses on its own as it arrives – nothing is held back in the encoder
+            seen.append(decompressor.decompress(chunk).decode())
+        self.assertIn('SN000', seen[1])
+        self.assertIn('SN029', ''.join(seen))
+
+
+    @override_settings(STAFF_STREAM_CHUNK=10)
+    async def test_asgi_gets_an_async_stream(self):
+        # A sync iterator would be read to the end by Django before the first byte went out
+        response = await self.async_client.get('/dashboard/')
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 3)
+        self.assertIn(b'SN029', b''.join(chunks))
+
+
+class LiveStreamTests(TestCase):
+    def setUp(self):
+        self.async_client.force_login(User.objects.create_user('live', password='x'))
+        self.broker = get_broker()
+        self.broker.heartbeat = 0.01
+        self.addCleanup(vars(self.broker).pop, 'heartbeat')
+
+    @override_settings(STAFF_LIVE_STREAM_SECONDS=0)
+    async def test_stream_ends_and_unsubscribes(self):
+        response = await self.async_client.get('/live/')
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(chunks, [b'retry: 3000\n\n', b': ping\n\n'])
+        self.assertFalse(self.broker._subscribers)
+
+
+class BulkEditTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('bulk', password='x', is_staff=True))
+        self.machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505', serial_number='SN1',
+                                                    status='available', location='Depot')
+
+    def post(self, changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/rental/bulkedit/', json.dumps({'changes': changes}),
+                                    content_type='application/json').json()
+
+    def test_only_whitelisted_valid_changes_are_written(self):
+        pk = self.machine.pk
+        body = self.post([
+            {'id': pk, 'field': 'location', 'value': 'Warehouse'},
+            {'id': pk, 'field': 'serial_number', 'value': 'SN2'},
+            {'id': pk, 'field': 'status', 'value': 'stolen'},
+            {'id': pk, 'field': 'value_tier', 'value': 'priceless'},
+            {'id': pk, 'field': 'notes', 'value': 5},
+            {'id': pk + 1, 'field': 'location', 'value': 'Warehouse'},
+            {'id': 'abc', 'field': 'location', 'value': 'Warehouse'},
+        ])
+        self.assertFalse(body['success'])
+        self.assertEqual(body['updated'], 1)
+        self.assertEqual([r['error'] for r in body['results']], [
+            None, 'Invalid field', 'Invalid status', 'Invalid value tier', 'Invalid value', 'Machine not found',
+            'Invalid machine id',
+        ])
+        self.machine.refresh_from_db()
+        self.assertEqual((self.machine.location, self.machine.serial_number, self.machine.status, self.machine.notes),
+                         ('Warehouse', 'SN1', 'available', ''))
+
+    def test_edit_bumps_the_listing_version(self):
+        label = RentalMachine._meta.label_lower
+        before = versions.get_versions(label)[label]
+        body = self.post([{'id': self.machine.pk, 'field': 'status', 'value': 'maintenance'}])
+        self.assertTrue(body['success'])
+        self.assertGreater(versions.get_versions(label)[label], before)
+
+    def test_nothing_to_change(self):
+        body = self.client.post('/rental/bulkedit/', '{"changes": []}', content_type='application/json').json()
+        self.assertEqual(body, {'success': False, 'error': 'Expected a list of changes'})
+
+    def test_edit_is_pushed_to_open_pages(self):
+        with mock.patch('staff.live.publish') as publish:
+            self.post([{'id': self.machine.pk, 'field': 'status', 'value': 'maintenance'}])
+        publish.assert_called_once_with(
+            {'t': 'machine', 'id': self.machine.pk, 'status': 'maintenance', 'location': 'Depot'})
+
+
+@override_settings(STAFF_STREAM_PAGES=False)
+class RowTemplateTests(TestCase):
+    """The Jinja row templates (staff/jinja2/) must render the same rows as their Django twins."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        customer = Customer.objects.create(first_name='Jo', last_name='<Bloggs>')
+        machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505 "Pro"',
+                                               serial_number='SN1', status='available',
+                                               location='<script>alert(1)</script> & shed')
+        RentalMachine.objects.create(type='bike', brand='Wahoo', model='Kickr', serial_number='SN2', status='rented')
+        MachineMaintenanceDue.objects.create(machine=machine, hire_days_since_service=40, service_interval_days=30,
+                                             next_due=today, priority=MachineMaintenanceDue.OVERDUE,
+                                             refreshed_at=timezone.now())
+        Job.objects.create(rental_machine=machine, customer=customer, booking_date=today, confirmed=True,
+                           scheduled_time=datetime.time(9, 30), route_order=2, notes='Belt <slipping>')
+        Job.objects.create(treadmill=Treadmill.objects.create(brand='Nordic', model='C700', serial_number='T1'))
+        Job.objects.create(external_brand='Sole', external_model='F63', external_serial='X&Y')
+        Part.objects.create(name='Belt <wide>', part_number='B1', quantity_in_stock=5, compatible_models='505 & 605')
+        Part.objects.create(name='Motor', part_number='M1', quantity_in_stock=1)
+        cls.staff = User.objects.create_user('boss', password='x', is_staff=True)
+        cls.tech = User.objects.create_user('tech', password='x')
+
+    def rows(self, url, engine):
+        with override_settings(STAFF_ROW_TEMPLATES=engine):
+            html = self.client.get(url).content.decode()
+        html = re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '', html)  # masked afresh per render
+        # Only whitespace and how quotes are escaped (markupsafe spells them as numeric entities) may differ
+        html = html.replace('&#34;', '&quot;').replace('&#39;', '&#x27;')
+        return re.sub(r'\s+', ' ', re.sub(r'>\s+', '>', re.sub(r'\s+<', '<', html)))
+
+    maxDiff = None
+
+    def test_jinja_rows_match_django_rows(self):
+        self.assertEqual(row_engine(), 'jinja2')
+        for user in (self.staff, self.tech):
+            self.client.force_login(user)
+            for url in ('/dashboard/', '/inventory/', '/jobs/'):
+                with self.subTest(user=user.username, url=url):
+                    self.assertEqual(self.rows(url, 'jinja2'), self.rows(url, 'django'))
+
+    def test_jinja_rows_are_autoescaped(self):
+        self.client.force_login(self.staff)
+        for url, escaped in [('/dashboard/', '&lt;script&gt;alert(1)&lt;/script&gt; &amp; shed'),
+                             ('/inventory/', 'Belt &lt;wide&gt;'),
+                             ('/jobs/', 'Belt &lt;slipping&gt;')]:
+            html = self.rows(url, 'jinja2')
+            self.assertIn(escaped, html)
+            self.assertNotIn('<script>alert', html)
+            self.assertNotIn('<wide>', html)
+
+
+class AsyncMiddlewareTests(TestCase):
+    @override_settings(DEBUG=True)
+    def test_no_middleware_forces_async_views_through_a_thread(self):
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            ASGIHandler()
+        self.assertFalse([line for line in logs.output if 'adapted for middleware' in line], logs.output)
+
+    async def test_write_pins_session_to_primary(self):
+        await sync_to_async(self.async_client.force_login)(await User.objects.acreate(username='pin'))
+        response = await self.async_client.post('/rental/bulkedit/', '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        session = await sync_to_async(lambda: self.async_client.session.get(PIN_SESSION_KEY))()
+        self.assertIsNotNone(session)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505',
+                                                    serial_number='SN1', status='available')
+        self.job = Job.objects.create(rental_machine=self.machine)
+        self.part = Part.objects.create(name='Belt', part_number='B1', quantity_in_stock=5)
+        self.qr_urls = [reverse('staff:rental_qr', args=[self.machine.pk]),
+                        reverse('staff:service_job_qr', args=[self.job.pk]),
+                        reverse('staff:part_qr', args=[self.part.pk])]
+
+    async def login(self):
+        user = await User.objects.acreate(username='tech')
+        await sync_to_async(self.async_client.force_login)(user)
+
+    async def quickedit(self, payload):
+        response = await self.async_client.post(reverse('staff:rental_quickedit', args=[self.machine.pk]),
+                                                 json.dumps(payload), content_type='application/json')
+        return json.loads(response.content)
+
+    async def test_anonymous_users_are_sent_to_log_in(self):
+        for url in self.qr_urls + [reverse('staff:rental_quickedit', args=[self.machine.pk])]:
+            response = await self.async_client.get(url)
+            self.assertRedirects(response, f"{resolve_url(settings.LOGIN_URL)}?next={url}",
+                                 fetch_redirect_response=False)
+
+    async def test_qr_codes_are_svg(self):
+        await self.login()
+        for url in self.qr_urls:
+            response = await self.async_client.get(url)
+            self.assertEqual(response['Content-Type'], 'image/svg+xml')
+            self.assertIn(b'<svg', response.content)
+
+    async def test_qr_codes_for_missing_rows_are_404(self):
+        await self.login()
+        for name in ('rental_qr', 'service_job_qr', 'part_qr'):
+            response = await self.async_client.get(reverse(f'staff:{name}', args=[999]))
+            self.assertEqual(response.status_code, 404)
+
+    async def test_quickedit_saves_a_valid_field(self):
+        await self.login()
+        self.assertEqual(await self.quickedit({'field': 'status', 'value': 'maintenance'}), {'success': True})
+        await self.machine.arefresh_from_db()
+        self.assertEqual(self.machine.status, 'maintenance')
+
+    async def test_quickedit_rejects_bad_values_and_fields(self):
+        await self.login()
+        for payload, error in [({'field': 'status', 'value': 'lost'}, 'Invalid status'),
+                               ({'field': 'value_tier', 'value': 'gold'}, 'Invalid value tier'),
+                               ({'field': 'colour', 'value': 'red'}, 'Invalid field')]:
+            self.assertEqual(await self.quickedit(payload), {'success': False, 'error': error})
+        response = await self.async_client.get(reverse('staff:rental_quickedit', args=[self.machine.pk]))
+        self.assertEqual(json.loads(response.content), {'success': False, 'error': 'Invalid request'})
+        await self.machine.arefresh_from_db()
+        self.assertEqual(self.machine.status, 'available')
+
+
+class ETagTests(TestCase):
+    def test_relogin_does_not_revive_a_page_with_a_stale_csrf_token(self):
+        user = User.objects.create_user('etag', password='x')
+        self.client.force_login(user)
+        self.client.get('/dashboard/')  # sets the csrftoken cookie
+        etag = self.client.get('/dashboard/')['ETag']
+        self.assertEqual(self.client.get('/dashboard/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.logout()
+        self.client.force_login(user)  # login rotates the CSRF secret
+        self.assertEqual(self.client.get('/dashboard/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TaskQueueTests(TestCase):
+    def test_long_task_with_live_worker_is_not_requeued(self):
+        long_ago = timezone.now() - datetime.timedelta(hours=2)
+        alive = Task.objects.create(name='x.alive', status='running', locked_by='a:1', date_started=long_ago)
+        dead = Task.objects.create(name='x.dead', status='running', locked_by='b:2', date_started=long_ago,
+                                   heartbeat_at=long_ago)
+        tasks.heartbeat('a:1')
+        self.assertEqual(tasks.requeue_stale(), 1)
+        alive.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual((alive.status, alive.locked_by), ('running', 'a:1'))
+        self.assertEqual((dead.status, dead.locked_by), ('queued', ''))
+
+
+class PlanDayTests(TestCase):
+    def setUp(self):
+        self.day = datetime.date(2024, 5, 1)
+        self.sam = Technician.objects.create(name='Sam', phone='1', email='sam@example.com')
+        self.alex = Technician.objects.create(name='Alex', phone='2', email='alex@example.com')
+        self.alex_job = Job.objects.create(booking_date=self.day, confirmed=True, technician=self.alex,
+                                           external_brand='Horizon')
+        self.open_job = Job.objects.create(booking_date=self.day, confirmed=True, external_brand='Horizon')
+
+    def test_selected_technicians_keep_their_hands_off_other_jobs(self):
+        summaries = plan_day(self.day, technicians=[self.sam])
+        self.assertEqual([job.pk for job in summaries[0]['jobs']], [self.open_job.pk])
+        self.alex_job.refresh_from_db()
+        self.open_job.refresh_from_db()
+        self.assertEqual(self.alex_job.technician, self.alex)
+        self.assertEqual(self.open_job.technician, self.sam)
+
+    def test_reassign_may_take_other_jobs(self):
+        plan_day(self.day, technicians=[self.sam], reassign=True)
+        self.alex_job.refresh_from_db()
+        self.assertEqual(self.alex_job.technician, self.sam)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('csv', password='x', is_staff=True))
+
+    def test_non_numeric_ids_are_a_bad_request(self):
+        for url in ('/export/rentals.csv?machine=abc', '/export/rentals.csv?customer=1x',
+                    '/export/part_usage.csv?job=abc', '/export/expenses.csv?user=me'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_numeric_id_filters(self):
+        machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505', serial_number='SN7',
+                                               status='available')
+        RentalRecord.objects.create(machine=machine, start_date=datetime.date(2024, 1, 1),
+                                    due_date=datetime.date(2024, 2, 1))
+        response = self.client.get(f'/export/rentals.csv?machine={machine.id}')
+        self.assertEqual(b''.join(response.streaming_content).decode().count('SN7'), 1)
+
+
+    def test_machine_export_keeps_the_page_sort(self):
+        today = timezone.localdate()
+        ok, overdue, unknown = [RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505',
+                                                             serial_number=f'SN{n}', status='available')
+                                for n in range(3)]
+        for machine, priority in ((ok, MachineMaintenanceDue.OK), (overdue, MachineMaintenanceDue.OVERDUE)):
+            MachineMaintenanceDue.objects.create(machine=machine, service_interval_days=30, next_due=today,
+                                                 priority=priority, refreshed_at=timezone.now())
+
+        def exported(query):
+            response = self.client.get(f'/export/machines.csv{query}')
+            rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+            return [row['Serial Number'] for row in rows]
+
+        self.assertEqual(exported('?sort=service'), ['SN1', 'SN0', 'SN2'])
+        self.assertEqual(exported(''), ['SN0', 'SN1', 'SN2'])
+
+
+class ImportTests(TestCase):
+    def write_csv(self, text):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        return path
+
+    def test_imported_machines_get_report_and_maintenance_rows(self):
+        path = self.write_csv("brand,model,serial_number\nProForm,505,SN1\nHorizon,T101,SN2\n")
+        with self.captureOnCommitCallbacks(execute=True):
+            import_file('machines', path)
+        ids = set(RentalMachine.objects.values_list('id', flat=True))
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(set(MachineUtilization.objects.values_list('machine_id', flat=True)), ids)
+        self.assertEqual(set(MachineMaintenanceDue.objects.values_list('machine_id', flat=True)), ids)
+
+    def test_bad_and_repeated_rows_go_to_the_error_report(self):
+        path = self.write_csv("brand,model,serial_number,status\n"
+                              "ProForm,505,SN1,available\n"
+                              ",505,SN2,available\n"
+                              "ProForm,505,SN3,stolen\n"
+                              "Horizon,T101,SN1,rented\n")
+        summary = import_file('machines', path, chunk_size=2)  # the repeat lands in a later chunk
+        self.addCleanup(os.remove, summary['report'])
+        self.assertEqual((summary['rows'], summary['created'], summary['errors']), (4, 1, 3))
+        with open(summary['report'], newline='') as f:
+            report = list(csv.reader(f))[1:]
+        self.assertEqual([(row, key) for row, key, _ in report], [('3', 'SN2'), ('4', 'SN3'), ('5', 'SN1')])
+        self.assertIn('brand: required', report[0][2])
+        self.assertIn('duplicate of row 2', report[2][2])
+        self.assertEqual(RentalMachine.objects.get().brand, 'ProForm')
+
+    def test_reimport_updates_changed_rows_only(self):
+        import_file('parts', self.write_csv("name,part_number,quantity_in_stock\nBelt,B1,4\nMotor,M1,1\n"))
+        summary = import_file('parts', self.write_csv("name,part_number,quantity_in_stock\nBelt,B1,4\nMotor,M1,3\n"))
+        self.assertEqual((summary['created'], summary['updated'], summary['unchanged'], summary['report']),
+                         (0, 1, 1, None))
+        self.assertEqual(Part.objects.get(part_number='M1').quantity_in_stock, 3)
+
+    def write_xlsx(self, rows, formats=None):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        for ref, number_format in (formats or {}).items():
+            workbook.active[ref].number_format = number_format
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        workbook.save(path)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_xlsx_numbers_read_as_the_sheet_shows_them(self):
+        path = self.write_xlsx([['name', 'part_number', 'quantity_in_stock'], ['Belt', 1234, 4]])
+        # Excel and most exporters store whole numbers with a decimal point; openpyxl only writes "4"
+        with zipfile.ZipFile(path) as source:
+            files = {name: source.read(name) for name in source.namelist()}
+        sheet = 'xl/worksheets/sheet1.xml'
+        files[sheet] = files[sheet].replace(b'<v>1234</v>', b'<v>1234.0</v>').replace(b'<v>4</v>', b'<v>4.0</v>')
+        with zipfile.ZipFile(path, 'w') as target:
+            for name, data in files.items():
+                target.writestr(name, data)
+        self.assertEqual(import_file('parts', path)['created'], 1)
+        part = Part.objects.get()
+        self.assertEqual((part.part_number, part.quantity_in_stock), ('1234', 4))
+
+    def test_xlsx_postcodes_and_phones_keep_their_leading_zeros(self):
+        path = self.write_xlsx([
+            ['first_name', 'last_name', 'postcode', 'phone'],
+            ['Jo', 'Darwin', 800, 412345678],
+            ['Al', 'Canberra', 200, 262001111],
+            ['Sam', 'Melbourne', 3000, '(03) 9000 0000'],
+            ['Lee', 'Formatted', 810, 131313],
+        ], formats={'C5': '0000'})
+        self.assertEqual(import_file('customers', path)['created'], 4)
+        self.assertEqual(list(Customer.objects.order_by('id').values_list('postcode', 'phone')), [
+            ('0800', '0412345678'), ('0200', '0262001111'), ('3000', '(03) 9000 0000'), ('0810', '131313'),
+        ])
+
+    def test_uploaded_file_is_removed_after_the_import(self):
+        path = self.write_csv("brand,model,serial_number\nProForm,505,SN1\n")
+        import_file('machines', path, delete_source=True)
+        self.assertFalse(os.path.exists(path))
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def test_unfiltered_count_is_not_the_highest_id(self):
+        parts = Part.objects.bulk_create(Part(name=f'Belt {n}', part_number=f'B{n}', quantity_in_stock=1) for n in range(5))
+        Part.objects.filter(pk__in=[part.pk for part in parts[:4]]).delete()
+        paginator = EstimatedCountPaginator(Part.objects.order_by('pk'), 50)
+        self.assertEqual(paginator.count, 1)
+
+    def test_large_lists_stop_counting_at_the_cap(self):
+        Part.objects.bulk_create(Part(name=f'Belt {n}', part_number=f'B{n}', quantity_in_stock=1) for n in range(5))
+        paginator = EstimatedCountPaginator(Part.objects.order_by('pk'), 2)
+        paginator.cap = 3
+        self.assertEqual(paginator.count, 3)
+
+
+class DedupeTests(TestCase):
+    def customer(self, first, last, phone='0412 345 678', email='bloggs@example.com'):
+        return Customer.objects.create(first_name=first, last_name=last, phone=phone, email=email, postcode='3000')
+
+    def test_reformatted_phone_and_email_still_match(self):
+        jo = self.customer('Jo', 'Bloggs')
+        joanne = self.customer('Joanne', 'Bloggs', phone='+61412345678', email='Bloggs+hire@Example.com')
+        self.customer('Sam', 'Smith', phone='0400 000 000', email='sam@example.com')
+        self.assertEqual(find_duplicates(), [[jo.pk, joanne.pk]])
+
+    def test_merge_moves_history_to_the_survivor(self):
+        jo = self.customer('Jo', 'Bloggs', email='')
+        dup = self.customer('Jo', 'Bloggs')
+        dup.notes = 'Side gate'
+        dup.save()
+        machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505', serial_number='SN1',
+                                               status='available')
+        day = datetime.date(2024, 1, 1)
+        hire = RentalRecord.objects.create(machine=machine, customer=dup, start_date=day, due_date=day)
+        job = Job.objects.create(customer=dup, external_brand='Horizon')
+
+        self.assertEqual(merge_customers([[jo.pk, dup.pk]]), 1)
+        self.assertFalse(Customer.objects.filter(pk=dup.pk).exists())
+        for obj in (hire, job):
+            obj.refresh_from_db()
+            self.assertEqual(obj.customer_id, jo.pk, obj)
+        jo.refresh_from_db()
+        self.assertEqual((jo.email, jo.notes), ('bloggs@example.com', 'Side gate'))
+
+    def test_household_sharing_phone_and_email_is_left_for_review(self):
+        jo, sam = self.customer('Jo', 'Bloggs'), self.customer('Sam', 'Bloggs', phone='+61412345678')
+        self.assertEqual(find_duplicates(), [[jo.pk, sam.pk]])
+        self.assertEqual(find_duplicates(same_name=True), [])
+
+    def test_same_person_is_merged_unattended(self):
+        jo = self.customer('Jo', 'Bloggs')
+        joanne = self.customer('Joanne', 'Bloggs', email='Bloggs+hire@Example.com')
+        self.customer('Sam', 'Bloggs')
+        self.assertEqual(find_duplicates(same_name=True), [[jo.pk, joanne.pk]])
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505', serial_number='SN1',
+                                                    status='available', location='Depot')
+
+    def edit(self, **fields):
+        return {'model': 'machine', 'id': self.machine.pk, 'fields': fields}
+
+    def test_edit_after_someone_elses_change_is_a_conflict(self):
+        token = sync.latest_token()
+        self.machine.location = 'Workshop'
+        self.machine.save()
+        [result] = sync.apply_edits([self.edit(location='Van 2')], base=token)
+        self.assertEqual(result['status'], 'conflict')
+        self.assertEqual(result['current']['location'], 'Workshop')
+
+        [result] = sync.apply_edits([self.edit(location='Van 2')], base=sync.latest_token())
+        self.assertEqual(result['status'], 'ok')
+        self.machine.refresh_from_db()
+        self.assertEqual(self.machine.location, 'Van 2')
+
+    def test_own_edits_in_one_batch_do_not_conflict(self):
+        results = sync.apply_edits([self.edit(location='Van 2'), self.edit(status='maintenance')],
+                                   base=sync.latest_token())
+        self.assertEqual([r['status'] for r in results], ['ok', 'ok'])
+
+    def test_rejected_edits(self):
+        token = sync.latest_token()
+        results = sync.apply_edits([
+            self.edit(serial_number='SN2'),
+            {'model': 'machine', 'id': self.machine.pk + 1, 'fields': {'location': 'Van 2'}},
+            {'model': 'treadmill', 'id': self.machine.pk, 'fields': {'location': 'Van 2'}},
+            'location=Van 2',
+        ], base=token)
+        self.assertEqual([r['status'] for r in results], ['error', 'conflict', 'error', 'error'])
+        self.assertIsNone(results[1]['current'])
+
+    def upload(self, base, *edits):
+        self.client.force_login(User.objects.get_or_create(username='tech')[0])
+        return self.client.post('/sync/upload/', json.dumps({'base': base, 'edits': list(edits)}),
+                                content_type='application/json').json()
+
+    def test_upload_token_does_not_skip_changes_made_meanwhile(self):
+        other = RentalMachine.objects.create(type='treadmill', brand='Horizon', model='T101', serial_number='SN2',
+                                             status='available')
+        token = sync.latest_token()
+        other.location = 'Workshop'
+        other.save()  # someone else, after our last pull
+        body = self.upload(token, self.edit(location='Van 2'))
+        self.assertTrue(body['success'])
+        pulled = sync.changes_since(body['token'])['changes']['machine']
+        self.assertIn(('Workshop', other.pk), [(row['location'], row['id']) for row in pulled])
+
+    def test_upload_token_skips_our_own_edits(self):
+        body = self.upload(sync.latest_token(), self.edit(location='Van 2'))
+        self.assertEqual(body['token'], sync.latest_token())
+        [result] = self.upload(body['token'], self.edit(location='Van 3'))['results']
+        self.assertEqual(result['status'], 'ok')
+
+    def test_compact_is_one_delete_however_many_entries(self):
+        for n in range(20):
+            self.machine.location = f'Van {n}'
+            self.machine.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(sync.compact(), 20)
+
+    def test_compact_keeps_the_newest_entry_per_object(self):
+        for location in ('Van 1', 'Van 2', 'Van 3'):
+            self.machine.location = location
+            self.machine.save()
+        part = Part.objects.create(name='Belt', part_number='B1', quantity_in_stock=1)
+        part_id = part.pk
+        part.delete()
+        sync.compact()
+        entries = ChangeLog.objects.filter(model__in=['machine', 'part'])
+        self.assertEqual(sorted(entries.values_list('model', 'deleted')), [('machine', False), ('part', True)])
+        changes = sync.changes_since(0)
+        self.assertEqual([row['location'] for row in changes['changes']['machine']], ['Van 3'])
+        self.assertEqual(changes['deleted']['part'], [part_id])
+
+
+@override_settings(STAFF_SERVICE_MAX_DAYS=365, STAFF_SERVICE_DUE_SOON_DAYS=14)
+class MaintenanceTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        spec = MachineSpecification.objects.create(brand='ProForm', model='505', service_interval_days=30)
+        self.machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505',
+                                                    serial_number='SN1', status='available', specification=spec)
+
+    def days_ago(self, days):
+        return self.today - datetime.timedelta(days=days)
+
+    def serviced(self, days_ago, model=Job, **extra):
+        completed = timezone.now() - datetime.timedelta(days=days_ago)
+        return model.objects.create(rental_machine=self.machine, status='complete', date_completed=completed,
+                                    external_brand='ProForm', **extra)
+
+    def hired(self, start, end, model=RentalRecord, **extra):
+        return model.objects.create(machine=self.machine, start_date=self.days_ago(start), due_date=self.today,
+                                    return_date=end if end is None else self.days_ago(end), **extra)
+
+    def due(self):
+        refresh_maintenance([self.machine.pk])
+        return MachineMaintenanceDue.objects.get(machine=self.machine)
+
+    def test_never_hired_machine_has_no_due_date(self):
+        due = self.due()
+        self.assertEqual((due.next_due, due.priority, due.service_interval_days), (None, due.OK, 30))
+
+    def test_only_hire_days_after_the_last_service_count(self):
+        self.serviced(20)
+        self.hired(60, 40)  # before the service
+        self.hired(15, 5)
+        due = self.due()
+        self.assertEqual((due.last_service, due.hire_days_since_service), (self.days_ago(20), 10))
+        self.assertEqual((due.next_due, due.priority), (self.days_ago(20) + datetime.timedelta(days=365), due.OK))
+
+    def test_machine_on_hire_gets_a_projected_date(self):
+        self.serviced(50)
+        self.hired(25, None)
+        self.machine.status = 'rented'
+        self.machine.save()
+        due = self.due()
+        self.assertEqual((due.hire_days_since_service, due.next_due, due.priority),
+                         (25, self.today + datetime.timedelta(days=5), due.DUE_SOON))
+
+    def test_archived_jobs_and_hires_count(self):
+        self.serviced(100, model=ArchivedJob, id=1000, date_created=timezone.now())
+        self.hired(80, 40, model=ArchivedRentalRecord, id=1000)
+        due = self.due()
+        self.assertEqual((due.last_service, due.hire_days_since_service), (self.days_ago(100), 40))
+        self.assertEqual((due.next_due, due.priority), (self.today, due.OVERDUE))
+
+    def test_calendar_limit_applies_however_little_the_machine_is_out(self):
+        self.serviced(400)
+        self.hired(10, 8)
+        due = self.due()
+        self.assertEqual((due.hire_days_since_service, due.next_due, due.priority),
+                         (2, self.days_ago(35), due.OVERDUE))
+
+
+class UtilizationReportTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505',
+                                                    serial_number='SN1', status='rented')
+        part = Part.objects.create(name='Belt', part_number='B1', quantity_in_stock=5)
+        long_ago = self.days_ago(400)
+        old_hire = RentalRecord.objects.create(machine=self.machine, start_date=self.days_ago(410),
+                                               due_date=long_ago, return_date=long_ago)
+        old_job = Job.objects.create(rental_machine=self.machine, status='complete',
+                                     date_completed=timezone.now() - datetime.timedelta(days=400))
+        RentalRecord.objects.create(machine=self.machine, start_date=self.days_ago(10), due_date=self.today)
+        open_job = Job.objects.create(rental_machine=self.machine, status='in_progress')
+        PartUsage.objects.create(part=part, rental_record=old_hire, quantity_used=3)
+        PartUsage.objects.create(part=part, job=old_job, quantity_used=1)
+        PartUsage.objects.create(part=part, job=open_job, quantity_used=2)
+
+    def days_ago(self, days):
+        return self.today - datetime.timedelta(days=days)
+
+    def test_counts_live_and_archived_history(self):
+        self.assertEqual(archive_closed(), {'jobs': 1, 'rentals': 1})
+        self.assertEqual(refresh_utilization(), 1)
+        row = MachineUtilization.objects.get(machine=self.machine)
+        self.assertEqual((row.hire_count, row.days_on_hire, row.first_hire, row.job_count, row.parts_used),
+                         (2, 20, self.days_ago(410), 2, 6))
+        self.assertAlmostEqual(row.utilization, 20 / 411)
+
+    def test_refresh_updates_rows_in_place(self):
+        idle = RentalMachine.objects.create(type='bike', brand='Wahoo', model='Kickr', serial_number='SN2',
+                                            status='available')
+        self.assertEqual(refresh_utilization(), 2)
+        RentalRecord.objects.create(machine=idle, start_date=self.days_ago(4), due_date=self.today)
+        self.assertEqual(refresh_utilization([idle.pk]), 1)
+        self.assertEqual(MachineUtilization.objects.count(), 2)
+        self.assertEqual(MachineUtilization.objects.get(machine=idle).days_on_hire, 4)
+        self.assertEqual(MachineUtilization.objects.get(machine=self.machine).hire_count, 2)
+
+    def test_changes_refresh_the_machine_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RentalRecord.objects.create(machine=self.machine, start_date=self.days_ago(1), due_date=self.today)
+        self.assertEqual(MachineUtilization.objects.get(machine=self.machine).hire_count, 3)
+
+    def test_queries_do_not_grow_with_the_fleet(self):
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as small:
+            refresh_utilization()
+        for n in range(20):
+            machine = RentalMachine.objects.create(type='bike', brand='Wahoo', model='Kickr',
+                                                   serial_number=f'B{n}', status='available')
+            RentalRecord.objects.create(machine=machine, start_date=self.days_ago(3), due_date=self.today)
+        with self.assertNumQueries(len(small)):
+            self.assertEqual(refresh_utilization(), 21)
+
+
+@mock.patch.object(snapshots, 'CHUNK_SIZE', 2)
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.customers = [Customer.objects.create(first_name='Jo', last_name=f'Bloggs{n}', suburb='Carlton')
+                          for n in range(5)]
+
+    def table(self, name, column):
+        return snapshots.load_table(name, root=self.root).column(column).to_pylist()
+
+    def files(self, name):
+        directory = os.path.join(self.root, name)
+        return {f: os.stat(os.path.join(directory, f)).st_ino for f in os.listdir(directory)}
+
+    def test_full_snapshot_includes_archived_history_in_the_facts(self):
+        machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505',
+                                               serial_number='SN1', status='available')
+        long_ago = timezone.localdate() - datetime.timedelta(days=400)
+        old = RentalRecord.objects.create(machine=machine, start_date=long_ago, due_date=long_ago,
+                                          return_date=long_ago + datetime.timedelta(days=7))
+        current = RentalRecord.objects.create(machine=machine, start_date=timezone.localdate(),
+                                              due_date=timezone.localdate())
+        archive_closed()
+        written = snapshots.take_snapshot(full=True, root=self.root)
+        self.assertEqual((written['customers'], written['rental_records'], written['rental_facts']), (5, 1, 2))
+        self.assertEqual(self.table('rental_facts', 'id'), [old.pk, current.pk])
+        self.assertEqual(self.table('rental_facts', 'hire_length'), [7, 0])
+        self.assertEqual(self.table('archived_rental_records', 'id'), [old.pk])
+
+    def test_incremental_runs_append_new_rows_only(self):
+        snapshots.take_snapshot(root=self.root)
+        before = self.files('customers')
+        added = Customer.objects.create(first_name='Al', last_name='New')
+        self.assertEqual(snapshots.take_snapshot(root=self.root)['customers'], 1)
+        self.assertEqual(self.table('customers', 'id'), [c.pk for c in self.customers] + [added.pk])
+        self.assertEqual({f: t for f, t in self.files('customers').items() if f in before}, before)
+
+    def test_incremental_runs_rewrite_files_with_edited_or_deleted_rows(self):
+        snapshots.take_snapshot(root=self.root)
+        before = self.files('customers')
+        edited, deleted = self.customers[0], self.customers[3]
+        edited.suburb = 'Fitzroy'
+        edited.save()
+        deleted.delete()
+        # The two files holding them are re-exported (2 + 1 rows); the third is left alone
+        self.assertEqual(snapshots.take_snapshot(root=self.root)['customers'], 3)
+        self.assertEqual(self.table('customers', 'suburb'), ['Fitzroy'] + ['Carlton'] * 3)
+        self.assertNotIn(deleted.pk, self.table('customers', 'id'))
+        after = self.files('customers')
+        self.assertEqual(after.keys(), before.keys())
+        self.assertEqual(sum(before[f] == after[f] for f in before), 1)
+        self.assertEqual(snapshots.take_snapshot(root=self.root)['customers'], 0)
+
+    def test_unlogged_tables_are_rebuilt(self):
+        machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505',
+                                               serial_number='SN1', status='rented')
+        hire = RentalRecord.objects.create(machine=machine, start_date=timezone.localdate(),
+                                           due_date=timezone.localdate())
+        snapshots.take_snapshot(root=self.root)
+        RentalRecord.objects.filter(pk=hire.pk).update(return_date=timezone.localdate())
+        snapshots.take_snapshot(root=self.root)
+        self.assertEqual(self.table('rental_records', 'return_date'), [timezone.localdate()])
+
+
+class AdminSearchTests(TestCase):
+    def search(self, model, term):
+        queryset, _ = admin.site._registry[model].get_search_results(None, model.objects.all(), term)
+        return queryset
+
+    def test_prefix_searches_use_the_nocase_indexes(self):
+        job_plan = self.search(Job, 'pro').explain()
+        for index in ('staff_machine_brand_nocase', 'staff_machine_model_nocase',
+                      'staff_customer_last_nocase', 'staff_customer_first_nocase'):
+            self.assertIn(f'USING INDEX {index}', job_plan)
+        self.assertIn('USING INDEX staff_part_name_nocase', self.search(PartUsage, 'belt').explain())
+
+    def test_prefix_search_ignores_case(self):
+        job = Job.objects.create(customer=Customer.objects.create(first_name='Jo', last_name='McDonald'))
+        self.assertEqual(list(self.search(Job, 'mcd')), [job])
+
+
+class ObjectCacheTests(TestCase):
+    def setUp(self):
+        objcache.get_backend().clear()
+        self.specs = [MachineSpecification.objects.create(brand='ProForm', model=str(n)) for n in (505, 605, 705)]
+
+    @override_settings(STAFF_OBJECT_CACHE_SIZE=2)
+    def test_lru_keeps_the_most_recently_used_entries(self):
+        cache = objcache.LocalLRUCache()
+        cache.set_many({'a': 1, 'b': 2})
+        cache.get_many(['a'])
+        cache.set_many({'c': 3})
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+
+    @override_settings(STAFF_OBJECT_CACHE_TIMEOUT=60)
+    def test_entries_expire(self):
+        cache = objcache.LocalLRUCache()
+        with mock.patch('staff.objcache.time.monotonic', return_value=1000.0):
+            cache.set_many({'a': 1})
+        with mock.patch('staff.objcache.time.monotonic', return_value=1059.0):
+            self.assertEqual(cache.get_many(['a']), {'a': 1})
+        with mock.patch('staff.objcache.time.monotonic', return_value=1061.0):
+            self.assertEqual(cache.get_many(['a']), {})
+
+    def test_get_many_reads_all_misses_in_one_query(self):
+        ids = [spec.pk for spec in self.specs]
+        objcache.get(MachineSpecification, ids[0])
+        with self.assertNumQueries(1):
+            found = objcache.get_many(MachineSpecification, ids + [999])
+        self.assertEqual(sorted(found), ids)
+        with self.assertNumQueries(0):
+            objcache.get_many(MachineSpecification, ids)
+
+    def test_cached_copies_cannot_change_the_cache(self):
+        objcache.get(MachineSpecification, self.specs[0].pk).model = 'changed'
+        self.assertEqual(objcache.get(MachineSpecification, self.specs[0].pk).model, '505')
+
+    def test_save_and_delete_invalidate(self):
+        spec, pk = self.specs[0], self.specs[0].pk
+        objcache.all_objects(MachineSpecification)
+        objcache.get(MachineSpecification, pk)
+        spec.model = '505i'
+        spec.save()
+        self.assertEqual(objcache.get(MachineSpecification, pk).model, '505i')
+        self.assertEqual(objcache.all_objects(MachineSpecification)[0].model, '505i')
+        spec.delete()
+        self.assertIsNone(objcache.get(MachineSpecification, pk))
+        self.assertEqual(len(objcache.all_objects(MachineSpecification)), 2)
+
+    def test_bulk_changed_invalidates_given_rows_or_the_whole_model(self):
+        from .signals import bulk_changed
+        first, second = self.specs[:2]
+        objcache.get_many(MachineSpecification, [first.pk, second.pk])
+        MachineSpecification.objects.filter(pk=first.pk).update(notes='belt worn')
+        bulk_changed(MachineSpecification, ids=[first.pk])
+        self.assertEqual(objcache.get(MachineSpecification, first.pk).notes, 'belt worn')
+
+        MachineSpecification.objects.update(notes='checked')
+        bulk_changed(MachineSpecification)
+        self.assertEqual(objcache.get(MachineSpecification, second.pk).notes, 'checked')
+
+    def test_repeat_spec_pages_need_no_queries(self):
+        from django.test import RequestFactory
+        from .views import spec_detail, spec_search
+        user = User.objects.create_user('staff', password='pw')
+        pages = [(spec_detail, '/staff/specs/1/', {'id': self.specs[0].pk}), (spec_search, '/staff/specs/?q=605', {})]
+        for view, path, kwargs in pages:
+            request = RequestFactory().get(path)
+            request.user = user
+            view(request, **kwargs)
+            with self.assertNumQueries(0):
+                response = view(request, **kwargs)
+            self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '605')
+        self.assertNotContains(response, '705')
+
+
+class StartupTests(TestCase):
+    def test_profile_startup_runs_from_any_directory(self):
+        out = StringIO()
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as elsewhere:
+            os.chdir(elsewhere)
+            try:
+                call_command('profile_startup', runs=1, top=3, stdout=out)
+            finally:
+                os.chdir(cwd)
+        self.assertIn('Cold start (without warm-up): median', out.getvalue())
+        self.assertIn('django.urls', out.getvalue())
+
+    def test_profile_startup_failure_reports_child_stderr(self):
+        failed = subprocess.CompletedProcess([], 1, stdout='', stderr="ModuleNotFoundError: No module named 'website'")
+        with mock.patch('subprocess.run', return_value=failed):
+            with self.assertRaisesMessage(CommandError, "No module named 'website'"):
+                call_command('profile_startup', runs=1, stdout=StringIO())
+
+    def test_warm_up_loads_row_templates_for_the_streaming_engine(self):
+        from django.template import loader
+        with mock.patch.object(loader, 'get_template', wraps=loader.get_template) as get_template, \
+                mock.patch.dict(os.environ, {'STAFF_WARMUP': '1'}):
+            warm_up()
+        loaded = {(c.args[0], c.kwargs.get('using')) for c in get_template.call_args_list}
+        for name in ROW_TEMPLATES:
+            self.assertIn((name, row_engine()), loaded)
+
+
+class GeoTests(TestCase):
+    ROWS = [
+        {'postcode': '', 'suburb': 'Carlton', 'state': 'VIC', 'latitude': '-37.8', 'longitude': '144.96'},
+        {'postcode': '', 'suburb': 'Carlton', 'state': 'NSW', 'latitude': '-33.97', 'longitude': '151.12'},
+        {'postcode': '', 'suburb': 'Mount Druitt', 'state': 'NSW', 'latitude': '-33.77', 'longitude': '150.82'},
+        {'postcode': '', 'suburb': 'Druitt', 'state': 'NSW', 'latitude': '-30.0', 'longitude': '150.0'},
+        {'postcode': '2026', 'suburb': 'Bondi', 'state': 'NSW', 'latitude': '-33.89', 'longitude': '151.26'},
+        {'postcode': '2026', 'suburb': 'Bondi Beach', 'state': 'NSW', 'latitude': '-33.91', 'longitude': '151.28'},
+    ]
+
+    def setUp(self):
+        # The caches are keyed on change counters, which restart with every test's rollback
+        geo._gazetteer = (None, None)
+        geo._indexes.clear()
+
+    def test_kd_tree_yields_points_nearest_first(self):
+        import random
+        rng = random.Random(4)
+        points = [geo.to_vector(rng.uniform(-44, -10), rng.uniform(113, 154)) for _ in range(300)]
+        tree = geo.KDTree((p, i) for i, p in enumerate(points))
+        for _ in range(20):
+            target = geo.to_vector(rng.uniform(-44, -10), rng.uniform(113, 154))
+            by_distance = sorted(range(len(points)), key=lambda i: sum((a - b) ** 2 for a, b in zip(points[i], target)))
+            self.assertEqual([i for _, i in tree.nearest(target)], by_distance)
+
+    def test_suburbs_resolve_by_state_and_longest_name(self):
+        places = geo.Gazetteer(self.ROWS)
+        self.assertEqual(places.locate('Carlton VIC'), (-37.8, 144.96))
+        self.assertEqual(places.locate('Carlton NSW'), (-33.97, 151.12))
+        self.assertEqual(places.locate('12 Main Rd, Mt Druitt'), (-33.77, 150.82))
+        self.assertIsNone(places.locate('Nowhere'))
+
+    def test_postcode_rows_resolve_to_the_middle_of_their_localities(self):
+        lat, lon = geo.Gazetteer(self.ROWS).locate('2026')
+        self.assertAlmostEqual(lat, -33.90)
+        self.assertAlmostEqual(lon, 151.27)
+
+    def test_missing_postcodes_are_derived_from_customer_suburbs(self):
+        places = geo.Gazetteer(self.ROWS, [('3053', 'Carlton'), ('2170', 'Nowhere'), ('2026', 'Carlton')])
+        self.assertEqual(places.locate('3053'), (-37.8, 144.96))  # the VIC Carlton: 3xxx is Victoria
+        self.assertIsNone(places.locate('2170'))
+        self.assertAlmostEqual(places.locate('2026')[0], -33.90)  # places-file postcodes win
+
+    def test_bundled_gazetteer_learns_postcodes_as_customers_are_added(self):
+        self.assertIsNone(geo.gazetteer().locate('3000'))
+        Customer.objects.create(first_name='Jo', last_name='Bloggs', suburb='Melbourne', postcode='3000')
+        self.assertEqual(geo.gazetteer().locate('3000'), geo.gazetteer().locate('Melbourne VIC'))
+
+    def test_nearest_available_ranks_machines_by_distance(self):
+        customer = Customer.objects.create(first_name='Jo', last_name='Bloggs', suburb='Carlton', postcode='3053')
+        for serial, location in [('SYD', 'Sydney NSW'), ('MEL', 'North Melbourne VIC'), ('PER', 'Perth WA')]:
+            RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505', serial_number=serial,
+                                         location=location, status='available')
+        origin, ranked = geo.nearest_available(customer, limit=2)
+        self.assertEqual(origin, geo.gazetteer().locate('Carlton VIC'))
+        self.assertEqual([m.serial_number for m, _ in ranked], ['MEL', 'SYD'])
+        self.assertLess(ranked[0][1], 5)
+
+
+class SpecMatchTests(TestCase):
+    def setUp(self):
+        self.specs = {f'{brand} {model}': MachineSpecification.objects.create(brand=brand, model=model)
+                      for brand, model in [('ProForm', '605'), ('NordicTrack', 'C 1650'),
+                                           ('ProForm', '505 CST'), ('ProForm', '505 CSE')]}
+
+    def machine(self, brand, model):
+        return RentalMachine.objects.create(type='treadmill', brand=brand, model=model, serial_number=f'{brand}{model}',
+                                            status='available')
+
+    def linked(self, machine):
+        machine.refresh_from_db()
+        return machine.specification
+
+    def test_different_model_number_is_not_linked(self):
+        machine = self.machine('NordicTrack', 'C 1750')
+        counts, proposals = match_specs()
+        self.assertEqual(counts['machines'], 0)
+        self.assertIsNone(self.linked(machine))
+        self.assertEqual([(p['spec'], p['auto']) for p in proposals], [('NordicTrack C 1650', False)])
+
+    def test_brand_typo_with_exact_model_number_is_linked(self):
+        machine = self.machine('Nordic Trak', 'C1650')
+        self.assertEqual(match_specs()[0]['machines'], 1)
+        self.assertEqual(self.linked(machine), self.specs['NordicTrack C 1650'])
+
+    def test_ambiguous_match_goes_to_review(self):
+        machine = self.machine('ProForm', '505 CS')
+        counts, proposals = match_specs()
+        self.assertEqual(counts['machines'], 0)
+        self.assertIsNone(self.linked(machine))
+        self.assertFalse(proposals[0]['auto'])
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('archive', password='x', is_staff=True))
+        long_ago = timezone.now() - datetime.timedelta(days=400)
+        self.customer = Customer.objects.create(first_name='Jo', last_name='Bloggs')
+        self.machine = RentalMachine.objects.create(type='treadmill', brand='ProForm', model='505',
+                                                    serial_number='SN1', status='available')
+        Treadmill.objects.create(brand='ProForm', model='505', serial_number='SN1')
+        self.old_hire = RentalRecord.objects.create(machine=self.machine, customer=self.customer,
+                                                    start_date=long_ago.date(), due_date=long_ago.date(),
+                                                    return_date=long_ago.date())
+        self.new_hire = RentalRecord.objects.create(machine=self.machine, customer=self.customer,
+                                                    start_date=timezone.localdate(), due_date=timezone.localdate())
+        self.old_job = Job.objects.create(treadmill=Treadmill.objects.get(), customer=self.customer,
+                                          status='complete', date_completed=long_ago, notes='Belt replaced')
+        self.open_job = Job.objects.create(customer=self.customer, status='in_progress')
+        part = Part.objects.create(name='Belt', part_number='B1', quantity_in_stock=5)
+        self.job_usage = PartUsage.objects.create(part=part, job=self.old_job, quantity_used=1)
+        self.hire_usage = PartUsage.objects.create(part=part, rental_record=self.old_hire, quantity_used=2)
+
+    def test_closed_rows_move_to_the_archive_with_their_ids(self):
+        self.assertEqual(archive_closed(), {'jobs': 1, 'rentals': 1})
+        self.assertEqual(list(Job.objects.values_list('id', flat=True)), [self.open_job.pk])
+        self.assertEqual(list(RentalRecord.objects.values_list('id', flat=True)), [self.new_hire.pk])
+        self.assertEqual(ArchivedJob.objects.get().notes, 'Belt replaced')
+        self.assertEqual(ArchivedJob.objects.get().pk, self.old_job.pk)
+        self.assertEqual(ArchivedRentalRecord.objects.get().pk, self.old_hire.pk)
+
+    def test_part_usage_points_at_the_archived_rows(self):
+        archive_closed()
+        self.job_usage.refresh_from_db()
+        self.hire_usage.refresh_from_db()
+        self.assertEqual((self.job_usage.job_id, self.job_usage.archived_job_id), (None, self.old_job.pk))
+        self.assertEqual((self.hire_usage.rental_record_id, self.hire_usage.archived_rental_record_id),
+                         (None, self.old_hire.pk))
+
+    def test_sync_clients_get_tombstones(self):
+        token = sync.latest_token()
+        archive_closed()
+        self.assertEqual(sync.changes_since(token)['deleted'], {'job': [self.old_job.pk]})
+
+    def test_running_again_moves_nothing(self):
+        archive_closed()
+        self.assertEqual(archive_closed(), {'jobs': 0, 'rentals': 0})
+        self.assertEqual((ArchivedJob.objects.count(), ArchivedRentalRecord.objects.count()), (1, 1))
+
+    def test_exports_keep_archived_history(self):
+        archive_closed()
+        rows = list(csv.reader(b''.join(self.client.get('/export/rentals.csv').streaming_content).decode().splitlines()))
+        self.assertEqual([(row[0], row[-1]) for row in rows[1:]],
+                         [(str(self.new_hire.pk), 'False'), (str(self.old_hire.pk), 'True')])
+        rows = list(csv.reader(b''.join(self.client.get('/export/jobs.csv').streaming_content).decode().splitlines()))
+        self.assertEqual(sorted(row[0] for row in rows[1:]), sorted([str(self.old_job.pk), str(self.open_job.pk)]))
+        response = self.client.get(f'/export/part_usage.csv?job={self.old_job.pk}')
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row[-2:] for row in rows[1:]], [[str(self.old_job.pk), '']])
+
+    def test_rental_detail_lists_archived_parts(self):
+        archive_closed()
+        page = self.client.get(f'/rental/{self.machine.pk}/?archived=1').content.decode()
+        self.assertIn('Belt replaced – parts: 1x Belt', page)
+        self.assertIn('parts: 2x Belt', page)
+
+    def test_api_serves_archived_rows(self):
+        archive_closed()
+        body = self.client.get(f'/api/customers/{self.customer.pk}/?expand=archived_rentals,archived_jobs').json()
+        self.assertEqual([row['id'] for row in body['archived_rentals']], [self.old_hire.pk])
+        self.assertEqual([row['id'] for row in body['archived_jobs']], [self.old_job.pk])
+        body = self.client.get('/api/archived_jobs/?expand=customer').json()
+        self.assertEqual([(row['id'], row['customer']['last_name']) for row in body['results']],
+                         [(self.old_job.pk, 'Bloggs')])
+
+    def test_merging_customers_moves_archived_history(self):
+        archive_closed()
+        jo = Customer.objects.create(first_name='Jo', last_name='Bloggs')
+        merge_customers([[jo.pk, self.customer.pk]])
+        self.assertEqual(ArchivedJob.objects.get().customer_id, jo.pk)
+        self.assertEqual(ArchivedRentalRecord.objects.get().customer_id, jo.pk)
@@ -11,12 +11,24 @@ urlpatterns = [
     path('rental/<int:id>/', views.rental_detail, name='rental_detail'),
     path('rental/<int:id>/edit/', views.rental_edit, name='rental_edit'),
     path('rental/<int:id>/quickedit/', views.rental_quickedit, name='rental_quickedit'),
+    path('rental/bulkedit/', views.rental_bulkedit, name='rental_bulkedit'),
     path('rental/<int:id>/qr/', views.rental_qr, name='rental_qr'),
     path('rental/<int:machine_id>/newhire/', views.new_hire, name='new_hire'),
     path('spec/<int:id>/', views.spec_detail, name='spec_detail'),
     path('rental/add/', views.rental_add, name='rental_add'),
     path('rental/<int:id>/delete/', views.rental_delete, name='rental_delete'),
     path('customers/add/', views.customer_add, name='customer_add'),
+    path('customers/<int:id>/nearest/', views.customer_nearest, name='customer_nearest'),
+    path('reports/utilization/', views.utilization_report, name='utilization_report'),
+    path('export/<str:kind>.csv', views.export_csv, name='export_csv'),
+    path('import/', views.data_import, name='data_import'),
+    path('import/<int:id>/errors/', views.data_import_report, name='data_import_report'),
+    path('live/', views.live_events, name='live_events'),
+    path('tasks/<int:id>/', views.task_status, name='task_status'),
+    path('api/<str:resource>/', views.api_list, name='api_list'),
+    path('api/<str:resource>/<int:id>/', views.api_detail, name='api_detail'),
+    path('sync/', views.sync_changes, name='sync_changes'),
+    path('sync/upload/', views.sync_upload, name='sync_upload'),
     path('jobs/', views.service_jobs, name='service_jobs'),                    # ✅ list
     path('jobs/<int:id>/', views.service_job_detail, name='service_job_detail'),  # ✅ detail
     path('jobs/<int:id>/qr/', views.service_job_qr, name='service_job_qr'),       # ✅ QR (links to detail)
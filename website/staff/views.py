@@ -1,75 +1,157 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse
+import asyncio
+import json
+import os
+import tempfile
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, redirect, resolve_url
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse, FileResponse
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Count, Sum, Avg, Max, Prefetch
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
+from django.views.decorators.http import condition
 from .models import (
-    RentalMachine, MachineSpecification, RentalRecord, Job,
+    RentalMachine, MachineSpecification, RentalRecord, Job, Treadmill,
     StaffProfile, ActivityLog, Timesheet, Expense, Customer,
-    Part, PartUsage
+    Part, PartUsage, Task, MachineUtilization, ArchivedJob, MachineMaintenanceDue
 )
 from .forms import MachineSpecificationForm, ExpenseForm, CustomerForm, ServiceJobForm
-from qrcode.image.svg import SvgImage  # ✅ SVG output avoids Pillow/zlib issues
-import qrcode
+from . import api, objcache
+from .exports import EXPORTS, stream_csv
+from .filters import filter_machines, filter_parts
+from .geo import nearest_available
+from .hires import MachineUnavailable, start_hire
+from .importers import IMPORTS, import_file
+from .live import get_broker
+from .replica import read_replica
+from .signals import bulk_changed
+from .streaming import stream_page
+from .sync import apply_edits, changes_since, resume_token
+from .tasks import enqueue, task_name
+from .versions import etag_for
 from io import BytesIO
 
 
+def _attach_cached(obj, *fields):
+    """Fill foreign keys to reference models (specs, technicians) from the object cache instead of a query each."""
+    for name in fields:
+        related_id = getattr(obj, f'{name}_id')
+        if related_id is not None:
+            related = objcache.get(obj._meta.get_field(name).related_model, related_id)
+            if related is not None:
+                setattr(obj, name, related)
+
+
 def admin_required(view_func):
     return user_passes_test(lambda u: u.is_staff)(view_func)
 
 
+def async_login_required(view_func):
+    """login_required for ``async def`` views (Django 4.2's decorator only wraps sync views)."""
+    @wraps(view_func)
+    async def _wrapped(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path(), resolve_url(settings.LOGIN_URL))
+        return await view_func(request, *args, **kwargs)
+    return _wrapped
+
+
+async def aget_object_or_404(model, **kwargs):
+    try:
+        return await model.objects.aget(**kwargs)
+    except model.DoesNotExist:
+        raise Http404(f"No {model._meta.object_name} matches the given query.")
+
+
+def _qr_svg(url):
+    """Encode ``url`` as a small SVG QR (CPU-bound, so async views run it off the event loop)."""
+    # Imported here, not at module level: qrcode costs ~75 ms and most processes never draw a QR
+    import qrcode
+    from qrcode.image.svg import SvgImage  # ✅ SVG output avoids Pillow/zlib issues
+
+    qr = qrcode.QRCode(
+        version=1, box_size=2, border=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+    img = qr.make_image(image_factory=SvgImage)  # SVG output
+    buffer = BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+async def _qr_response(url):
+    # thread_sensitive=False → runs in the default thread pool, not the single sync-ORM thread
+    svg_data = await sync_to_async(_qr_svg, thread_sensitive=False)(url)
+    return HttpResponse(svg_data, content_type="image/svg+xml")
+
+
 @login_required
+@read_replica
+@condition(etag_func=etag_for(RentalMachine, MachineMaintenanceDue))  # ✅ 304 before any list query when nothing changed
 def dashboard(request):
     q = request.GET.get('q', '').strip()
     status_filter = request.GET.get('status', '')
     tier_filter = request.GET.get('tier', '')
+    service_filter = request.GET.get('service', '')
+    sort = request.GET.get('sort', '')
 
-    machines = RentalMachine.objects.all()
-
-    # Search (Q to preserve chaining)
-    if q:
-        machines = machines.filter(
-            Q(brand__icontains=q) |
-            Q(model__icontains=q) |
-            Q(serial_number__icontains=q)
-        )
-
-    # Filters
-    if status_filter:
-        machines = machines.filter(status=status_filter)
-    if tier_filter:
-        machines = machines.filter(value_tier=tier_filter)
+    # Search + filters (shared with the CSV export)
+    machines = filter_machines(RentalMachine.objects.select_related('maintenance_due'), request.GET)
 
     # Totals
     total_machines = RentalMachine.objects.count()
     counts = RentalMachine.objects.values('status').annotate(total=Count('id'))
     status_summary = {row['status']: row['total'] for row in counts}
 
-    return render(request, 'staff/dashboard.html', {
-        'machines': machines,                # ✅ pass queryset, not wrapped objects
+    # ✅ header goes out at once, rows follow in chunks from a DB cursor
+    return stream_page(request, 'staff/dashboard.html', {
         'q': q,
         'status_filter': status_filter,
         'tier_filter': tier_filter,
+        'service_filter': service_filter,
+        'sort': sort,
         'status_summary': status_summary,
         'total_machines': total_machines,    # ✅ template expects this
+    }, {
+        'machine_rows': ('staff/rows/dashboard.html', 'machines', machines),
     })
 
 
 @login_required
+@condition(etag_func=etag_for(RentalMachine, MachineSpecification, Job, RentalRecord, Customer))
 def rental_detail(request, id):
     machine = get_object_or_404(RentalMachine, id=id)
+    _attach_cached(machine, 'specification')
     service_history = Job.objects.filter(
         treadmill__serial_number=machine.serial_number
     ).order_by('-date_created')
     rental_history = RentalRecord.objects.filter(
         machine=machine
     ).select_related('customer').order_by('-start_date')
-    return render(request, 'staff/rental_detail.html', {
+    context = {
         'machine': machine,
         'service_history': service_history,
-        'rental_history': rental_history
-    })
+        'rental_history': rental_history,
+        'show_archived': request.GET.get('archived') == '1',
+    }
+    if context['show_archived']:
+        # Closed work older than STAFF_ARCHIVE_AFTER_DAYS lives in the archive tables (staff/archive.py)
+        # archive_closed re-points the parts used at the archived rows
+        usage = PartUsage.objects.select_related('part').order_by('id')
+        context['archived_service_history'] = ArchivedJob.objects.filter(
+            treadmill__serial_number=machine.serial_number
+        ).prefetch_related(Prefetch('partusage_set', queryset=usage)).order_by('-date_created')
+        context['archived_rental_history'] = machine.archived_rentals.select_related('customer').prefetch_related(
+            Prefetch('partusage_set', queryset=usage)).order_by('-start_date')
+    return render(request, 'staff/rental_detail.html', context)
 
 
 @login_required
@@ -106,19 +188,19 @@ def rental_delete(request, id):
     return redirect('staff:dashboard')
 
 
-@login_required
-def rental_quickedit(request, id):
+VALID_STATUSES = {"available", "rented", "maintenance", "retired"}
+VALID_TIERS = {"low", "medium", "high", "commercial"}
+
+
+@async_login_required
+async def rental_quickedit(request, id):
     # ✅ Keep CSRF protection; your fetch already sends the token header.
     if request.method == 'POST':
-        machine = get_object_or_404(RentalMachine, id=id)
-        import json
+        machine = await aget_object_or_404(RentalMachine, id=id)
         data = json.loads(request.body or "{}")
         field = data.get('field')
         value = data.get('value')
 
-        VALID_STATUSES = {"available", "rented", "maintenance", "retired"}
-        VALID_TIERS = {"low", "medium", "high", "commercial"}
-
         if field == "status" and value not in VALID_STATUSES:
             return JsonResponse({"success": False, "error": "Invalid status"})
         if field == "value_tier" and value not in VALID_TIERS:
@@ -126,12 +208,193 @@ def rental_quickedit(request, id):
 
         if hasattr(machine, field):
             setattr(machine, field, value)
-            machine.save(update_fields=[field])
+            await machine.asave(update_fields=[field])
             return JsonResponse({"success": True})
         return JsonResponse({"success": False, "error": "Invalid field"})
     return JsonResponse({"success": False, "error": "Invalid request"})
 
 
+# Fields the dashboard is allowed to change in bulk
+BULK_EDIT_FIELDS = {"status", "value_tier", "location", "condition", "notes"}
+
+
+def _apply_bulk_edit(changes):
+    """Validate every change in one pass, then write them with a single bulk_update.
+
+    Returns one result dict per input row, in input order.
+    """
+    results = []
+    valid = []
+    ids = set()
+    for row in changes:
+        try:
+            machine_id = int(row.get("id"))
+        except (TypeError, ValueError, AttributeError):
+            results.append({"id": None, "success": False, "error": "Invalid machine id"})
+            continue
+        field, value = row.get("field"), row.get("value")
+        error = None
+        if field not in BULK_EDIT_FIELDS:
+            error = "Invalid field"
+        elif field == "status" and value not in VALID_STATUSES:
+            error = "Invalid status"
+        elif field == "value_tier" and value not in VALID_TIERS:
+            error = "Invalid value tier"
+        elif not isinstance(value, str):
+            error = "Invalid value"
+        results.append({"id": machine_id, "field": field, "success": error is None, "error": error})
+        if error is None:
+            valid.append((len(results) - 1, machine_id, field, value))
+            ids.add(machine_id)
+
+    with transaction.atomic():
+        machines = RentalMachine.objects.select_for_update().in_bulk(ids)
+        touched, fields = {}, set()
+        for index, machine_id, field, value in valid:
+            machine = machines.get(machine_id)
+            if machine is None:
+                results[index].update(success=False, error="Machine not found")
+                continue
+            setattr(machine, field, value)
+            touched[machine_id] = machine
+            fields.add(field)
+        if touched:
+            RentalMachine.objects.bulk_update(touched.values(), sorted(fields))
+            bulk_changed(RentalMachine, touched.values())
+    return results
+
+
+@async_login_required
+async def rental_bulkedit(request):
+    """POST {"changes": [{"id": 1, "field": "location", "value": "Warehouse"}, ...]}"""
+    if request.method != 'POST':
+        return JsonResponse({"success": False, "error": "Invalid request"})
+    try:
+        changes = json.loads(request.body or "{}").get("changes")
+    except (ValueError, AttributeError):
+        changes = None
+    if not isinstance(changes, list) or not changes:
+        return JsonResponse({"success": False, "error": "Expected a list of changes"})
+
+    results = await sync_to_async(_apply_bulk_edit)(changes)
+    return JsonResponse({
+        "success": all(r["success"] for r in results),
+        "updated": sum(1 for r in results if r["success"]),
+        "results": results,
+    })
+
+
+@async_login_required
+async def live_events(request):
+    """Server-Sent Events stream of machine/job status deltas (serve under ASGI).
+
+    Django doesn't notice when the browser goes away mid-stream, so each stream ends
+    after STAFF_LIVE_STREAM_SECONDS and the page reconnects after the ``retry:`` delay.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(settings, 'STAFF_LIVE_STREAM_SECONDS', 300)
+
+    async def stream():
+        events = get_broker().subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            async for event in events:
+                if event is None:
+                    yield ": ping\n\n"  # keep-alive so proxies don't drop an idle stream
+                else:
+                    yield f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+                if loop.time() >= deadline:
+                    break
+        finally:
+            await events.aclose()  # unsubscribe, also when the server cancels the stream
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@async_login_required
+async def task_status(request, id):
+    """Poll a background task queued with staff.tasks.enqueue()."""
+    task = await aget_object_or_404(Task, id=id)
+    is_staff = await sync_to_async(lambda: request.user.is_staff)()
+    if not is_staff and task.created_by_id != request.user.pk:
+        raise Http404("No Task matches the given query.")
+    return JsonResponse({
+        "id": task.id,
+        "name": task.name,
+        "status": task.status,
+        "attempts": task.attempts,
+        "result": task.result,
+        "error": task.error.strip().splitlines()[-1] if task.error else "",
+    })
+
+
+@login_required
+@read_replica
+def api_list(request, resource):
+    """Read-only JSON listing – see staff/api.py for fields=, expand=, ids= and cursor paging."""
+    if resource not in api.RESOURCES:
+        raise Http404("Unknown API resource.")
+    try:
+        rows, next_cursor = api.fetch(resource, request.GET)
+    except api.ApiError as exc:
+        return api.json_response({"error": str(exc)}, status=400)
+    return api.json_response({"results": rows, "next": next_cursor})
+
+
+@login_required
+@read_replica
+def api_detail(request, resource, id):
+    if resource not in api.RESOURCES:
+        raise Http404("Unknown API resource.")
+    try:
+        rows, _ = api.fetch(resource, request.GET, pk=id)
+    except api.ApiError as exc:
+        return api.json_response({"error": str(exc)}, status=400)
+    if not rows:
+        return api.json_response({"error": "Not found"}, status=404)
+    return api.json_response(rows[0])
+
+
+@login_required
+def sync_changes(request):
+    """Delta feed for the offline technician app: rows changed since ?since=<token>, plus tombstones.
+
+    Keep calling with the returned token while "more" is true.
+    """
+    try:
+        since = max(int(request.GET.get('since', 0)), 0)
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid change token"})
+    return JsonResponse({"success": True, **changes_since(since)})
+
+
+@login_required
+def sync_upload(request):
+    """POST {"base": <token of last sync>, "edits": [{"model": "job", "id": 1, "fields": {...}}, ...]}
+
+    The returned token skips the client's own edits but nobody else's; pull from it next.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"success": False, "error": "Invalid request"})
+    try:
+        payload = json.loads(request.body or "{}")
+        edits, base = payload.get("edits"), int(payload.get("base") or 0)
+    except (ValueError, AttributeError, TypeError):
+        edits = None
+    if not isinstance(edits, list) or not edits:
+        return JsonResponse({"success": False, "error": "Expected a list of edits"})
+
+    results = apply_edits(edits, base)
+    return JsonResponse({
+        "success": all(r["status"] == "ok" for r in results),
+        "results": results,
+        "token": resume_token(base, results),
+    })
+
+
 @login_required
 def rental_edit(request, id):
     machine = get_object_or_404(RentalMachine, id=id)
@@ -147,37 +410,28 @@ def rental_edit(request, id):
     return render(request, 'staff/rental_edit.html', {'machine': machine})
 
 
-@login_required
-def rental_qr(request, id):
+@async_login_required
+async def rental_qr(request, id):
     """Return a small SVG QR that links to the machine’s detail page.
        ✅ Uses SVG to avoid Pillow/zlib dependency entirely."""
-    machine = get_object_or_404(RentalMachine, id=id)
+    machine = await aget_object_or_404(RentalMachine, id=id)
     url = request.build_absolute_uri(f"/staff/rental/{machine.id}/")
-
-    qr = qrcode.QRCode(
-        version=1, box_size=2, border=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_M
-    )
-    qr.add_data(url)
-    qr.make(fit=True)
-
-    img = qr.make_image(image_factory=SvgImage)  # SVG output
-    buffer = BytesIO()
-    img.save(buffer)
-    svg_data = buffer.getvalue()
-    return HttpResponse(svg_data, content_type="image/svg+xml")
+    return await _qr_response(url)
 
 
 def spec_search(request):
     query = request.GET.get('q', '').strip()
-    specs = MachineSpecification.objects.all()
+    specs = objcache.all_objects(MachineSpecification)  # ✅ cached; no query in steady state
     if query:
-        specs = specs.filter(Q(model__icontains=query) | Q(brand__icontains=query))
+        needle = query.casefold()
+        specs = [spec for spec in specs if needle in spec.model.casefold() or needle in spec.brand.casefold()]
     return render(request, 'staff/spec_search.html', {'specs': specs, 'q': query})
 
 
 def spec_edit(request, id):
-    spec = get_object_or_404(MachineSpecification, id=id)
+    # Saves start from the database row; the form only needs the cached copy
+    spec = get_object_or_404(MachineSpecification, id=id) if request.method == "POST" \
+        else objcache.get_or_404(MachineSpecification, id)
     if request.method == "POST":
         form = MachineSpecificationForm(request.POST, request.FILES, instance=spec)
         if form.is_valid():
@@ -191,7 +445,7 @@ def spec_edit(request, id):
 
 @login_required
 def spec_detail(request, id):
-    spec = get_object_or_404(MachineSpecification, id=id)
+    spec = objcache.get_or_404(MachineSpecification, id)
     return render(request, 'staff/spec_detail.html', {'spec': spec})
 
 
@@ -248,7 +502,8 @@ def new_hire(request, machine_id):
                     "customers": customers,
                 })
 
-            customer = Customer.objects.create(
+            # Created together with the hire, so a lost race leaves no stray customer
+            customer = dict(
                 first_name=first_name,
                 last_name=last_name,
                 phone=phone,
@@ -279,18 +534,12 @@ def new_hire(request, machine_id):
                 "customers": customers,
             })
 
-        RentalRecord.objects.create(
-            machine=machine,
-            customer=customer,
-            start_date=start_date,
-            due_date=due_date,
-            notes=notes,
-        )
-
-        # Update machine status & location to customer suburb/address
-        machine.status   = "rented"
-        machine.location = (customer.suburb or customer.street_address or "").strip() or "On Hire"
-        machine.save(update_fields=["status", "location"])
+        # One transaction; only succeeds if the machine is still available (staff/hires.py)
+        try:
+            start_hire(machine.id, customer, start_date, due_date, notes)
+        except MachineUnavailable as e:
+            messages.error(request, str(e))
+            return redirect("staff:rental_detail", id=machine.id)
 
         messages.success(request, "Hire started.")
         return redirect("staff:rental_detail", id=machine.id)
@@ -302,6 +551,79 @@ def new_hire(request, machine_id):
     })
 
 
+@login_required
+@read_replica
+def export_csv(request, kind):
+    """Stream a CSV of any listing/history table, honouring the same ?filters as its page."""
+    if kind not in EXPORTS:
+        raise Http404("Unknown export.")
+    return stream_csv(request, kind)
+
+
+REPORT_GROUPS = {
+    'tier': ('value_tier',),
+    'model': ('brand', 'model'),
+    'spec': ('specification_label',),
+}
+
+
+@login_required
+@read_replica
+def utilization_report(request):
+    """Which machines/models earn their keep – reads only the precomputed MachineUtilization table."""
+    group = request.GET.get('group', '')
+    rows = MachineUtilization.objects.all()
+    if group in REPORT_GROUPS:
+        rows = (rows.values(*REPORT_GROUPS[group])
+                    .annotate(machines=Count('machine'), hire_count=Sum('hire_count'),
+                              days_on_hire=Sum('days_on_hire'), utilization=Avg('utilization'),
+                              job_count=Sum('job_count'), parts_used=Sum('parts_used'))
+                    .order_by('-days_on_hire'))
+    else:
+        group = ''
+        rows = rows.order_by('-days_on_hire', 'brand', 'model')
+    return render(request, 'staff/utilization_report.html', {
+        'rows': rows,
+        'group': group,
+        'refreshed_at': MachineUtilization.objects.aggregate(at=Max('refreshed_at'))['at'],
+    })
+
+
+@login_required
+@admin_required
+def data_import(request):
+    """Upload a supplier CSV/XLSX; the import itself runs on the background worker."""
+    if request.method == 'POST':
+        kind = request.POST.get('kind')
+        upload = request.FILES.get('file')
+        extension = os.path.splitext(upload.name)[1].lower() if upload else ''
+        if kind not in IMPORTS or extension not in ('.csv', '.xlsx'):
+            messages.error(request, "Choose what to import and a .csv or .xlsx file.")
+            return render(request, 'staff/data_import.html', {'kinds': sorted(IMPORTS)})
+
+        import_dir = settings.STAFF_IMPORT_DIR
+        os.makedirs(import_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=extension, prefix=f"{kind}-", dir=import_dir)
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in upload.chunks():  # ✅ never hold the whole spreadsheet in memory
+                f.write(chunk)
+
+        task = enqueue(import_file, user=request.user, max_attempts=1, kind=kind, path=path, delete_source=True)
+        return render(request, 'staff/data_import.html', {'kinds': sorted(IMPORTS), 'task': task})
+    return render(request, 'staff/data_import.html', {'kinds': sorted(IMPORTS)})
+
+
+@login_required
+@admin_required
+def data_import_report(request, id):
+    """Download the per-row error report of a finished import task."""
+    task = get_object_or_404(Task, id=id, name=task_name(import_file), status='done')
+    report = (task.result or {}).get('report')
+    if not report or not os.path.exists(report):
+        raise Http404("This import has no error report.")
+    return FileResponse(open(report, 'rb'), as_attachment=True, filename=os.path.basename(report))
+
+
 @login_required
 def customer_add(request):
     if request.method == 'POST':
@@ -316,35 +638,66 @@ def customer_add(request):
 
 
 @login_required
+def customer_nearest(request, id):
+    """Closest available machines to a customer (?type=, ?tier=, ?limit=), ranked by distance."""
+    customer = get_object_or_404(Customer, id=id)
+    machine_type = request.GET.get('type') or None
+    tier = request.GET.get('tier') or None
+    if tier and tier not in VALID_TIERS:
+        return JsonResponse({"success": False, "error": "Invalid value tier"})
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 100)
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid limit"})
+
+    origin, ranked = nearest_available(customer, machine_type, tier, limit)
+    if origin is None:
+        return JsonResponse({"success": False, "error": "Customer address could not be located"})
+    return JsonResponse({
+        "success": True,
+        "customer": customer.id,
+        "origin": {"lat": origin[0], "lon": origin[1]},
+        "machines": [{
+            "id": machine.id,
+            "type": machine.type,
+            "brand": machine.brand,
+            "model": machine.model,
+            "serial_number": machine.serial_number,
+            "value_tier": machine.value_tier,
+            "location": machine.location,
+            "distance_km": round(km, 1),
+        } for machine, km in ranked],
+    })
+
+
+@login_required
+@read_replica
+@condition(etag_func=etag_for(Job, RentalMachine, Treadmill, Customer))
 def service_jobs(request):
     """List all service jobs with key info."""
     jobs = (Job.objects
                 .select_related('rental_machine', 'treadmill', 'customer')
                 .order_by('-booking_date', '-date_created'))
 
-    return render(request, 'staff/service_jobs.html', {
-        'jobs': jobs
+    return stream_page(request, 'staff/service_jobs.html', {}, {
+        'job_rows': ('staff/rows/service_jobs.html', 'jobs', jobs),
     })
 
 
 @login_required
+@condition(etag_func=etag_for(Job, RentalMachine, Treadmill, Customer, MachineSpecification))
 def service_job_detail(request, id):
     job = get_object_or_404(Job, id=id)
+    _attach_cached(job, 'specification', 'technician')
     return render(request, 'staff/service_job_detail.html', {'job': job})
 
 
-@login_required
-def service_job_qr(request, id):
+@async_login_required
+async def service_job_qr(request, id):
     """Small SVG QR linking to the service job detail."""
-    job = get_object_or_404(Job, id=id)
+    job = await aget_object_or_404(Job, id=id)
     url = request.build_absolute_uri(f"/staff/jobs/{job.id}/")
-    qr = qrcode.QRCode(version=1, box_size=2, border=1, error_correction=qrcode.constants.ERROR_CORRECT_M)
-    qr.add_data(url)
-    qr.make(fit=True)
-    img = qr.make_image(image_factory=SvgImage)
-    buffer = BytesIO()
-    img.save(buffer)
-    return HttpResponse(buffer.getvalue(), content_type="image/svg+xml")
+    return await _qr_response(url)
 
 login_required
 def service_job_create(request):
@@ -369,40 +722,27 @@ def service_job_create(request):
 
 
 @login_required
+@read_replica
+@condition(etag_func=etag_for(RentalMachine, Part))
 def inventory(request):
     """Inventory overview: all rental machines + all parts with QR links."""
     q = (request.GET.get('q') or '').strip()
 
-    machines = RentalMachine.objects.all().order_by('brand', 'model', 'serial_number')
-    parts = Part.objects.all().order_by('name', 'part_number')
-
-    if q:
-        machines = machines.filter(
-            Q(brand__icontains=q) | Q(model__icontains=q) | Q(serial_number__icontains=q)
-        )
-        parts = parts.filter(
-            Q(name__icontains=q) | Q(part_number__icontains=q) | Q(compatible_models__icontains=q)
-        )
+    machines = filter_machines(RentalMachine.objects.all(), {'q': q}).order_by('brand', 'model', 'serial_number')
+    parts = filter_parts(Part.objects.all(), {'q': q}).order_by('name', 'part_number')
 
-    return render(request, 'staff/inventory.html', {
-        'machines': machines,
-        'parts': parts,
-        'q': q,
+    return stream_page(request, 'staff/inventory.html', {'q': q}, {
+        'machine_rows': ('staff/rows/inventory_machines.html', 'machines', machines),
+        'part_rows': ('staff/rows/inventory_parts.html', 'parts', parts),
     })
 
 
-@login_required
-def part_qr(request, id):
+@async_login_required
+async def part_qr(request, id):
     """One QR per Part type: opens the take page for that part."""
-    part = get_object_or_404(Part, id=id)
+    part = await sync_to_async(objcache.get_or_404)(Part, id)
     url = request.build_absolute_uri(f"/staff/inventory/part/{part.id}/take/")
-    qr = qrcode.QRCode(version=1, box_size=2, border=1, error_correction=qrcode.constants.ERROR_CORRECT_M)
-    qr.add_data(url)
-    qr.make(fit=True)
-    img = qr.make_image(image_factory=SvgImage)
-    buf = BytesIO()
-    img.save(buf)
-    return HttpResponse(buf.getvalue(), content_type="image/svg+xml")
+    return await _qr_response(url)
 
 @user_passes_test(lambda u: u.is_staff)
 @login_required
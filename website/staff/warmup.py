@@ -0,0 +1,52 @@
+"""
+Pre-load what the first real request would otherwise pay for.
+
+Called from website/wsgi.py and website/asgi.py once the application object
+exists, i.e. before the server hands the worker any traffic. Heavy optional
+libraries stay lazily imported everywhere else (manage.py, cron commands).
+Set STAFF_WARMUP=0 to skip it.
+"""
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+HOT_TEMPLATES = [
+    'staff/base.html',
+    'staff/dashboard.html',
+    'staff/inventory.html',
+    'staff/service_jobs.html',
+    'staff/rental_detail.html',
+]
+
+# Rendered a chunk at a time by stream_page, through the Jinja twins when configured
+ROW_TEMPLATES = [
+    'staff/rows/dashboard.html',
+    'staff/rows/inventory_machines.html',
+    'staff/rows/inventory_parts.html',
+    'staff/rows/service_jobs.html',
+]
+
+
+def warm_up():
+    if os.environ.get('STAFF_WARMUP', '1') == '0':
+        return
+    started = time.perf_counter()
+
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns  # import every view module and build the URL tree
+    for name in HOT_TEMPLATES:
+        get_template(name)  # parse + cache (cached loader)
+
+    from .streaming import row_engine
+    engine = row_engine()
+    for name in ROW_TEMPLATES:
+        get_template(name, using=engine)  # Jinja: compile, or load the bytecode cache
+
+    from .views import _qr_svg
+    _qr_svg("https://warmup.invalid/")  # imports qrcode and runs its one-off table setup
+
+    logger.info("Worker warm-up done in %.0f ms", (time.perf_counter() - started) * 1000)
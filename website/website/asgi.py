@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
 
 application = get_asgi_application()
+
+# Preload URLconf, hot templates and the QR encoder before this worker takes traffic
+from staff.warmup import warm_up  # noqa: E402
+
+warm_up()
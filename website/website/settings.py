@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,10 +43,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'staff.staticfiles.StaticFilesMiddleware',  # collected, precompressed static files (not used with DEBUG)
+    # Compresses HTML/JSON responses; streamed ones are flushed chunk by chunk and the live
+    # event stream is left alone (staff/compression.py). CSRF tokens are masked per
+    # request, so BREACH can't recover them from compressed pages.
+    'staff.compression.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'staff.replica.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +63,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -64,10 +70,31 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Parse each template once per process, in development too
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Optional: Jinja2 renders the table rows of the long listing pages (staff/jinja_env.py,
+# templates in staff/jinja2/). Without it installed those rows use Django templates.
+try:
+    import jinja2  # noqa: F401
+except ImportError:
+    pass
+else:
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {'environment': 'staff.jinja_env.environment'},
+    })
+
 WSGI_APPLICATION = 'website.wsgi.application'
 
 
@@ -81,6 +108,23 @@ DATABASES = {
     }
 }
 
+# Optional read replica for dashboards/exports/reports (see staff/replica.py).
+# Point STAFF_REPLICA_DB at a file kept fresh by `manage.py sync_replica --interval 30`.
+if os.environ.get('STAFF_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['STAFF_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['staff.replica.ReplicaRouter']
+
+# How long a user who just saved something keeps reading from the primary (≥ sync interval)
+STAFF_REPLICA_PIN_SECONDS = 120
+
+# Times a hire is retried when SQLite reports "database is locked" (staff/hires.py)
+STAFF_HIRE_RETRIES = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -118,8 +162,55 @@ USE_TZ = True
 
 STATIC_URL = '/staff/static/'
 
+# `manage.py collectstatic` is the build step: content-hashed names plus .gz/.br copies
+# (staff/storage.py), served with far-future cache headers by staff.staticfiles.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'staff.storage.CompressedManifestStaticFilesStorage'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = '/staff/profile/'
+
+# Uploaded spreadsheets and their error reports (staff.importers)
+STAFF_IMPORT_DIR = BASE_DIR / 'imports'
+
+# Nightly Parquet snapshots for analysts (manage.py snapshot_analytics)
+STAFF_ANALYTICS_DIR = BASE_DIR / 'analytics'
+
+# Listing pages (dashboard, inventory, service jobs) send the header at once and
+# stream table rows in chunks of this many (staff.streaming); False buffers the page
+STAFF_STREAM_PAGES = True
+STAFF_STREAM_CHUNK = 250
+# Engine for those rows: 'jinja2' (when installed, see TEMPLATES) or 'django'
+STAFF_ROW_TEMPLATES = 'jinja2'
+
+# Live status stream (staff/live.py): each connection ends after this many seconds and the
+# page reconnects, so streams whose browser has gone away don't pile up
+STAFF_LIVE_STREAM_SECONDS = 300
+
+# Read-through cache for specs, technicians and parts (staff/objcache.py). The default
+# backend is a per-process LRU; 'staff.objcache.DjangoCache' uses the Django cache
+# named by STAFF_OBJECT_CACHE_ALIAS instead, e.g. a shared Redis cache.
+STAFF_OBJECT_CACHE_BACKEND = 'staff.objcache.LocalLRUCache'
+STAFF_OBJECT_CACHE_SIZE = 5000
+STAFF_OBJECT_CACHE_TIMEOUT = 300  # seconds; also bounds how long other processes' writes go unseen locally
+
+# Preventive maintenance (staff/maintenance.py): a machine is due after this many days
+# on hire since its last service (MachineSpecification.service_interval_days overrides
+# it), or this many calendar days after it at the latest; "due soon" this many days ahead
+STAFF_SERVICE_INTERVAL_DAYS = 90
+STAFF_SERVICE_MAX_DAYS = 365
+STAFF_SERVICE_DUE_SOON_DAYS = 14
+
+# Closed jobs and returned hires older than this move to the archive tables
+# (manage.py archive_closed, staff/archive.py)
+STAFF_ARCHIVE_AFTER_DAYS = 365
+
+# Where unplaced available machines sit, for the nearest-machine lookup (staff.geo), e.g. "Parramatta NSW"
+STAFF_DEPOT_LOCATION = os.environ.get('STAFF_DEPOT_LOCATION', '')
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
 
 application = get_wsgi_application()
+
+# Preload URLconf, hot templates and the QR encoder before this worker takes traffic
+from staff.warmup import warm_up  # noqa: E402
+
+warm_up()